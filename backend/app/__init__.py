@@ -0,0 +1,10 @@
+"""
+Paquete de la aplicación Flask
+"""
+import sys
+from pathlib import Path
+
+# El motor de dominio compartido (motor_malla) vive en la raíz del repositorio
+_RAIZ_REPOSITORIO = str(Path(__file__).resolve().parents[2])
+if _RAIZ_REPOSITORIO not in sys.path:
+    sys.path.insert(0, _RAIZ_REPOSITORIO)
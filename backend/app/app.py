@@ -1,17 +1,187 @@
 """
 Aplicación principal Flask
 """
-from flask import Flask, jsonify
+import threading
+import time
+
+from flask import Flask, Response, g, request
 from flask_cors import CORS
+from app.formatos import responder
+from models.base_datos import BaseDatos
+from motor_malla.admision import ControlAdmision
+from motor_malla.calentamiento import Preparacion
+from motor_malla.errores import SERVICIO_SATURADO
+from motor_malla.historial import SESION_ANONIMA, sesion_actual
+from motor_malla.metricas import EN_CURSO, METRICAS, TIPO_CONTENIDO, familias_dominio, registrar_peticion
+from motor_malla.perfilado import MODO_COLAPSADO, Perfilador, modo_solicitado
+from motor_malla.trazas import TRAZADOR, configurar_trazas
+from routes.admin import admin_bp
 from routes.cursos import cursos_bp
 from routes.malla import malla_bp
+from routes.trabajos import trabajos_bp
 
 app = Flask(__name__)
 CORS(app)
+configurar_trazas('malla-academica-flask')
+
+# Calentamiento en segundo plano: /health responde de inmediato, /ready al terminar
+PREPARACION = Preparacion()
+
+
+def calentar():
+    try:
+        BaseDatos.calentar(PREPARACION)
+    except Exception as error:
+        PREPARACION.terminar(error)
+    else:
+        PREPARACION.terminar()
+
+
+threading.Thread(target=calentar, name='calentamiento', daemon=True).start()
+
+# Con MALLA_CATALOGO, el catálogo se recarga solo cuando cambia el archivo
+BaseDatos.vigilar_catalogo()
+
+# Cupos por clase de ruta (lecturas / mutaciones / pesadas), ver motor_malla.admision
+ADMISION = ControlAdmision()
 
 # Registrar blueprints
 app.register_blueprint(cursos_bp)
 app.register_blueprint(malla_bp)
+app.register_blueprint(admin_bp)
+app.register_blueprint(trabajos_bp)
+
+
+@app.before_request
+def fijar_sesion():
+    """El historial de deshacer / rehacer es por sesión (header X-Sesion)"""
+    g.token_sesion = sesion_actual.set(request.headers.get('X-Sesion') or SESION_ANONIMA)
+
+
+@app.teardown_request
+def liberar_sesion(error=None):
+    token = g.pop('token_sesion', None)
+    if token is not None:
+        sesion_actual.reset(token)
+
+
+@app.before_request
+def fijar_catalogo():
+    """Toda la petición ve un mismo catálogo aunque se recargue a mitad de camino"""
+    g.token_catalogo = BaseDatos.fijar_catalogo()
+
+
+@app.teardown_request
+def soltar_catalogo(error=None):
+    token = g.pop('token_catalogo', None)
+    if token is not None:
+        BaseDatos.soltar_catalogo(token)
+
+
+@app.before_request
+def iniciar_medicion():
+    g.inicio_peticion = time.perf_counter()
+    EN_CURSO.inc(request.method)
+
+
+@app.after_request
+def registrar_medicion(response):
+    """Cuenta la petición por ruta (la regla, no la URL) y código de respuesta"""
+    inicio = g.get('inicio_peticion')
+    if inicio is not None:
+        registrar_peticion(
+            request.method, request.url_rule.rule if request.url_rule else None,
+            response.status_code, time.perf_counter() - inicio, response.calculate_content_length()
+        )
+    return response
+
+
+@app.teardown_request
+def terminar_medicion(error=None):
+    if g.pop('inicio_peticion', None) is not None:
+        EN_CURSO.dec(request.method)
+
+
+@app.before_request
+def abrir_traza():
+    """Span raíz de la petición (solo con MALLA_TRAZAS configurado)"""
+    if TRAZADOR.activo:
+        ruta = request.url_rule.rule if request.url_rule else request.path
+        g.traza = TRAZADOR.abrir(
+            f"{request.method} {ruta}", request.headers.get('traceparent'),
+            **{'http.request.method': request.method, 'http.route': ruta}
+        )
+
+
+@app.after_request
+def anotar_traza(response):
+    traza = g.get('traza')
+    if traza is not None:
+        traza[0].fijar('http.response.status_code', response.status_code)
+    return response
+
+
+@app.teardown_request
+def cerrar_traza(error=None):
+    traza = g.pop('traza', None)
+    if traza is not None:
+        TRAZADOR.cerrar(*traza, error)
+
+
+@app.before_request
+def iniciar_perfilado():
+    """Perfila la petición si lo pide un administrador (ver motor_malla.perfilado)"""
+    modo = modo_solicitado(
+        request.headers.get('X-Perfilar') or request.args.get('perfilar'),
+        request.headers.get('X-Admin-Token')
+    )
+    if modo:
+        g.perfilador = Perfilador(modo)
+        g.perfilador.iniciar()
+
+
+@app.after_request
+def terminar_perfilado(response):
+    perfilador = g.pop('perfilador', None)
+    if perfilador is None:
+        return response
+    perfilador.detener()
+    if perfilador.modo == MODO_COLAPSADO:
+        # Pilas colapsadas listas para flamegraph.pl / speedscope
+        return Response(perfilador.resultado, content_type='text/plain; charset=utf-8')
+    response.headers['X-Perfil'] = perfilador.resultado
+    return response
+
+
+@app.teardown_request
+def descartar_perfilado(error=None):
+    # Si el handler falló sin respuesta, el perfilador igual se detiene
+    perfilador = g.pop('perfilador', None)
+    if perfilador is not None:
+        perfilador.detener()
+
+
+@app.before_request
+def admitir_peticion():
+    """Rechaza con 503 + Retry-After si la clase de la ruta está saturada"""
+    compuerta = ADMISION.compuerta(request.method, request.url_rule.rule if request.url_rule else request.path)
+    if compuerta is None:
+        return None
+    if not compuerta.entrar():
+        respuesta = responder({
+            'exito': False,
+            'error': SERVICIO_SATURADO
+        }, 503)
+        respuesta.headers['Retry-After'] = str(ADMISION.reintento)
+        return respuesta
+    g.compuerta = compuerta
+
+
+@app.teardown_request
+def liberar_cupo(error=None):
+    compuerta = g.pop('compuerta', None)
+    if compuerta is not None:
+        compuerta.salir()
 
 
 @app.route('/')
@@ -23,13 +193,16 @@ def index():
     Endpoint: GET /
     
     """
-    return jsonify({
+    return responder({
         'mensaje': 'Bienvenido a Malla Académica Backend (Flask)',
         'version': '1.0.0',
         'endpoints': {
             'cursos': '/api/cursos',
             'mallas': '/api/mallas/{malla_id}',
-            'health': '/health'
+            'trabajos': '/api/jobs',
+            'health': '/health',
+            'ready': '/ready',
+            'metrics': '/metrics'
         }
     })
 
@@ -43,15 +216,44 @@ def health():
     Responde rápidamente sin realizar operaciones costosas.
     Endpoint: GET /health
     """
-    return jsonify({
+    return responder({
         'status': 'healthy',
-        'service': 'malla-academica-backend'
+        'service': 'malla-academica-backend',
+        'cache_mallas': BaseDatos.estadisticas_cache(),
+        'catalogo': BaseDatos.estado_catalogo(),
+        'trabajos': BaseDatos.estado_trabajos()
     })
 
 
+@app.route('/ready')
+def ready():
+    """
+    Readiness - 200 solo cuando terminó el calentamiento.
+    
+    A diferencia de /health (el proceso vive), el balanceador debe usar este
+    endpoint para no enviar tráfico a una instancia fría.
+    Endpoint: GET /ready
+    """
+    return responder(PREPARACION.estado(), 200 if PREPARACION.listo else 503)
+
+
+@app.route('/metrics')
+def metrics():
+    """
+    Métricas en formato de exposición de Prometheus.
+    
+    Incluye peticiones, latencia y tamaño de respuesta por ruta, peticiones
+    en curso, resoluciones de prerequisitos, ubicaciones por malla y la
+    caché de mallas.
+    Endpoint: GET /metrics
+    """
+    familias = familias_dominio(BaseDatos.estadisticas_cache(), BaseDatos.ubicaciones_por_malla())
+    return Response(METRICAS.exponer(familias), content_type=TIPO_CONTENIDO)
+
+
 @app.errorhandler(404)
 def not_found(error):
-    return jsonify({
+    return responder({
         'exito': False,
         'error': 'Endpoint no encontrado'
     }), 404
@@ -59,7 +261,7 @@ def not_found(error):
 
 @app.errorhandler(500)
 def internal_error(error):
-    return jsonify({
+    return responder({
         'exito': False,
         'error': 'Error interno del servidor'
     }), 500
@@ -0,0 +1,67 @@
+"""
+Negociación de formato de respuesta y cuerpo (JSON, MessagePack, CBOR)
+Todas las respuestas de la API pasan por `responder`, que elige el codificador
+según el header Accept (ver motor_malla.formatos).
+"""
+from flask import jsonify, request, Response, abort
+from motor_malla.formatos import (
+    CBOR, JSON, MSGPACK, TIPOS_MIME, codificar, decodificar, modulo_codificador, negociar_formato
+)
+from motor_malla.trazas import span
+
+
+def responder(datos, status: int = 200):
+    """
+    Construye la respuesta en el formato pedido por el cliente.
+    Reemplaza a jsonify en todas las rutas del backend.
+    """
+    formato = negociar_formato(request.headers.get('Accept', ''))
+
+    with span('respuesta.serializar', formato=formato):
+        if formato == JSON:
+            respuesta = jsonify(datos)
+        else:
+            respuesta = Response(codificar(datos, formato), mimetype=formato)
+
+    respuesta.status_code = status
+    respuesta.vary.add('Accept')
+    return respuesta
+
+
+def responder_codificado(codificado):
+    """
+    Responde con bytes ya codificados en el formato negociado.
+
+    Args:
+        codificado (callable): formato -> bytes (p. ej. el catálogo precodificado)
+    """
+    formato = negociar_formato(request.headers.get('Accept', ''))
+    respuesta = Response(codificado(formato), mimetype=formato)
+    respuesta.vary.add('Accept')
+    return respuesta
+
+
+def leer_cuerpo(silencioso: bool = False):
+    """
+    Lee el cuerpo de la petición como JSON, MessagePack o CBOR según Content-Type.
+
+    Args:
+        silencioso (bool): Si es True retorna None ante cuerpos vacíos o inválidos
+
+    Returns:
+        dict | None: Cuerpo decodificado
+    """
+    tipo = TIPOS_MIME.get(request.mimetype)
+
+    with span('cuerpo.parsear', formato=tipo or request.mimetype):
+        if tipo in (MSGPACK, CBOR):
+            if modulo_codificador(tipo) is None:
+                abort(415)
+            try:
+                return decodificar(request.get_data(), tipo)
+            except Exception:
+                if silencioso:
+                    return None
+                abort(400)
+
+        return request.get_json(silent=silencioso)
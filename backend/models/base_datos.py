@@ -1,133 +1,38 @@
 """
 Base de datos simulada y manejo de datos
+Fachada del backend Flask sobre el motor compartido (motor_malla)
 """
-from models.modelos import Curso, Malla, MallaCurso, DifficultyLevel
+from motor_malla import (
+    Almacen, Historial, crear_cache_mallas, crear_fuente_catalogo, crear_mallas_semilla, id_posicional
+)
+from motor_malla.trabajos import ColaTrabajos, preparar_datos
+from motor_malla.validacion_masiva import validar_mallas
+from motor_malla.trazas import trazar
 
 
-# Base de datos simulada de cursos
-CURSOS_DB = {
-    "PROG101": Curso(
-        id="PROG101",
-        nombre="Introducción a la Programación",
-        codigo="PROG101",
-        creditos=3,
-        semestre=1,
-        descripcion="Conceptos básicos de programación",
-        prerequisitos=[],
-        dificultad=DifficultyLevel.FACIL,
-        horas=48
-    ),
-    "PROG102": Curso(
-        id="PROG102",
-        nombre="Programación Orientada a Objetos",
-        codigo="PROG102",
-        creditos=4,
-        semestre=2,
-        descripcion="POO y patrones de diseño",
-        prerequisitos=["PROG101"],
-        dificultad=DifficultyLevel.INTERMEDIO,
-        horas=64
-    ),
-    "PROG103": Curso(
-        id="PROG103",
-        nombre="Estructuras de Datos",
-        codigo="PROG103",
-        creditos=4,
-        semestre=2,
-        descripcion="Listas, árboles, grafos",
-        prerequisitos=["PROG101"],
-        dificultad=DifficultyLevel.INTERMEDIO,
-        horas=64
-    ),
-    "PROG104": Curso(
-        id="PROG104",
-        nombre="Algoritmos Avanzados",
-        codigo="PROG104",
-        creditos=4,
-        semestre=3,
-        descripcion="Análisis y optimización de algoritmos",
-        prerequisitos=["PROG103"],
-        dificultad=DifficultyLevel.DIFÍCIL,
-        horas=64
-    ),
-    "BD101": Curso(
-        id="BD101",
-        nombre="Bases de Datos I",
-        codigo="BD101",
-        creditos=3,
-        semestre=2,
-        descripcion="Diseño relacional de bases de datos",
-        prerequisitos=["PROG101"],
-        dificultad=DifficultyLevel.INTERMEDIO,
-        horas=48
-    ),
-    "BD102": Curso(
-        id="BD102",
-        nombre="Bases de Datos II",
-        codigo="BD102",
-        creditos=3,
-        semestre=3,
-        descripcion="Optimización y transacciones",
-        prerequisitos=["BD101"],
-        dificultad=DifficultyLevel.INTERMEDIO,
-        horas=48
-    ),
-    "MATH101": Curso(
-        id="MATH101",
-        nombre="Cálculo I",
-        codigo="MATH101",
-        creditos=4,
-        semestre=1,
-        descripcion="Límites, derivadas e integrales",
-        prerequisitos=[],
-        dificultad=DifficultyLevel.FACIL,
-        horas=64
-    ),
-    "MATH102": Curso(
-        id="MATH102",
-        nombre="Álgebra Lineal",
-        codigo="MATH102",
-        creditos=3,
-        semestre=1,
-        descripcion="Matrices y espacios vectoriales",
-        prerequisitos=[],
-        dificultad=DifficultyLevel.FACIL,
-        horas=48
-    ),
-    "WEB101": Curso(
-        id="WEB101",
-        nombre="Desarrollo Web Frontend",
-        codigo="WEB101",
-        creditos=3,
-        semestre=3,
-        descripcion="HTML, CSS, JavaScript",
-        prerequisitos=["PROG102"],
-        dificultad=DifficultyLevel.INTERMEDIO,
-        horas=48
-    ),
-    "WEB102": Curso(
-        id="WEB102",
-        nombre="Desarrollo Web Backend",
-        codigo="WEB102",
-        creditos=3,
-        semestre=4,
-        descripcion="APIs REST y frameworks backend",
-        prerequisitos=["WEB101", "BD101"],
-        dificultad=DifficultyLevel.INTERMEDIO,
-        horas=48
-    ),
-}
+# Almacén en memoria: catálogo (MALLA_CATALOGO o el semilla compartido con FastAPI) + mallas del proceso.
+# Las mallas viven en una caché LRU acotada (MALLA_CACHE_BYTES) que desborda a disco.
+# Cada mutación registra su inverso en el historial de la sesión (header X-Sesion).
+HISTORIAL = Historial()
+FUENTE_CATALOGO = crear_fuente_catalogo()
+ALMACEN = Almacen(
+    FUENTE_CATALOGO, crear_cache_mallas(crear_mallas_semilla()), id_posicional,
+    historial=HISTORIAL
+)
 
 # Mallas simuladas
-MALLAS_DB = {
-    "MALLA001": Malla(
-        id="MALLA001",
-        nombre="",  # Sin nombre predeterminado, el usuario debe ingresarlo
-        programa="Ingeniería de Sistemas",
-        cursos=[],
-        descripcion="Plan de estudios para Ingeniería de Sistemas"
-    )
-}
+MALLAS_DB = ALMACEN.mallas
+
+# Cómputos pesados en procesos aparte (los procesos se crean con el primer trabajo)
+TRABAJOS = ColaTrabajos()
+
+
+def __getattr__(nombre):
+    # Base de datos simulada de cursos: el catálogo se recarga en caliente,
+    # así que CURSOS_DB se resuelve en cada acceso en lugar de quedar fijo
+    if nombre == 'CURSOS_DB':
+        return ALMACEN.catalogo.cursos
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
 
 
 class BaseDatos:
@@ -135,65 +40,203 @@ class BaseDatos:
     
     @staticmethod
     def obtener_cursos():
-        return list(CURSOS_DB.values())
+        return ALMACEN.obtener_cursos()
     
     @staticmethod
     def obtener_curso(curso_id: str):
-        return CURSOS_DB.get(curso_id)
+        return ALMACEN.obtener_curso(curso_id)
+    
+    @staticmethod
+    def obtener_dependientes(curso_id: str, profundidad: int = 1):
+        """Cursos que tienen a curso_id como prerequisito, hasta `profundidad` saltos (0 = todos)"""
+        return ALMACEN.obtener_dependientes(curso_id, profundidad)
     
     @staticmethod
     def obtener_malla(malla_id: str):
-        return MALLAS_DB.get(malla_id)
+        return ALMACEN.obtener_malla(malla_id)
+    
+    @staticmethod
+    def estadisticas_cache():
+        """Aciertos, fallos, desalojos y memoria de la caché de mallas"""
+        return ALMACEN.estadisticas_cache()
+    
+    @staticmethod
+    def ubicaciones_por_malla():
+        """malla_id -> cantidad de cursos ubicados"""
+        return ALMACEN.ubicaciones_por_malla()
+    
+    @staticmethod
+    def calentar(preparacion):
+        """Catálogo derivado, índices y caminos calientes antes de recibir tráfico"""
+        ALMACEN.calentar(preparacion)
+    
+    @staticmethod
+    def catalogo_codificado(formato: str):
+        """Respuesta de GET /api/cursos ya codificada en el formato pedido"""
+        return ALMACEN.catalogo.codificado(formato)
+    
+    @staticmethod
+    def obtener_catalogo():
+        return ALMACEN.catalogo
+    
+    @staticmethod
+    def fijar_catalogo():
+        """Fija el catálogo vigente para la petición en curso; retorna el token para soltarlo"""
+        return FUENTE_CATALOGO.fijar()
+    
+    @staticmethod
+    def soltar_catalogo(token):
+        FUENTE_CATALOGO.soltar(token)
+    
+    @staticmethod
+    def recargar_catalogo():
+        """Relee MALLA_CATALOGO y publica el catálogo nuevo; retorna (estado, error)"""
+        return FUENTE_CATALOGO.recargar()
+    
+    @staticmethod
+    def vigilar_catalogo():
+        """Recarga el catálogo cuando cambia el archivo (cada MALLA_CATALOGO_INTERVALO segundos)"""
+        FUENTE_CATALOGO.vigilar()
+    
+    @staticmethod
+    def estado_catalogo():
+        return FUENTE_CATALOGO.estado()
+    
+    @staticmethod
+    @trazar('BaseDatos.crear_malla')
+    def crear_malla(datos: dict):
+        """Crea una malla vacía (programa obligatorio)"""
+        return ALMACEN.crear_malla(datos)
     
     @staticmethod
+    def listar_mallas(filtros: dict = None, despues: int = 0, limite: int = 50):
+        """Página de mallas (filas resumen) filtrada por programa, periodo_vigencia y estado"""
+        return ALMACEN.listar_mallas(filtros, despues, limite)
+    
+    @staticmethod
+    @trazar('BaseDatos.actualizar_malla')
+    def actualizar_malla(malla_id: str, cambios: dict):
+        """Actualiza los metadatos de la malla (nombre, créditos, estado, etc)"""
+        return ALMACEN.actualizar_malla(malla_id, cambios)
+    
+    @staticmethod
+    @trazar('BaseDatos.agregar_curso_malla')
     def agregar_curso_malla(malla_id: str, curso_id: str, posicion_x: int, posicion_y: int, semestre: int):
         """Agrega un curso a una malla"""
-        if malla_id not in MALLAS_DB:
-            return None, "Malla no encontrada"
-        
-        if curso_id not in CURSOS_DB:
-            return None, "Curso no encontrado"
-        
-        malla = MALLAS_DB[malla_id]
-        nuevo_curso = MallaCurso(
-            id=f"MALLA_{curso_id}_{len(malla.cursos)}",
-            curso_id=curso_id,
-            posicion_x=posicion_x,
-            posicion_y=posicion_y,
-            semestre=semestre
-        )
-        malla.cursos.append(nuevo_curso)
-        return nuevo_curso, None
+        return ALMACEN.agregar_curso_malla(malla_id, curso_id, posicion_x, posicion_y, semestre)
     
     @staticmethod
+    @trazar('BaseDatos.agregar_curso_con_prerequisitos')
+    def agregar_curso_con_prerequisitos(malla_id: str, curso_id: str, posicion_x: int, posicion_y: int, semestre: int):
+        """Agrega un curso y sus prerequisitos faltantes; retorna el plan aplicado"""
+        return ALMACEN.agregar_con_prerequisitos(malla_id, curso_id, posicion_x, posicion_y, semestre)
+    
+    @staticmethod
+    @trazar('BaseDatos.actualizar_posicion_curso')
     def actualizar_posicion_curso(malla_id: str, curso_malla_id: str, posicion_x: int, posicion_y: int, semestre: int = None):
         """Actualiza la posición y/o semestre de un curso en la malla"""
-        if malla_id not in MALLAS_DB:
-            return None, "Malla no encontrada"
-        
-        malla = MALLAS_DB[malla_id]
-        curso = next((c for c in malla.cursos if c.id == curso_malla_id), None)
-        
-        if not curso:
-            return None, "Curso en malla no encontrado"
-        
-        curso.posicion_x = posicion_x
-        curso.posicion_y = posicion_y
-        if semestre is not None:
-            curso.semestre = semestre
-        return curso, None
-    
-    @staticmethod
-    def eliminar_curso_malla(malla_id: str, curso_malla_id: str):
-        """Elimina un curso de la malla"""
-        if malla_id not in MALLAS_DB:
-            return False, "Malla no encontrada"
-        
-        malla = MALLAS_DB[malla_id]
-        curso = next((c for c in malla.cursos if c.id == curso_malla_id), None)
-        
-        if not curso:
-            return False, "Curso en malla no encontrado"
-        
-        malla.cursos.remove(curso)
-        return True, None
+        return ALMACEN.actualizar_posicion_curso(malla_id, curso_malla_id, posicion_x, posicion_y, semestre)
+    
+    @staticmethod
+    @trazar('BaseDatos.eliminar_curso_malla')
+    def eliminar_curso_malla(malla_id: str, curso_malla_id: str, modo: str = 'simple'):
+        """Elimina un curso de la malla (modo simple, preview, block o cascade); retorna (plan, error)"""
+        return ALMACEN.eliminar_curso_malla(malla_id, curso_malla_id, modo)
+    
+    @staticmethod
+    @trazar('BaseDatos.aplicar_layout')
+    def aplicar_layout(malla_id: str, semestres=None):
+        """
+        Recalcula las posiciones de la malla con el motor de layout.
+        Si se indican semestres, solo se reubican esas columnas (incremental).
+        """
+        return ALMACEN.aplicar_layout(malla_id, semestres)
+    
+    @staticmethod
+    @trazar('BaseDatos.publicar_version')
+    def publicar_version(malla_id: str):
+        """Congela el borrador como versión inmutable (comparte los semestres sin cambios)"""
+        return ALMACEN.publicar_version(malla_id)
+    
+    @staticmethod
+    def listar_versiones(malla_id: str):
+        return ALMACEN.listar_versiones(malla_id)
+    
+    @staticmethod
+    def obtener_version(malla_id: str, numero: int):
+        return ALMACEN.obtener_version(malla_id, numero)
+    
+    @staticmethod
+    def ruta_critica(malla_id: str, numero: int = None):
+        """Ruta crítica y holgura por curso del borrador o de una versión (memoizada por versión)"""
+        return ALMACEN.ruta_critica(malla_id, numero)
+    
+    @staticmethod
+    def elegibilidad(malla_id: str, numero: int = None):
+        """Matriz curso × semestre de ubicaciones válidas (memoizada por versión)"""
+        return ALMACEN.elegibilidad(malla_id, numero)
+    
+    @staticmethod
+    def comparar_mallas(referencia_a: str, referencia_b: str):
+        """Diferencias entre dos mallas o versiones, emparejadas por curso_id"""
+        return ALMACEN.comparar(referencia_a, referencia_b)
+    
+    @staticmethod
+    @trazar('BaseDatos.deshacer')
+    def deshacer(malla_id: str):
+        """Deshace la última edición de la sesión actual sobre la malla"""
+        return ALMACEN.deshacer(malla_id)
+    
+    @staticmethod
+    @trazar('BaseDatos.rehacer')
+    def rehacer(malla_id: str):
+        """Rehace la última edición deshecha por la sesión actual"""
+        return ALMACEN.rehacer(malla_id)
+    
+    @staticmethod
+    def pendientes_historial(malla_id: str):
+        """Cantidad de cambios que la sesión actual puede deshacer / rehacer"""
+        return ALMACEN.pendientes_historial(malla_id)
+    
+    @staticmethod
+    def enviar_trabajo(tipo: str, malla_id: str, numero: int = None, timeout: float = None):
+        """Encola un cómputo sobre el borrador o una versión; retorna (trabajo, error)"""
+        instantanea, error = ALMACEN.obtener_instantanea(malla_id, numero)
+        if error:
+            return None, error
+        datos, error = preparar_datos(tipo, ALMACEN.catalogo, *instantanea)
+        if error:
+            return None, error
+        return TRABAJOS.enviar(tipo, malla_id, numero, datos, timeout)
+    
+    @staticmethod
+    def obtener_trabajo(trabajo_id: str):
+        return TRABAJOS.obtener(trabajo_id)
+    
+    @staticmethod
+    def esperar_trabajo(trabajo_id: str, revision: int, espera: float):
+        """Bloquea hasta que el trabajo cambie (o pase `espera`); para el stream de eventos"""
+        return TRABAJOS.esperar(trabajo_id, revision, espera)
+    
+    @staticmethod
+    def cancelar_trabajo(trabajo_id: str):
+        return TRABAJOS.cancelar(trabajo_id)
+    
+    @staticmethod
+    def estado_trabajos():
+        return TRABAJOS.estado()
+    
+    @staticmethod
+    def validar_todas(procesos: int = None):
+        """Valida todas las mallas en paralelo contra el catálogo vigente; retorna el reporte"""
+        return validar_mallas(ALMACEN.recorrer_mallas(), ALMACEN.catalogo, procesos)
+    
+    @staticmethod
+    def buscar_cursos_en_area(malla_id: str, x0: int, y0: int, x1: int, y1: int):
+        """Retorna los cursos de la malla visibles en el rectángulo (x0, y0, x1, y1)"""
+        return ALMACEN.buscar_cursos_en_area(malla_id, x0, y0, x1, y1)
+    
+    @staticmethod
+    def detectar_solapamientos(malla_id: str, posicion_x: int, posicion_y: int, excluir: str = None):
+        """Retorna los cursos que se solapan con una tarjeta soltada en (posicion_x, posicion_y)"""
+        return ALMACEN.detectar_solapamientos(malla_id, posicion_x, posicion_y, excluir)
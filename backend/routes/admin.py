@@ -0,0 +1,100 @@
+"""
+Rutas de administración - Flask Blueprint
+Todas exigen el header X-Admin-Token (= MALLA_TOKEN_ADMIN)
+"""
+from flask import Blueprint, request
+from app.formatos import responder
+from models.base_datos import BaseDatos
+from motor_malla.administracion import token_admin_valido
+from motor_malla.errores import TOKEN_ADMIN_INVALIDO, codigo_http
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
+
+
+@admin_bp.before_request
+def exigir_token():
+    if not token_admin_valido(request.headers.get('X-Admin-Token')):
+        return responder({
+            'exito': False,
+            'error': TOKEN_ADMIN_INVALIDO
+        }, codigo_http(TOKEN_ADMIN_INVALIDO))
+
+
+@admin_bp.route('/catalogo', methods=['GET'])
+def estado_catalogo():
+    """
+    Estado del catálogo publicado.
+    Endpoint: GET /api/admin/catalogo
+    Returns:
+        JSON con:
+            - catalogo (dict): archivo, version, total, publicado_en y error de la última recarga
+    """
+    return responder({
+        'exito': True,
+        'catalogo': BaseDatos.estado_catalogo()
+    })
+
+
+@admin_bp.route('/catalogo/recargar', methods=['POST'])
+def recargar_catalogo():
+    """
+    Relee el archivo del catálogo (MALLA_CATALOGO) y lo publica sin reiniciar.
+    
+    El catálogo nuevo y sus estructuras derivadas se arman aparte y se publican
+    de una vez: las peticiones en curso terminan con el catálogo anterior.
+    Si el archivo es inválido se mantiene el vigente.
+    
+    Endpoint: POST /api/admin/catalogo/recargar
+    Returns:
+        JSON con:
+            - catalogo (dict): estado publicado y duración de cada paso de la recarga
+            - error, detalle: si no hay archivo configurado (409) o es inválido (422)
+    """
+    estado, error = BaseDatos.recargar_catalogo()
+    if error:
+        return responder({
+            'exito': False,
+            'error': error,
+            'detalle': BaseDatos.estado_catalogo()['error']
+        }), codigo_http(error)
+    
+    return responder({
+        'exito': True,
+        'catalogo': estado
+    })
+
+
+@admin_bp.route('/validacion', methods=['POST'])
+def validar_todas():
+    """
+    Valida todas las mallas en paralelo (orden de prerequisitos, prerequisitos
+    faltantes, cursos desconocidos y créditos contra creditos_programa).
+    
+    Los procesos comparten el catálogo compilado y mapeado en memoria; con
+    pocas mallas se valida en el mismo proceso.
+    
+    Endpoint: POST /api/admin/validacion?procesos=
+    
+    Query params:
+        - procesos (int, opcional): Procesos a usar (por defecto uno por núcleo)
+    
+    Returns:
+        JSON con:
+            - reporte (dict): total, validas, invalidas, problemas y el detalle por malla
+        
+        Status: 200 OK | 400 Bad Request | 403 Forbidden
+    """
+    try:
+        procesos = int(request.args['procesos']) if 'procesos' in request.args else None
+    except ValueError:
+        procesos = 0
+    if procesos is not None and procesos < 1:
+        return responder({
+            'exito': False,
+            'error': 'Datos inválidos'
+        }), 400
+    
+    return responder({
+        'exito': True,
+        'reporte': BaseDatos.validar_todas(procesos)
+    })
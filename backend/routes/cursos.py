@@ -1,8 +1,10 @@
 """
 Rutas para gestión de cursos - Flask Blueprint
 """
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, request
+from app.formatos import responder, responder_codificado
 from models.base_datos import BaseDatos
+from motor_malla.errores import codigo_http
 
 cursos_bp = Blueprint('cursos', __name__, url_prefix='/api/cursos')
 
@@ -17,13 +19,11 @@ def obtener_cursos():
             - exito (bool): Siempre True
             - total (int): Cantidad de cursos disponibles
             - cursos (list): Array de objetos curso con toda su información
+    
+    Cada catálogo publicado es inmutable: la respuesta se codifica una sola vez
+    por formato (en el calentamiento o en la recarga) y se reutiliza.
     """
-    cursos = BaseDatos.obtener_cursos()
-    return jsonify({
-        'exito': True,
-        'total': len(cursos),
-        'cursos': [c.to_dict() for c in cursos]
-    })
+    return responder_codificado(BaseDatos.catalogo_codificado)
 
 
 @cursos_bp.route('/<curso_id>', methods=['GET'])
@@ -41,12 +41,59 @@ def obtener_curso(curso_id):
     curso = BaseDatos.obtener_curso(curso_id)
     
     if not curso:
-        return jsonify({
+        return responder({
             'exito': False,
             'error': 'Curso no encontrado'
         }), 404
     
-    return jsonify({
+    return responder({
         'exito': True,
         'curso': curso.to_dict()
     })
+
+
+@cursos_bp.route('/<curso_id>/dependientes', methods=['GET'])
+def obtener_dependientes(curso_id):
+    """
+    Cursos que se desbloquean con un curso (lo tienen como prerequisito).
+    
+    Usa el índice inverso del catálogo: el costo es proporcional al resultado,
+    sin recorrer todo el catálogo.
+    
+    Endpoint: GET /api/cursos/{curso_id}/dependientes?profundidad=1
+    
+    Query params:
+        - profundidad (int): Saltos a recorrer; 1 = solo directos (por defecto), 0 = todos
+    
+    Returns:
+        JSON con:
+            - exito (bool): True si el curso existe
+            - curso_id (str): Curso consultado
+            - total (int): Cantidad de dependientes
+            - dependientes (list): id, nombre, codigo, creditos, semestre, dificultad y
+              profundidad (distancia mínima al curso)
+        
+        Status: 200 OK | 400 Bad Request | 404 Not Found
+    """
+    try:
+        profundidad = int(request.args.get('profundidad', 1))
+    except ValueError:
+        return responder({
+            'exito': False,
+            'error': 'Datos inválidos'
+        }), 400
+    
+    dependientes, error = BaseDatos.obtener_dependientes(curso_id, profundidad)
+    
+    if error:
+        return responder({
+            'exito': False,
+            'error': error
+        }), codigo_http(error)
+    
+    return responder({
+        'exito': True,
+        'curso_id': curso_id,
+        'total': len(dependientes),
+        'dependientes': dependientes
+    })
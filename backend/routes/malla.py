@@ -1,94 +1,156 @@
 """
 Rutas para gestión de malla académica - Flask Blueprint
-Backend independiente con lógica de prerequisitos integrada
+La lógica de prerequisitos y ubicación vive en el motor compartido (motor_malla)
 """
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, request
+from app.formatos import responder, leer_cuerpo
 from models.base_datos import BaseDatos
+from motor_malla.errores import codigo_http
+from motor_malla.listado import FILTROS_MALLA, decodificar_cursor, normalizar_limite
+from motor_malla.operaciones import CASCADE, PREVIEW, validar_modo_eliminacion
 
 malla_bp = Blueprint('malla', __name__, url_prefix='/api/mallas')
 
 
-# ==================== FUNCIONES AUXILIARES ====================
+# ==================== RUTAS ====================
+
 
-def obtener_prerequisitos_recursivos(curso_id: str, visitados: set = None):
+@malla_bp.route('', methods=['POST'])
+def crear_malla():
     """
-    Obtiene todos los prerequisitos de un curso de manera recursiva.
+    Crea una malla académica vacía.
     
-    Esta función analiza un curso y encuentra todos los cursos que son prerequisito,
-    incluyendo los prerequisitos de los prerequisitos (análisis en cadena).
-   
-    Returns:
-        list: Lista de diccionarios con información de prerequisitos, cada uno con:
-            - id: ID del prerequisito
-            - nombre: Nombre del curso prerequisito
-            - codigo: Código del curso
-            - creditos: Créditos del curso
-            - dificultad: Nivel de dificultad
-            - horas: Horas semanales
-            - profundidad: Nivel de dependencia (1 = directo, 2+ = indirecto)
-    """
-    if visitados is None:
-        visitados = set()
-    
-    if curso_id in visitados:
-        return []
-    
-    visitados.add(curso_id)
-    prerequisitos_completos = []
-    
-    curso = BaseDatos.obtener_curso(curso_id)
-    if not curso:
-        return []
-    
-    for prereq_id in curso.prerequisitos:
-        prereq_curso = BaseDatos.obtener_curso(prereq_id)
-        if prereq_curso:
-            prerequisitos_completos.append({
-                "id": prereq_id,
-                "nombre": prereq_curso.nombre,
-                "codigo": prereq_curso.codigo,
-                "creditos": prereq_curso.creditos,
-                "dificultad": prereq_curso.dificultad,
-                "horas": prereq_curso.horas,
-                "profundidad": 1
-            })
-            
-            sub_prerequisitos = obtener_prerequisitos_recursivos(prereq_id, visitados)
-            for sub_prereq in sub_prerequisitos:
-                sub_prereq["profundidad"] += 1
-                existe = False
-                for p in prerequisitos_completos:
-                    if p["id"] == sub_prereq["id"]:
-                        p["profundidad"] = max(p["profundidad"], sub_prereq["profundidad"])
-                        existe = True
-                        break
-                if not existe:
-                    prerequisitos_completos.append(sub_prereq)
-    
-    return prerequisitos_completos
-
-def calcular_nivel_minimo(curso_id: str) -> int:
-    """
-    Calcula el nivel (semestre) mínimo en el que puede ubicarse un curso.
-    
-    El cálculo se basa en la profundidad máxima de los prerequisitos.
-    Si un curso tiene prerequisitos en cadena, debe ubicarse después de todos ellos.
+    Endpoint: POST /api/mallas
     
-    Args:
-        curso_id (str): ID del curso a evaluar
+    Body (JSON):
+        - programa (str): Programa académico (obligatorio)
+        - id (str, opcional): ID de la malla; si no se envía se genera
+        - nombre, descripcion, periodo_vigencia, creditos_programa,
+          numero_niveles, estado (opcionales)
     
     Returns:
-        int: Nivel mínimo sugerido (1 si no tiene prerequisitos, 2+ según cadena)
+        JSON con:
+            - exito (bool): True si se creó la malla
+            - malla (dict): Malla creada
+        
+        Status: 201 Created | 400 Bad Request
+    """
+    data = leer_cuerpo()
+    
+    try:
+        for campo in ('creditos_programa', 'numero_niveles'):
+            if data.get(campo) is not None:
+                data[campo] = int(data[campo])
+    except (ValueError, TypeError):
+        return responder({
+            'exito': False,
+            'error': 'Datos inválidos'
+        }), 400
+    
+    malla, error = BaseDatos.crear_malla(data)
+    
+    if error:
+        return responder({
+            'exito': False,
+            'error': error
+        }), codigo_http(error)
     
+    return responder({
+        'exito': True,
+        'mensaje': 'Malla creada',
+        'malla': malla.to_dict()
+    }), 201
+
+
+@malla_bp.route('', methods=['GET'])
+def listar_mallas():
     """
-    prerequisitos = obtener_prerequisitos_recursivos(curso_id)
-    if not prerequisitos:
-        return 1
+    Lista las mallas en orden de creación, paginadas por cursor.
+    
+    Retorna filas resumen (sin los cursos embebidos, con total_cursos) para
+    que el listado siga siendo liviano con miles de mallas.
+    
+    Endpoint: GET /api/mallas?programa=&periodo_vigencia=&estado=&limite=&cursor=
+    
+    Query params:
+        - programa, periodo_vigencia, estado (str, opcionales): Filtros exactos
+        - limite (int, opcional): Tamaño de página (por defecto 50, máximo 200)
+        - cursor (str, opcional): Valor de siguiente_cursor de la página anterior
+    
+    Returns:
+        JSON con:
+            - exito (bool): True si la consulta es válida
+            - mallas (list): Filas resumen de la página
+            - siguiente_cursor (str | None): Cursor de la siguiente página
+        
+        Status: 200 OK | 400 Bad Request
+    """
+    try:
+        limite = request.args.get('limite')
+        limite = normalizar_limite(int(limite) if limite is not None else None)
+    except (ValueError, TypeError):
+        return responder({
+            'exito': False,
+            'error': 'Datos inválidos'
+        }), 400
+    
+    despues, error = decodificar_cursor(request.args.get('cursor'))
+    
+    if error:
+        return responder({
+            'exito': False,
+            'error': error
+        }), codigo_http(error)
+    
+    filtros = {campo: request.args.get(campo) for campo in FILTROS_MALLA}
+    mallas, siguiente_cursor = BaseDatos.listar_mallas(filtros, despues, limite)
     
-    max_profundidad = max(p["profundidad"] for p in prerequisitos)
-    return max_profundidad + 1
+    return responder({
+        'exito': True,
+        'mallas': mallas,
+        'siguiente_cursor': siguiente_cursor
+    })
 
-# ==================== RUTAS ====================
+
+@malla_bp.route('/diff', methods=['GET'])
+def comparar_mallas():
+    """
+    Compara dos mallas o dos versiones de una malla.
+    
+    Los cursos se emparejan por curso_id (no por el ID de la ubicación) y
+    los semestres idénticos se saltan por su huella, así el costo es lineal
+    en los semestres que cambiaron.
+    
+    Endpoint: GET /api/mallas/diff?a=MALLA001@1&b=MALLA001
+    
+    Query params:
+        - a, b (str): 'MALLA_ID' para el borrador o 'MALLA_ID@n' para la versión n
+    
+    Returns:
+        JSON con:
+            - exito (bool): True si ambas referencias existen
+            - agregados, eliminados (list): Ubicaciones que solo están en b / en a
+            - movidos (list): Cursos que cambiaron de posición en su semestre
+            - cambios_nivel (list): Cursos que cambiaron de semestre
+            - semestres_sin_cambios (list): Semestres omitidos por ser iguales
+            - iguales (bool): True si no hay diferencias
+        
+        Status: 200 OK | 400 Bad Request | 404 Not Found
+    """
+    diferencias, error = BaseDatos.comparar_mallas(request.args.get('a'), request.args.get('b'))
+    
+    if error:
+        return responder({
+            'exito': False,
+            'error': error
+        }), codigo_http(error)
+    
+    return responder({
+        'exito': True,
+        'a': request.args.get('a'),
+        'b': request.args.get('b'),
+        **diferencias
+    })
 
 
 @malla_bp.route('/<malla_id>', methods=['GET'])
@@ -112,12 +174,12 @@ def obtener_malla(malla_id):
     malla = BaseDatos.obtener_malla(malla_id)
     
     if not malla:
-        return jsonify({
+        return responder({
             'exito': False,
             'error': 'Malla no encontrada'
         }), 404
     
-    return jsonify({
+    return responder({
         'exito': True,
         'malla': malla.to_dict()
     })
@@ -127,40 +189,192 @@ def obtener_malla(malla_id):
 def actualizar_malla(malla_id):
     """
     Actualiza los datos de la malla (nombre, créditos, etc)
-    Guarda en estado borrador sin validaciones avanzadas
+    Guarda en estado borrador sin validaciones avanzadas.
+    Con estado 'publicado' además congela una versión inmutable del borrador.
     """
     malla = BaseDatos.obtener_malla(malla_id)
     
     if not malla:
-        return jsonify({
+        return responder({
             'exito': False,
             'error': 'Malla no encontrada'
         }), 404
     
-    data = request.json
+    data = leer_cuerpo()
     
     # Actualizar campos si están presentes (sin validaciones estrictas)
-    if 'nombre' in data:
-        malla.nombre = data['nombre']
-    if 'periodo_vigencia' in data:
-        malla.periodo_vigencia = data['periodo_vigencia']
-    if 'creditos_programa' in data:
-        malla.creditos_programa = data['creditos_programa']
-    if 'numero_niveles' in data:
-        malla.numero_niveles = data['numero_niveles']
-    if 'estado' in data:
-        # Guardar estado (borrador/publicado)
-        # En borrador NO se aplican validaciones avanzadas
-        malla.estado = data.get('estado', 'borrador')
+    # Guardar estado (borrador/publicado): en borrador NO se aplican validaciones avanzadas
+    malla, error = BaseDatos.actualizar_malla(malla_id, data)
+    
+    if error:
+        return responder({
+            'exito': False,
+            'error': error
+        }), codigo_http(error)
     
     # Si viene con cursos, los cursos ya se guardan individualmente al arrastrarlos
     # Esto solo actualiza los metadatos de la malla
     
-    return jsonify({
+    respuesta = {
         'exito': True,
         'mensaje': 'Malla guardada como borrador exitosamente',
         'estado': data.get('estado', 'borrador'),
         'malla': malla.to_dict()
+    }
+    
+    # Publicar: el borrador sigue editable, la versión queda congelada
+    if data.get('estado') == 'publicado':
+        version, _ = BaseDatos.publicar_version(malla_id)
+        respuesta['mensaje'] = f'Malla publicada (versión {version.numero})'
+        respuesta['version'] = version.numero
+    
+    return responder(respuesta)
+
+
+@malla_bp.route('/<malla_id>/versiones', methods=['GET'])
+def listar_versiones(malla_id):
+    """
+    Lista las versiones publicadas de la malla (sin sus cursos).
+    
+    Endpoint: GET /api/mallas/{malla_id}/versiones
+    
+    Status: 200 OK | 404 Not Found
+    """
+    versiones, error = BaseDatos.listar_versiones(malla_id)
+    
+    if error:
+        return responder({
+            'exito': False,
+            'error': error
+        }), codigo_http(error)
+    
+    return responder({
+        'exito': True,
+        'versiones': [v.resumen() for v in versiones]
+    })
+
+
+@malla_bp.route('/<malla_id>/versiones/<int:numero>', methods=['GET'])
+def obtener_version(malla_id, numero):
+    """
+    Obtiene una versión publicada de la malla tal como quedó al publicarse.
+    
+    Endpoint: GET /api/mallas/{malla_id}/versiones/{numero}
+    
+    Returns:
+        JSON con:
+            - exito (bool): True si existe la versión
+            - malla (dict): Malla de esa versión (incluye version y fecha_publicacion)
+        
+        Status: 200 OK | 404 Not Found
+    """
+    version, error = BaseDatos.obtener_version(malla_id, numero)
+    
+    if error:
+        return responder({
+            'exito': False,
+            'error': error
+        }), codigo_http(error)
+    
+    return responder({
+        'exito': True,
+        'malla': version.to_dict()
+    })
+
+
+@malla_bp.route('/<malla_id>/ruta-critica', methods=['GET'])
+def obtener_ruta_critica(malla_id):
+    """
+    Ruta crítica (cadena de prerequisitos más larga) y holgura de cada curso ubicado.
+    
+    Se calcula con una pasada hacia adelante y otra hacia atrás sobre los cursos
+    de la malla, y se reutiliza mientras la malla (o la versión) no cambie.
+    
+    Endpoint: GET /api/mallas/{malla_id}/ruta-critica?version=
+    
+    Query params:
+        - version (int, opcional): Versión publicada a analizar (por defecto el borrador)
+    
+    Returns:
+        JSON con:
+            - exito (bool): True si existe la malla (y la versión)
+            - semestres_minimos (int): Largo de la cadena de prerequisitos más larga
+            - horizonte (int): Semestres considerados para la holgura
+            - ruta_critica (list): IDs de curso de esa cadena, en orden
+            - conflictos (list): Cursos ubicados junto o antes de un prerequisito
+            - cursos (list): Por curso: semestre, mas_temprano, mas_tardio, holgura,
+              critico, adelantar y atrasar (de menor a mayor holgura)
+        
+        Status: 200 OK | 400 Bad Request | 404 Not Found
+    """
+    try:
+        numero = int(request.args['version']) if 'version' in request.args else None
+    except ValueError:
+        return responder({
+            'exito': False,
+            'error': 'Datos inválidos'
+        }), 400
+    
+    analisis, error = BaseDatos.ruta_critica(malla_id, numero)
+    
+    if error:
+        return responder({
+            'exito': False,
+            'error': error
+        }), codigo_http(error)
+    
+    return responder({
+        'exito': True,
+        'malla_id': malla_id,
+        'version': numero,
+        **analisis
+    })
+
+
+@malla_bp.route('/<malla_id>/elegibilidad', methods=['GET'])
+def obtener_elegibilidad(malla_id):
+    """
+    Semestres en los que cada curso del catálogo podría ubicarse dado lo ya ubicado.
+    
+    Reemplaza las validaciones por curso mientras se arrastra: una sola
+    petición trae la matriz completa, que se reutiliza mientras la malla
+    (o la versión) no cambie.
+    
+    Endpoint: GET /api/mallas/{malla_id}/elegibilidad?version=
+    
+    Query params:
+        - version (int, opcional): Versión publicada a analizar (por defecto el borrador)
+    
+    Returns:
+        JSON con:
+            - exito (bool): True si existe la malla (y la versión)
+            - semestres (int): Columnas de la matriz
+            - cursos (dict): curso_id -> fila con un carácter por semestre ('1' = válido)
+            - ubicados (dict): curso_id -> semestre donde ya está (su fila es para moverlo)
+        
+        Status: 200 OK | 400 Bad Request | 404 Not Found
+    """
+    try:
+        numero = int(request.args['version']) if 'version' in request.args else None
+    except ValueError:
+        return responder({
+            'exito': False,
+            'error': 'Datos inválidos'
+        }), 400
+    
+    matriz, error = BaseDatos.elegibilidad(malla_id, numero)
+    
+    if error:
+        return responder({
+            'exito': False,
+            'error': error
+        }), codigo_http(error)
+    
+    return responder({
+        'exito': True,
+        'malla_id': malla_id,
+        'version': numero,
+        **matriz
     })
 
 
@@ -188,9 +402,9 @@ def agregar_curso_malla(malla_id):
             - exito (bool): True si se agregó correctamente
             - curso (dict): Objeto del curso agregado con ID único de malla
         
-        Status: 201 Created | 400 Bad Request | 404 Not Found
+        Status: 201 Created | 400 Bad Request (curso ya en la malla) | 404 Not Found
     """
-    data = request.json
+    data = leer_cuerpo()
     
     try:
         curso_id = data.get('curso_id')
@@ -198,7 +412,7 @@ def agregar_curso_malla(malla_id):
         posicion_y = int(data.get('posicion_y', 0))
         semestre = int(data.get('semestre', 1))
     except (ValueError, TypeError):
-        return jsonify({
+        return responder({
             'exito': False,
             'error': 'Datos inválidos'
         }), 400
@@ -208,126 +422,163 @@ def agregar_curso_malla(malla_id):
     )
     
     if error:
-        return jsonify({
+        return responder({
             'exito': False,
             'error': error
-        }), 404
+        }), codigo_http(error)
     
-    return jsonify({
+    return responder({
         'exito': True,
         'mensaje': 'Curso agregado a la malla',
         'curso': nuevo_curso.to_dict()
     }), 201
 
 
-@malla_bp.route('/<malla_id>/cursos-con-prerequisitos', methods=['POST'])
-def agregar_curso_con_prerequisitos(malla_id):
+@malla_bp.route('/<malla_id>/cursos', methods=['GET'])
+def obtener_cursos_malla(malla_id):
+    """
+    Obtiene los cursos de la malla, opcionalmente solo los visibles en una ventana.
+    
+    Usa el índice espacial de la malla, por lo que al desplazar el canvas de
+    una malla grande solo se transfieren las tarjetas visibles.
+    
+    Endpoint: GET /api/mallas/{malla_id}/cursos?bbox=x0,y0,x1,y1
+    
+    Query params:
+        - bbox (str, opcional): Rectángulo visible en píxeles "x0,y0,x1,y1"
+    
+    Returns:
+        JSON con:
+            - exito (bool): True si se encontró la malla
+            - total (int): Cantidad de cursos retornados
+            - cursos (list): Cursos cuya tarjeta intersecta la ventana
+        
+        Status: 200 OK | 400 Bad Request | 404 Not Found
     """
-    Agrega un curso a la malla junto con sus prerequisitos RECURSIVAMENTE
-    Backend Flask independiente - sin dependencias externas
+    bbox = request.args.get('bbox')
+    
+    if bbox is None:
+        malla = BaseDatos.obtener_malla(malla_id)
+        cursos, error = (malla.cursos, None) if malla else (None, 'Malla no encontrada')
+    else:
+        try:
+            x0, y0, x1, y1 = (int(float(v)) for v in bbox.split(','))
+        except (ValueError, TypeError):
+            return responder({
+                'exito': False,
+                'error': 'bbox inválido, se espera x0,y0,x1,y1'
+            }), 400
+        cursos, error = BaseDatos.buscar_cursos_en_area(malla_id, x0, y0, x1, y1)
+    
+    if error:
+        return responder({
+            'exito': False,
+            'error': error
+        }), 404
+    
+    return responder({
+        'exito': True,
+        'total': len(cursos),
+        'cursos': [c.to_dict() for c in cursos]
+    })
+
+
+@malla_bp.route('/<malla_id>/solapamientos', methods=['GET'])
+def detectar_solapamientos(malla_id):
     """
-    data = request.json
+    Detecta qué tarjetas quedarían solapadas al soltar un curso en una posición.
     
+    Endpoint: GET /api/mallas/{malla_id}/solapamientos?posicion_x=&posicion_y=&excluir=
+    
+    Query params:
+        - posicion_x (int): Posición horizontal de la tarjeta soltada
+        - posicion_y (int): Posición vertical de la tarjeta soltada
+        - excluir (str, opcional): ID del curso en malla que se está moviendo
+    
+    Returns:
+        JSON con:
+            - exito (bool): True si se encontró la malla
+            - hay_solapamiento (bool): True si alguna tarjeta se solapa
+            - cursos (list): Cursos solapados
+        
+        Status: 200 OK | 400 Bad Request | 404 Not Found
+    """
     try:
-        curso_id = data.get('curso_id')
-        posicion_x = int(data.get('posicion_x', 0))
-        posicion_y = int(data.get('posicion_y', 0))
-        semestre = int(data.get('semestre', 1))
-    except (ValueError, TypeError):
-        return jsonify({
+        posicion_x = int(request.args['posicion_x'])
+        posicion_y = int(request.args['posicion_y'])
+    except (KeyError, ValueError, TypeError):
+        return responder({
             'exito': False,
             'error': 'Datos inválidos'
         }), 400
     
-    # Obtener malla actual
-    malla_actual = BaseDatos.obtener_malla(malla_id)
-    if not malla_actual:
-        return jsonify({
-            'exito': False,
-            'error': 'Malla no encontrada'
-        }), 404
+    cursos, error = BaseDatos.detectar_solapamientos(
+        malla_id, posicion_x, posicion_y, request.args.get('excluir')
+    )
     
-    # Verificar si el curso existe
-    curso = BaseDatos.obtener_curso(curso_id)
-    if not curso:
-        return jsonify({
+    if error:
+        return responder({
             'exito': False,
-            'error': 'Curso no encontrado'
+            'error': error
         }), 404
     
-    # Obtener cursos actuales en la malla
-    cursos_en_malla = {mc.curso_id for mc in malla_actual.cursos}
-    
-    # Obtener prerequisitos recursivos
-    prerequisitos_arbol = obtener_prerequisitos_recursivos(curso_id)
+    return responder({
+        'exito': True,
+        'hay_solapamiento': len(cursos) > 0,
+        'cursos': [c.to_dict() for c in cursos]
+    })
+
+
+@malla_bp.route('/<malla_id>/cursos-con-prerequisitos', methods=['POST'])
+def agregar_curso_con_prerequisitos(malla_id):
+    """
+    Agrega un curso a la malla junto con sus prerequisitos RECURSIVAMENTE.
     
-    # Marcar cuáles están presentes
-    for prereq in prerequisitos_arbol:
-        prereq["presente_en_malla"] = prereq["id"] in cursos_en_malla
+    El nivel se ajusta al mínimo permitido por la cadena de prerequisitos y
+    las columnas afectadas se reubican con el motor de layout.
     
-    # Calcular nivel mínimo
-    nivel_minimo = calcular_nivel_minimo(curso_id)
+    Status: 201 Created | 400 Bad Request (datos inválidos o curso duplicado) | 404 Not Found
+    """
+    data = leer_cuerpo()
     
-    # Validar y ajustar nivel si es necesario
-    nivel_valido = semestre >= nivel_minimo
-    semestre_final = semestre if nivel_valido else nivel_minimo
+    try:
+        curso_id = data.get('curso_id')
+        posicion_x = int(data.get('posicion_x', 0))
+        posicion_y = int(data.get('posicion_y', 0))
+        semestre = int(data.get('semestre', 1))
+    except (ValueError, TypeError):
+        return responder({
+            'exito': False,
+            'error': 'Datos inválidos'
+        }), 400
     
-    # Agregar el curso principal
-    nuevo_curso, error = BaseDatos.agregar_curso_malla(
-        malla_id, curso_id, posicion_x, posicion_y, semestre_final
+    plan, error = BaseDatos.agregar_curso_con_prerequisitos(
+        malla_id, curso_id, posicion_x, posicion_y, semestre
     )
     
     if error:
-        return jsonify({
+        return responder({
             'exito': False,
             'error': error
-        }), 404
+        }), codigo_http(error)
     
-    # Agregar prerequisitos faltantes
-    prerequisitos_agregados = []
-    prerequisitos_ordenados = sorted(prerequisitos_arbol, key=lambda x: x.get('profundidad', 0), reverse=True)
-    
-    for prereq in prerequisitos_ordenados:
-        if not prereq["presente_en_malla"]:
-            nivel_prereq = semestre_final - prereq["profundidad"]
-            nivel_prereq = max(1, nivel_prereq)
-            
-            prereq_curso, _ = BaseDatos.agregar_curso_malla(
-                malla_id,
-                prereq['id'],
-                posicion_x - 150,
-                posicion_y + (len(prerequisitos_agregados) * 60),
-                nivel_prereq
-            )
-            if prereq_curso:
-                prerequisitos_agregados.append(prereq_curso.to_dict())
-                cursos_en_malla.add(prereq['id'])
-    
-    return jsonify({
+    return responder({
         'exito': True,
-        'curso_principal': nuevo_curso.to_dict(),
-        'prerequisitos_agregados': prerequisitos_agregados,
-        'info_niveles': {
-            'nivel_solicitado': semestre,
-            'nivel_usado': semestre_final,
-            'ajustado': not nivel_valido,
-            'nivel_minimo': nivel_minimo,
-            'profundidad_arbol': max([p["profundidad"] for p in prerequisitos_arbol]) if prerequisitos_arbol else 0
-        }
+        **plan.to_dict()
     }), 201
 
 
 @malla_bp.route('/<malla_id>/cursos/<curso_malla_id>', methods=['PUT'])
 def actualizar_posicion_curso(malla_id, curso_malla_id):
     """Actualiza la posición y/o semestre de un curso en la malla"""
-    data = request.json
+    data = leer_cuerpo()
     
     try:
         posicion_x = int(data.get('posicion_x', 0))
         posicion_y = int(data.get('posicion_y', 0))
         semestre = int(data.get('semestre')) if 'semestre' in data else None
     except (ValueError, TypeError):
-        return jsonify({
+        return responder({
             'exito': False,
             'error': 'Datos inválidos'
         }), 400
@@ -337,12 +588,12 @@ def actualizar_posicion_curso(malla_id, curso_malla_id):
     )
     
     if error:
-        return jsonify({
+        return responder({
             'exito': False,
             'error': error
         }), 404
     
-    return jsonify({
+    return responder({
         'exito': True,
         'mensaje': 'Posición actualizada',
         'curso': curso.to_dict()
@@ -351,16 +602,167 @@ def actualizar_posicion_curso(malla_id, curso_malla_id):
 
 @malla_bp.route('/<malla_id>/cursos/<curso_malla_id>', methods=['DELETE'])
 def eliminar_curso_malla(malla_id, curso_malla_id):
-    """Elimina un curso de la malla"""
-    exito, error = BaseDatos.eliminar_curso_malla(malla_id, curso_malla_id)
+    """
+    Elimina un curso de la malla teniendo en cuenta los cursos que dependen de él.
+    
+    Los dependientes (directos e indirectos) se buscan con el índice inverso del
+    catálogo recorriendo solo cursos ubicados, así el costo es proporcional a lo
+    afectado y no al tamaño de la malla.
+    
+    Endpoint: DELETE /api/mallas/{malla_id}/cursos/{curso_malla_id}?modo=
+    
+    Query params:
+        - modo (str, opcional):
+            - preview: no elimina, solo informa los dependientes
+            - block: elimina solo si ningún curso ubicado depende de este (si no, 409)
+            - cascade: elimina el curso y todos sus dependientes en un solo cambio
+              (se deshace de una vez)
+            - sin modo: elimina solo la ubicación e informa los dependientes que
+              quedaron sin el prerequisito
+    
+    Returns:
+        JSON con:
+            - exito (bool): True si se eliminó (o se calculó el impacto, en preview)
+            - modo (str): Modo aplicado
+            - curso (dict): Ubicación pedida
+            - dependientes (list): Ubicaciones dependientes con su profundidad
+            - eliminados (list): IDs de las ubicaciones eliminadas
+        
+        Status: 200 OK | 400 Bad Request | 404 Not Found | 409 Conflict
+    """
+    modo, error = validar_modo_eliminacion(request.args.get('modo'))
+    if error:
+        return responder({
+            'exito': False,
+            'error': error
+        }), codigo_http(error)
+    
+    plan, error = BaseDatos.eliminar_curso_malla(malla_id, curso_malla_id, modo)
+    
+    if error:
+        respuesta = {
+            'exito': False,
+            'error': error
+        }
+        if plan is not None:
+            respuesta.update(plan.to_dict())
+        return responder(respuesta), codigo_http(error)
+    
+    if modo == PREVIEW:
+        return responder({
+            'exito': True,
+            'modo': modo,
+            **plan.to_dict()
+        })
+    
+    eliminados = list(plan.ids) if modo == CASCADE else [curso_malla_id]
+    return responder({
+        'exito': True,
+        'mensaje': 'Curso eliminado de la malla' if len(eliminados) == 1
+                   else f'Curso y {len(eliminados) - 1} dependientes eliminados de la malla',
+        'modo': modo,
+        'eliminados': eliminados,
+        **plan.to_dict()
+    })
+
+
+
+def _revertir(malla_id, revertir, mensaje):
+    malla, error = revertir(malla_id)
+    
+    if error:
+        return responder({
+            'exito': False,
+            'error': error,
+            'historial': BaseDatos.pendientes_historial(malla_id)
+        }), codigo_http(error)
+    
+    return responder({
+        'exito': True,
+        'mensaje': mensaje,
+        'historial': BaseDatos.pendientes_historial(malla_id),
+        'malla': malla.to_dict()
+    })
+
+
+@malla_bp.route('/<malla_id>/deshacer', methods=['POST'])
+def deshacer(malla_id):
+    """
+    Deshace la última edición de la sesión sobre la malla.
+    
+    Cada mutación (agregar, mover, eliminar, layout, metadatos) guarda su
+    operación inversa en un historial acotado por sesión y malla.
+    
+    Endpoint: POST /api/mallas/{malla_id}/deshacer
+    
+    Headers:
+        - X-Sesion (str, opcional): Identificador de la sesión del editor
+    
+    Returns:
+        JSON con:
+            - exito (bool): True si se deshizo un cambio
+            - historial (dict): Cambios restantes para deshacer / rehacer
+            - malla (dict): Malla resultante
+        
+        Status: 200 OK | 404 Not Found | 409 Conflict (nada que deshacer)
+    """
+    return _revertir(malla_id, BaseDatos.deshacer, 'Cambio deshecho')
+
+
+@malla_bp.route('/<malla_id>/rehacer', methods=['POST'])
+def rehacer(malla_id):
+    """
+    Rehace la última edición deshecha por la sesión.
+    Una edición nueva descarta los cambios que se podían rehacer.
+    
+    Endpoint: POST /api/mallas/{malla_id}/rehacer
+    
+    Status: 200 OK | 404 Not Found | 409 Conflict (nada que rehacer)
+    """
+    return _revertir(malla_id, BaseDatos.rehacer, 'Cambio rehecho')
+
+
+@malla_bp.route('/<malla_id>/layout', methods=['POST'])
+def calcular_layout_malla(malla_id):
+    """
+    Recalcula las posiciones de todos los cursos de la malla en el servidor.
+    
+    Agrupa los cursos en columnas por semestre y ordena cada columna para
+    minimizar los cruces entre prerequisitos.
+    
+    Endpoint: POST /api/mallas/{malla_id}/layout
+    
+    Body (JSON, opcional):
+        - semestres (list[int]): Solo reubicar estas columnas (layout incremental)
+    
+    Returns:
+        JSON con:
+            - exito (bool): True si se aplicó el layout
+            - cursos_actualizados (int): Cantidad de cursos reubicados
+            - malla (dict): Malla con las nuevas posiciones
+        
+        Status: 200 OK | 400 Bad Request | 404 Not Found
+    """
+    data = leer_cuerpo(silencioso=True) or {}
     
-    if not exito:
-        return jsonify({
+    try:
+        semestres = [int(s) for s in data['semestres']] if data.get('semestres') is not None else None
+    except (ValueError, TypeError):
+        return responder({
+            'exito': False,
+            'error': 'Datos inválidos'
+        }), 400
+    
+    actualizados, error = BaseDatos.aplicar_layout(malla_id, semestres)
+    
+    if error:
+        return responder({
             'exito': False,
             'error': error
         }), 404
     
-    return jsonify({
+    return responder({
         'exito': True,
-        'mensaje': 'Curso eliminado de la malla'
+        'cursos_actualizados': len(actualizados),
+        'malla': BaseDatos.obtener_malla(malla_id).to_dict()
     })
@@ -0,0 +1,156 @@
+"""
+Rutas de trabajos pesados - Flask Blueprint
+Los cómputos largos sobre una malla se encolan y corren en procesos aparte
+(motor_malla.trabajos); el hilo de la petición solo los encola y consulta.
+"""
+import json
+
+from flask import Blueprint, Response, stream_with_context
+from app.formatos import responder, leer_cuerpo
+from models.base_datos import BaseDatos
+from motor_malla.errores import codigo_http
+
+trabajos_bp = Blueprint('trabajos', __name__, url_prefix='/api/jobs')
+
+# Segundos entre comentarios de keep-alive del stream de eventos
+KEEPALIVE = 15
+
+
+@trabajos_bp.route('', methods=['POST'])
+def enviar_trabajo():
+    """
+    Encola un cómputo sobre una malla (borrador o versión publicada).
+    
+    Endpoint: POST /api/jobs
+    
+    Body (JSON):
+        {
+            "tipo": "layout" | "ruta_critica" | "validacion",
+            "malla_id": "MALLA001",
+            "version": 2,          (opcional, por defecto el borrador)
+            "timeout": 30          (opcional, segundos; tope MALLA_TRABAJOS_TIMEOUT)
+        }
+    
+    Returns:
+        JSON con:
+            - exito (bool): True si se encoló
+            - trabajo (dict): id, estado, progreso, etc. (consultar en /api/jobs/{id})
+        
+        Status: 202 Accepted | 400 Bad Request | 404 Not Found | 503 Service Unavailable
+    """
+    data = leer_cuerpo()
+    
+    try:
+        tipo = data['tipo']
+        malla_id = data['malla_id']
+        numero = int(data['version']) if data.get('version') is not None else None
+        timeout = float(data['timeout']) if data.get('timeout') is not None else None
+        if timeout is not None and timeout <= 0:
+            raise ValueError(timeout)
+    except (KeyError, ValueError, TypeError):
+        return responder({
+            'exito': False,
+            'error': 'Datos inválidos'
+        }), 400
+    
+    trabajo, error = BaseDatos.enviar_trabajo(tipo, malla_id, numero, timeout)
+    
+    if error:
+        return responder({
+            'exito': False,
+            'error': error
+        }), codigo_http(error)
+    
+    respuesta = responder({
+        'exito': True,
+        'trabajo': trabajo.to_dict()
+    }, 202)
+    respuesta.headers['Location'] = f'/api/jobs/{trabajo.id}'
+    return respuesta
+
+
+@trabajos_bp.route('/<trabajo_id>', methods=['GET'])
+def obtener_trabajo(trabajo_id):
+    """
+    Estado de un trabajo; incluye `resultado` cuando terminó.
+    
+    Endpoint: GET /api/jobs/{trabajo_id}
+    
+    Status: 200 OK | 404 Not Found
+    """
+    trabajo, error = BaseDatos.obtener_trabajo(trabajo_id)
+    
+    if error:
+        return responder({
+            'exito': False,
+            'error': error
+        }), codigo_http(error)
+    
+    return responder({
+        'exito': True,
+        'trabajo': trabajo.to_dict()
+    })
+
+
+@trabajos_bp.route('/<trabajo_id>/eventos', methods=['GET'])
+def eventos_trabajo(trabajo_id):
+    """
+    Stream de eventos (text/event-stream) con el estado del trabajo en cada
+    cambio de estado o de avance. Se cierra cuando el trabajo termina; el
+    último evento trae el resultado.
+    
+    Endpoint: GET /api/jobs/{trabajo_id}/eventos
+    
+    Status: 200 OK | 404 Not Found
+    """
+    trabajo, error = BaseDatos.obtener_trabajo(trabajo_id)
+    
+    if error:
+        return responder({
+            'exito': False,
+            'error': error
+        }), codigo_http(error)
+    
+    def eventos():
+        revision = None
+        while True:
+            actual = BaseDatos.esperar_trabajo(trabajo_id, revision, KEEPALIVE)
+            if actual is None:  # Se descartó de los retenidos
+                return
+            if actual.revision == revision:
+                yield ': keep-alive\n\n'
+                continue
+            revision = actual.revision
+            yield f'data: {json.dumps(actual.to_dict())}\n\n'
+            if actual.final:
+                return
+    
+    return Response(stream_with_context(eventos()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
+
+@trabajos_bp.route('/<trabajo_id>', methods=['DELETE'])
+def cancelar_trabajo(trabajo_id):
+    """
+    Cancela un trabajo: si está pendiente sale de la cola, si se está
+    ejecutando se termina su proceso.
+    
+    Endpoint: DELETE /api/jobs/{trabajo_id}
+    
+    Status: 200 OK | 404 Not Found | 409 Conflict (ya terminó)
+    """
+    trabajo, error = BaseDatos.cancelar_trabajo(trabajo_id)
+    
+    if error:
+        respuesta = {
+            'exito': False,
+            'error': error
+        }
+        if trabajo is not None:
+            respuesta['trabajo'] = trabajo.to_dict()
+        return responder(respuesta), codigo_http(error)
+    
+    return responder({
+        'exito': True,
+        'trabajo': trabajo.to_dict()
+    })
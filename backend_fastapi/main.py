@@ -1,20 +1,387 @@
 """
 Backend completo en FastAPI - Alternativa a Flask
 Puerto 8002
+La lógica de dominio vive en el motor compartido (motor_malla), igual que en Flask
 """
-from fastapi import FastAPI, HTTPException
+import sys
+from pathlib import Path
+
+# El motor de dominio compartido (motor_malla) vive en la raíz del repositorio
+_RAIZ_REPOSITORIO = str(Path(__file__).resolve().parents[1])
+if _RAIZ_REPOSITORIO not in sys.path:
+    sys.path.insert(0, _RAIZ_REPOSITORIO)
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.routing import APIRoute
+from starlette.datastructures import Headers, QueryParams
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from pydantic import BaseModel
-from typing import List, Optional, Dict
-from dataclasses import dataclass, field, asdict
-from datetime import datetime
+from typing import Callable, List, Optional
+from dataclasses import replace
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+import asyncio
+import json
+import time
 import uuid
 
+from motor_malla import MallaCurso, contar_agregado, id_uuid, planificar_agregado
+from motor_malla.operaciones import BLOCK, CASCADE, PREVIEW, consultar_dependientes, validar_modo_eliminacion
+from motor_malla.admision import ControlAdmision
+from motor_malla.administracion import token_admin_valido
+from motor_malla.calentamiento import Preparacion
+from motor_malla.errores import (
+    CURSO_CON_DEPENDIENTES, CURSO_DUPLICADO, CURSO_MALLA_NO_ENCONTRADO, CURSO_NO_ENCONTRADO, ESTADO_INVALIDO,
+    MALLA_NO_ENCONTRADA, NADA_QUE_DESHACER, NADA_QUE_REHACER, SERVICIO_SATURADO, TOKEN_ADMIN_INVALIDO,
+    UBICACIONES_REPETIDAS, VERSION_NO_ENCONTRADA, codigo_http
+)
+from motor_malla.diff import comparar_mallas, parsear_referencia
+from motor_malla.historial import DESHACER, REHACER, SESION_ANONIMA, Cambio, Historial, opuesta
+from motor_malla.listado import decodificar_cursor, normalizar_limite
+from motor_malla.modelos import CAMPOS_EDITABLES_MALLA, ESTADOS_MALLA
+from motor_malla.formatos import (
+    CBOR, JSON, MSGPACK, TIPOS_MIME, codificar, decodificar, modulo_codificador, negociar_formato
+)
+from motor_malla.layout import reubicar
+from motor_malla.metricas import EN_CURSO, METRICAS, TIPO_CONTENIDO, familias_dominio, registrar_peticion
+from motor_malla.perfilado import MODO_COLAPSADO, Perfilador, modo_solicitado
+from motor_malla.trabajos import ColaTrabajos, preparar_datos
+from motor_malla.trazas import TRAZADOR, configurar_trazas, span
+from repositorio import RepositorioMallas, crear_repositorio
+from tiempo_real import CUADRO_INVALIDO, Salas, validar_cuadro
+
+# ==================== FORMATOS (JSON / MessagePack / CBOR) ====================
+
+# Formato negociado para la respuesta de la petición en curso
+_FORMATO_RESPUESTA: ContextVar[str] = ContextVar("formato_respuesta", default=JSON)
+
+
+class RespuestaNegociada(JSONResponse):
+    """Respuesta que se codifica en el formato negociado con el header Accept"""
+
+    def __init__(self, content=None, status_code: int = 200, headers=None, media_type=None, background=None):
+        self.formato = _FORMATO_RESPUESTA.get()
+        if media_type is None and self.formato != JSON:
+            media_type = self.formato
+        super().__init__(content, status_code, headers, media_type, background)
+        self.headers["Vary"] = "Accept"
+
+    def render(self, content) -> bytes:
+        with span("respuesta.serializar", formato=self.formato):
+            if self.formato == JSON:
+                return super().render(content)
+            return codificar(content, self.formato)
+
+
+class PeticionTrazada(Request):
+    """Petición JSON cuyo parseo del cuerpo queda registrado en un span"""
+
+    async def json(self):
+        if not hasattr(self, "_json"):
+            with span("cuerpo.parsear", formato=JSON):
+                return await super().json()
+        return self._json
+
+
+class PeticionBinaria(Request):
+    """Petición cuyo cuerpo MessagePack/CBOR se expone a FastAPI como si fuera JSON"""
+
+    def __init__(self, scope, receive, formato: str):
+        super().__init__(scope, receive)
+        self.formato_cuerpo = formato
+
+    async def json(self):
+        if not hasattr(self, "_json"):
+            with span("cuerpo.parsear", formato=self.formato_cuerpo):
+                self._json = decodificar(await self.body(), self.formato_cuerpo)
+        return self._json
+
+
+class RutaNegociada(APIRoute):
+    """Ruta que negocia el formato de respuesta y acepta cuerpos binarios"""
+
+    def get_route_handler(self) -> Callable:
+        manejador_original = super().get_route_handler()
+
+        async def manejador(request: Request) -> Response:
+            token = _FORMATO_RESPUESTA.set(negociar_formato(request.headers.get("accept", "")))
+            try:
+                tipo = TIPOS_MIME.get(request.headers.get("content-type", "").split(";")[0].strip().lower())
+                if tipo in (MSGPACK, CBOR):
+                    if modulo_codificador(tipo) is None:
+                        raise HTTPException(status_code=415, detail="Formato de cuerpo no soportado")
+                    scope = dict(request.scope)
+                    scope["headers"] = [
+                        (k, JSON.encode() if k == b"content-type" else v) for k, v in request.scope["headers"]
+                    ]
+                    request = PeticionBinaria(scope, request.receive, tipo)
+                elif TRAZADOR.activo:
+                    request = PeticionTrazada(request.scope, request.receive)
+                return await manejador_original(request)
+            finally:
+                _FORMATO_RESPUESTA.reset(token)
+
+        return manejador
+
+
+# ==================== MÉTRICAS ====================
+
+class MedicionPeticiones:
+    """
+    Middleware ASGI que registra cada petición en las métricas: ruta (la
+    plantilla, p. ej. /api/mallas/{malla_id}), código, latencia y bytes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        metodo = scope["method"]
+        respuesta = {"codigo": 500, "bytes": 0}
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                respuesta["codigo"] = mensaje["status"]
+            elif mensaje["type"] == "http.response.body":
+                respuesta["bytes"] += len(mensaje.get("body", b""))
+            await send(mensaje)
+
+        inicio = time.perf_counter()
+        EN_CURSO.inc(metodo)
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            EN_CURSO.dec(metodo)
+            # El router deja la ruta que coincidió en el scope
+            ruta = getattr(scope.get("route"), "path", None)
+            registrar_peticion(metodo, ruta, respuesta["codigo"], time.perf_counter() - inicio, respuesta["bytes"])
+
+
+# ==================== CONTROL DE ADMISIÓN ====================
+
+class AdmisionPeticiones:
+    """
+    Middleware ASGI con cupos por clase de ruta (lecturas / mutaciones /
+    pesadas): lo que no entra ni en la cola se rechaza con 503 + Retry-After
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.control = ControlAdmision(asincrono=True)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        compuerta = self.control.compuerta(scope["method"], scope["path"])
+        if compuerta is None:
+            return await self.app(scope, receive, send)
+        if not await compuerta.entrar():
+            respuesta = JSONResponse(
+                {"detail": SERVICIO_SATURADO}, status_code=503,
+                headers={"Retry-After": str(self.control.reintento)}
+            )
+            return await respuesta(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            compuerta.salir()
+
+
+# ==================== TRAZAS ====================
+
+configurar_trazas("malla-academica-fastapi")
+
+
+class TrazadoPeticiones:
+    """Middleware ASGI que abre el span raíz de cada petición (solo con MALLA_TRAZAS configurado)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not TRAZADOR.activo:
+            return await self.app(scope, receive, send)
+
+        metodo = scope["method"]
+        raiz, token = TRAZADOR.abrir(
+            f"{metodo} {scope['path']}", Headers(scope=scope).get("traceparent"),
+            **{"http.request.method": metodo}
+        )
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                raiz.fijar("http.response.status_code", mensaje["status"])
+            await send(mensaje)
+
+        error = None
+        try:
+            await self.app(scope, receive, enviar)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            # El nombre usa la plantilla de la ruta, que se conoce después del enrutado
+            ruta = getattr(scope.get("route"), "path", None)
+            if ruta:
+                raiz.nombre = f"{metodo} {ruta}"
+                raiz.fijar("http.route", ruta)
+            TRAZADOR.cerrar(raiz, token, error)
+
+
+# ==================== PERFILADO A PEDIDO ====================
+
+class PerfiladoPeticiones:
+    """
+    Middleware ASGI que perfila una petición si lo pide un administrador
+    (header X-Perfilar o ?perfilar=, con X-Admin-Token; ver motor_malla.perfilado)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = Headers(scope=scope)
+        flag = headers.get("x-perfilar")
+        if flag is None and b"perfilar=" in scope.get("query_string", b""):
+            flag = QueryParams(scope["query_string"]).get("perfilar")
+        modo = modo_solicitado(flag, headers.get("x-admin-token"))
+        if modo is None:
+            return await self.app(scope, receive, send)
+
+        perfilador = Perfilador(modo)
+        perfilador.iniciar()
+
+        if modo == MODO_COLAPSADO:
+            # La respuesta del handler se descarta y se reemplaza por las pilas
+            async def descartar(mensaje):
+                pass
+
+            try:
+                await self.app(scope, receive, descartar)
+            finally:
+                perfilador.detener()
+            return await PlainTextResponse(perfilador.resultado)(scope, receive, send)
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                cabeceras = list(mensaje.get("headers", [])) + [(b"x-perfil", perfilador.nombre_archivo.encode())]
+                mensaje = {**mensaje, "headers": cabeceras}
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            perfilador.detener()
+
+
+# ==================== REPOSITORIO ====================
+
+repositorio: RepositorioMallas = crear_repositorio()
+
+
+def obtener_repositorio() -> RepositorioMallas:
+    """Dependencia de FastAPI: repositorio asíncrono de cursos y mallas"""
+    return repositorio
+
+
+class CatalogoConsistente:
+    """
+    Middleware ASGI que fija el catálogo vigente durante toda la petición:
+    una recarga publicada a mitad de camino no la afecta (ver motor_malla.recarga)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = repositorio.fuente_catalogo.fijar()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            repositorio.fuente_catalogo.soltar(token)
+
+
+# ==================== HISTORIAL (DESHACER / REHACER) ====================
+
+historial = Historial()
+
+
+def obtener_sesion(x_sesion: Optional[str] = Header(None)) -> str:
+    """Dependencia de FastAPI: sesión del editor (header X-Sesion)"""
+    return x_sesion or SESION_ANONIMA
+
+
+async def aplicar_cambio(repo: RepositorioMallas, sesion: str, malla_id: str, cambio: Cambio):
+    """Aplica un cambio y registra su inverso en el historial de la sesión"""
+    inverso = await repo.aplicar_cambio(malla_id, cambio)
+    if inverso is None:
+        raise HTTPException(status_code=404, detail=MALLA_NO_ENCONTRADA)
+    historial.registrar(sesion, malla_id, inverso)
+
+
+# ==================== CALENTAMIENTO (/ready) ====================
+
+preparacion = Preparacion()
+
+
+async def calentar():
+    """Calienta el repositorio; /ready responde 200 solo cuando termina"""
+    try:
+        await repositorio.calentar(preparacion)
+    except Exception as error:
+        preparacion.terminar(error)
+    else:
+        preparacion.terminar()
+
+
+# Cómputos pesados en procesos aparte (los procesos se crean con el primer trabajo)
+trabajos = ColaTrabajos()
+
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    # En segundo plano: /health responde mientras tanto y /ready da 503
+    tarea_calentamiento = asyncio.create_task(calentar())
+    # Con MALLA_CATALOGO, el catálogo se recarga solo cuando cambia el archivo
+    repositorio.fuente_catalogo.vigilar()
+    yield
+    repositorio.fuente_catalogo.detener()
+    trabajos.detener()
+    tarea_calentamiento.cancel()
+    await repositorio.cerrar()
+
+
 app = FastAPI(
     title="Malla Académica - Backend FastAPI",
     description="Backend completo en FastAPI para comparar con Flask",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=RespuestaNegociada,
+    lifespan=ciclo_de_vida
 )
+app.router.route_class = RutaNegociada
+
+
+@app.exception_handler(StarletteHTTPException)
+async def manejar_error_http(request: Request, exc: StarletteHTTPException):
+    """Los errores también respetan el formato pedido en Accept"""
+    token = _FORMATO_RESPUESTA.set(negociar_formato(request.headers.get("accept", "")))
+    try:
+        return RespuestaNegociada(
+            {"detail": exc.detail}, status_code=exc.status_code, headers=getattr(exc, "headers", None)
+        )
+    finally:
+        _FORMATO_RESPUESTA.reset(token)
 
 # Configurar CORS
 app.add_middleware(
@@ -24,207 +391,11 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-# ==================== MODELOS ====================
-
-@dataclass
-class Curso:
-    id: str
-    nombre: str
-    codigo: str
-    creditos: int
-    semestre: int
-    descripcion: str = ""
-    prerequisitos: List[str] = field(default_factory=list)
-    dificultad: str = "facil"
-    horas: int = 48
-
-@dataclass
-class MallaCurso:
-    id: str
-    curso_id: str
-    posicion_x: int
-    posicion_y: int
-    semestre: int
-
-@dataclass
-class Malla:
-    id: str
-    nombre: str
-    programa: str
-    cursos: List[MallaCurso] = field(default_factory=list)
-    fecha_creacion: str = field(default_factory=lambda: datetime.now().isoformat())
-    periodo_vigencia: str = "202420"
-    creditos_programa: int = 48
-    numero_niveles: int = 4
-
-# ==================== BASE DE DATOS SIMULADA ====================
-
-CURSOS_DB = {
-    "PROG101": Curso(
-        id="PROG101",
-        nombre="Introducción a la Programación",
-        codigo="PROG101",
-        creditos=3,
-        semestre=1,
-        descripcion="Conceptos básicos de programación",
-        prerequisitos=[],
-        dificultad="facil",
-        horas=48
-    ),
-    "PROG102": Curso(
-        id="PROG102",
-        nombre="Programación Orientada a Objetos",
-        codigo="PROG102",
-        creditos=4,
-        semestre=2,
-        descripcion="POO y patrones de diseño",
-        prerequisitos=["PROG101"],
-        dificultad="intermedio",
-        horas=64
-    ),
-    "PROG103": Curso(
-        id="PROG103",
-        nombre="Estructuras de Datos",
-        codigo="PROG103",
-        creditos=4,
-        semestre=3,
-        descripcion="Listas, árboles, grafos",
-        prerequisitos=["PROG102"],
-        dificultad="intermedio",
-        horas=64
-    ),
-    "PROG104": Curso(
-        id="PROG104",
-        nombre="Algoritmos Avanzados",
-        codigo="PROG104",
-        creditos=4,
-        semestre=4,
-        descripcion="Complejidad y optimización",
-        prerequisitos=["PROG103"],
-        dificultad="dificil",
-        horas=64
-    ),
-    "BD101": Curso(
-        id="BD101",
-        nombre="Bases de Datos I",
-        codigo="BD101",
-        creditos=3,
-        semestre=3,
-        descripcion="SQL y modelado relacional",
-        prerequisitos=["PROG101"],
-        dificultad="facil",
-        horas=48
-    ),
-    "BD102": Curso(
-        id="BD102",
-        nombre="Bases de Datos II",
-        codigo="BD102",
-        creditos=3,
-        semestre=4,
-        descripcion="NoSQL y BigData",
-        prerequisitos=["BD101"],
-        dificultad="intermedio",
-        horas=48
-    ),
-    "MATH101": Curso(
-        id="MATH101",
-        nombre="Matemáticas Discretas",
-        codigo="MATH101",
-        creditos=4,
-        semestre=1,
-        descripcion="Lógica y teoría de conjuntos",
-        prerequisitos=[],
-        dificultad="intermedio",
-        horas=64
-    ),
-    "MATH102": Curso(
-        id="MATH102",
-        nombre="Cálculo",
-        codigo="MATH102",
-        creditos=3,
-        semestre=2,
-        descripcion="Derivadas e integrales",
-        prerequisitos=["MATH101"],
-        dificultad="intermedio",
-        horas=48
-    ),
-    "WEB101": Curso(
-        id="WEB101",
-        nombre="Desarrollo Web I",
-        codigo="WEB101",
-        creditos=3,
-        semestre=2,
-        descripcion="HTML, CSS, JavaScript",
-        prerequisitos=["PROG101"],
-        dificultad="facil",
-        horas=48
-    ),
-    "WEB102": Curso(
-        id="WEB102",
-        nombre="Desarrollo Web II",
-        codigo="WEB102",
-        creditos=3,
-        semestre=3,
-        descripcion="React, Node.js",
-        prerequisitos=["WEB101", "PROG102"],
-        dificultad="intermedio",
-        horas=48
-    ),
-}
-
-MALLAS_DB = {
-    "MALLA001": Malla(
-        id="MALLA001",
-        nombre="",  # Sin nombre predeterminado, el usuario debe ingresarlo
-        programa="Ingeniería de Sistemas",
-        cursos=[],
-        periodo_vigencia="202420",
-        creditos_programa=48,
-        numero_niveles=4
-    )
-}
-
-# ==================== FUNCIONES AUXILIARES ====================
-
-def obtener_prerequisitos_recursivos(curso_id: str, visitados: set = None) -> List[Dict]:
-    """Obtiene todos los prerequisitos de manera recursiva"""
-    if visitados is None:
-        visitados = set()
-    
-    if curso_id in visitados or curso_id not in CURSOS_DB:
-        return []
-    
-    visitados.add(curso_id)
-    prerequisitos_completos = []
-    
-    curso = CURSOS_DB[curso_id]
-    for prereq_id in curso.prerequisitos:
-        if prereq_id in CURSOS_DB:
-            prereq_curso = CURSOS_DB[prereq_id]
-            prerequisitos_completos.append({
-                "id": prereq_id,
-                "nombre": prereq_curso.nombre,
-                "codigo": prereq_curso.codigo,
-                "creditos": prereq_curso.creditos,
-                "dificultad": prereq_curso.dificultad,
-                "horas": prereq_curso.horas,
-                "profundidad": 1
-            })
-            
-            sub_prerequisitos = obtener_prerequisitos_recursivos(prereq_id, visitados)
-            for sub_prereq in sub_prerequisitos:
-                sub_prereq["profundidad"] += 1
-                existe = False
-                for p in prerequisitos_completos:
-                    if p["id"] == sub_prereq["id"]:
-                        p["profundidad"] = max(p["profundidad"], sub_prereq["profundidad"])
-                        existe = True
-                        break
-                if not existe:
-                    prerequisitos_completos.append(sub_prereq)
-    
-    return prerequisitos_completos
+app.add_middleware(CatalogoConsistente)
+app.add_middleware(AdmisionPeticiones)
+app.add_middleware(TrazadoPeticiones)
+app.add_middleware(PerfiladoPeticiones)
+app.add_middleware(MedicionPeticiones)
 
 # ==================== MODELOS PYDANTIC ====================
 
@@ -239,13 +410,40 @@ class ActualizarCursoRequest(BaseModel):
     posicion_x: int
     posicion_y: int
 
+class CrearMallaRequest(BaseModel):
+    programa: str
+    id: Optional[str] = None
+    nombre: Optional[str] = None
+    descripcion: Optional[str] = None
+    periodo_vigencia: Optional[str] = None
+    creditos_programa: Optional[int] = None
+    numero_niveles: Optional[int] = None
+    estado: Optional[str] = None
+
+class CursoMallaRequest(BaseModel):
+    id: Optional[str] = None         # ID de la ubicación (sin curso_id, es el ID del curso)
+    curso_id: Optional[str] = None
+    posicion_x: int = 0
+    posicion_y: int = 0
+    semestre: Optional[int] = None
+    nivel: Optional[int] = None      # Alias de semestre
+
 class ActualizarMallaRequest(BaseModel):
     nombre: Optional[str] = None
     periodo_vigencia: Optional[str] = None
     creditos_programa: Optional[int] = None
     numero_niveles: Optional[int] = None
-    estado: Optional[str] = 'borrador'  # HU-S-05: borrador | publicado
-    cursos: Optional[List[dict]] = None  # HU-S-05: guardar cursos completos
+    estado: Optional[str] = None  # HU-S-05: borrador | publicado (sin enviar no cambia)
+    cursos: Optional[List[CursoMallaRequest]] = None  # HU-S-05: guardar cursos completos
+
+class LayoutRequest(BaseModel):
+    semestres: Optional[List[int]] = None  # None = layout completo
+
+class EnviarTrabajoRequest(BaseModel):
+    tipo: str                        # layout | ruta_critica | validacion
+    malla_id: str
+    version: Optional[int] = None    # None = borrador
+    timeout: Optional[float] = None  # segundos; tope MALLA_TRABAJOS_TIMEOUT
 
 # ==================== ENDPOINTS ====================
 
@@ -259,213 +457,496 @@ async def root():
     }
 
 @app.get("/health")
-async def health():
-    return {"status": "ok", "servicio": "Backend FastAPI"}
+async def health(repo: RepositorioMallas = Depends(obtener_repositorio)):
+    return {
+        "status": "ok", "servicio": "Backend FastAPI",
+        "cache_mallas": await repo.estadisticas_cache(), "catalogo": repo.fuente_catalogo.estado(),
+        "trabajos": trabajos.estado()
+    }
+
+@app.get("/ready")
+async def ready():
+    # Listo para tráfico solo después del calentamiento (para el balanceador)
+    return JSONResponse(preparacion.estado(), status_code=200 if preparacion.listo else 503)
+
+@app.get("/metrics")
+async def metrics(repo: RepositorioMallas = Depends(obtener_repositorio)):
+    # Formato de exposición de Prometheus (no se negocia con Accept)
+    familias = familias_dominio(await repo.estadisticas_cache(), await repo.ubicaciones_por_malla())
+    return Response(METRICAS.exponer(familias), media_type=TIPO_CONTENIDO)
 
 # ==================== CURSOS ====================
 
 @app.get("/api/cursos")
-async def obtener_cursos():
-    cursos_lista = [asdict(curso) for curso in CURSOS_DB.values()]
-    return {"cursos": cursos_lista}
+async def obtener_cursos(request: Request, repo: RepositorioMallas = Depends(obtener_repositorio)):
+    # Cada catálogo publicado es inmutable: la respuesta se codifica una vez por formato
+    # (en el calentamiento o en la recarga)
+    formato = negociar_formato(request.headers.get("accept", ""))
+    contenido = (await repo.obtener_catalogo()).codificado(formato)
+    return Response(contenido, media_type=formato, headers={"Vary": "Accept"})
 
 @app.get("/api/cursos/{curso_id}")
-async def obtener_curso(curso_id: str):
-    if curso_id not in CURSOS_DB:
-        raise HTTPException(status_code=404, detail="Curso no encontrado")
-    return {"curso": asdict(CURSOS_DB[curso_id])}
+async def obtener_curso(curso_id: str, repo: RepositorioMallas = Depends(obtener_repositorio)):
+    curso = await repo.obtener_curso(curso_id)
+    if curso is None:
+        raise HTTPException(status_code=404, detail=CURSO_NO_ENCONTRADO)
+    return {"curso": curso.to_dict()}
+
+@app.get("/api/cursos/{curso_id}/dependientes")
+async def obtener_dependientes(curso_id: str, profundidad: int = 1,
+                               repo: RepositorioMallas = Depends(obtener_repositorio)):
+    # Índice inverso del catálogo: proporcional al resultado; profundidad 0 = todos
+    dependientes, error = consultar_dependientes(await repo.obtener_catalogo(), curso_id, profundidad)
+    if error:
+        raise HTTPException(status_code=codigo_http(error), detail=error)
+    return {"exito": True, "curso_id": curso_id, "total": len(dependientes), "dependientes": dependientes}
 
 # ==================== MALLAS ====================
 
-@app.get("/api/mallas/{malla_id}")
-async def obtener_malla(malla_id: str):
-    if malla_id not in MALLAS_DB:
-        raise HTTPException(status_code=404, detail="Malla no encontrada")
+async def obtener_malla_o_404(repo: RepositorioMallas, malla_id: str):
+    malla = await repo.obtener_malla(malla_id)
+    if malla is None:
+        raise HTTPException(status_code=404, detail=MALLA_NO_ENCONTRADA)
+    return malla
+
+@app.post("/api/mallas", status_code=201)
+async def crear_malla(request: CrearMallaRequest, repo: RepositorioMallas = Depends(obtener_repositorio)):
+    malla, error = await repo.crear_malla(request.model_dump())
+    if error:
+        raise HTTPException(status_code=codigo_http(error), detail=error)
+    return {"exito": True, "mensaje": "Malla creada", "malla": malla.to_dict()}
+
+@app.get("/api/mallas")
+async def listar_mallas(programa: Optional[str] = None, periodo_vigencia: Optional[str] = None,
+                        estado: Optional[str] = None, cursor: Optional[str] = None,
+                        limite: Optional[int] = None,
+                        repo: RepositorioMallas = Depends(obtener_repositorio)):
+    # Filas resumen (sin cursos) en orden de creación, paginadas por cursor
+    despues, error = decodificar_cursor(cursor)
+    if error:
+        raise HTTPException(status_code=codigo_http(error), detail=error)
     
-    malla = MALLAS_DB[malla_id]
-    return {
-        "malla": {
-            "id": malla.id,
-            "nombre": malla.nombre,
-            "programa": malla.programa,
-            "cursos": [asdict(c) for c in malla.cursos],
-            "fecha_creacion": malla.fecha_creacion,
-            "periodo_vigencia": malla.periodo_vigencia,
-            "creditos_programa": malla.creditos_programa,
-            "numero_niveles": malla.numero_niveles
-        }
-    }
+    filtros = {"programa": programa, "periodo_vigencia": periodo_vigencia, "estado": estado}
+    mallas, siguiente_cursor = await repo.listar_mallas(filtros, despues, normalizar_limite(limite))
+    return {"exito": True, "mallas": mallas, "siguiente_cursor": siguiente_cursor}
+
+@app.get("/api/mallas/diff")
+async def comparar_mallas_endpoint(a: Optional[str] = None, b: Optional[str] = None,
+                                   repo: RepositorioMallas = Depends(obtener_repositorio)):
+    # a / b: 'MALLA_ID' (borrador) o 'MALLA_ID@n' (versión n); se empareja por curso_id
+    semestres = []
+    for referencia in (a, b):
+        malla_id, numero, error = parsear_referencia(referencia)
+        if error:
+            raise HTTPException(status_code=codigo_http(error), detail=error)
+        grupo = await repo.obtener_semestres(malla_id, numero)
+        if grupo is None:
+            detalle = MALLA_NO_ENCONTRADA if numero is None else VERSION_NO_ENCONTRADA
+            raise HTTPException(status_code=404, detail=detalle)
+        semestres.append(grupo)
+    
+    return {"exito": True, "a": a, "b": b, **comparar_mallas(*semestres)}
+
+@app.get("/api/mallas/{malla_id}")
+async def obtener_malla(malla_id: str, repo: RepositorioMallas = Depends(obtener_repositorio)):
+    malla = await obtener_malla_o_404(repo, malla_id)
+    return {"malla": malla.to_dict()}
 
 @app.put("/api/mallas/{malla_id}")
-async def actualizar_malla(malla_id: str, request: ActualizarMallaRequest):
+async def actualizar_malla(malla_id: str, request: ActualizarMallaRequest,
+                           repo: RepositorioMallas = Depends(obtener_repositorio),
+                           sesion: str = Depends(obtener_sesion)):
     # Guarda en estado borrador sin validaciones avanzadas (HU-S-05)
-    if malla_id not in MALLAS_DB:
-        raise HTTPException(status_code=404, detail="Malla no encontrada")
-    
-    malla = MALLAS_DB[malla_id]
+    malla = await obtener_malla_o_404(repo, malla_id)
     
-    if request.nombre is not None:
-        malla.nombre = request.nombre
-    if request.periodo_vigencia is not None:
-        malla.periodo_vigencia = request.periodo_vigencia
-    if request.creditos_programa is not None:
-        malla.creditos_programa = request.creditos_programa
-    if request.numero_niveles is not None:
-        malla.numero_niveles = request.numero_niveles
+    # HU-S-05: Guardar estado (borrador/publicado) solo si el cliente lo envía
+    estado = request.estado
+    if estado is not None and estado not in ESTADOS_MALLA:
+        raise HTTPException(status_code=codigo_http(ESTADO_INVALIDO), detail=ESTADO_INVALIDO)
+    # Solo los campos que el cliente envió: los omitidos conservan su valor
+    datos = request.model_dump(exclude={"cursos"}, exclude_unset=True)
+    cambio = Cambio(metadatos=tuple(
+        (campo, datos[campo]) for campo in CAMPOS_EDITABLES_MALLA if datos.get(campo) is not None
+    ))
     
-    # HU-S-05: Guardar estado (borrador/publicado)
-    estado = getattr(request, 'estado', 'borrador')
-    
-    # Si hay cursos nuevos, agregarlos (guardado completo de borrador)
+    # Si hay cursos nuevos, reemplazar las ubicaciones (guardado completo de borrador)
     cursos_data = getattr(request, 'cursos', None)
     if cursos_data is not None:
-        # Actualizar los cursos existentes con la nueva lista
-        malla.cursos = []
-        for curso_dict in cursos_data:
-            curso_existente = next((c for c in CURSOS_DB if c.id == curso_dict['id']), None)
-            if curso_existente:
-                nuevo_curso = CursoMalla(
-                    id=curso_existente.id,
-                    nombre=curso_existente.nombre,
-                    creditos=curso_existente.creditos,
-                    horas=curso_existente.horas,
-                    nivel=curso_dict.get('nivel', 1),
-                    posicion=curso_dict.get('posicion', 0),
-                    codigo=curso_existente.codigo,
-                    prerequisitos_ids=curso_existente.prerequisitos_ids,
-                    prerequisitos_nombres=curso_existente.prerequisitos_nombres,
-                    correquisitos=curso_existente.correquisitos,
-                    tipo=curso_existente.tipo,
-                    validado=curso_existente.validado
-                )
-                malla.cursos.append(nuevo_curso)
+        catalogo = await repo.obtener_catalogo()
+        cursos = []
+        for item in cursos_data:
+            curso_id = item.curso_id or item.id
+            if curso_id in catalogo:
+                cursos.append(MallaCurso(
+                    id=(item.curso_id and item.id) or str(uuid.uuid4()),
+                    curso_id=curso_id,
+                    posicion_x=item.posicion_x,
+                    posicion_y=item.posicion_y,
+                    semestre=next((n for n in (item.semestre, item.nivel) if n is not None), 1)
+                ))
+        if len({c.id for c in cursos}) != len(cursos):
+            raise HTTPException(status_code=codigo_http(UBICACIONES_REPETIDAS), detail=UBICACIONES_REPETIDAS)
+        cambio = replace(cambio, quitar=tuple(c.id for c in malla.cursos), poner=tuple(cursos))
     
-    mensaje = "Malla guardada como borrador exitosamente" if estado == 'borrador' else "Malla actualizada correctamente"
+    # Metadatos y cursos en un solo cambio: se deshacen juntos
+    await aplicar_cambio(repo, sesion, malla_id, cambio)
+    malla = await repo.obtener_malla(malla_id)
+    mensaje = "Malla guardada como borrador exitosamente" if malla.estado == 'borrador' else "Malla actualizada correctamente"
     
-    return {
+    respuesta = {
         "exito": True,
         "mensaje": mensaje,
-        "estado": estado,
-        "malla": {
-            "id": malla.id,
-            "nombre": malla.nombre,
-            "programa": malla.programa,
-            "cursos": [asdict(c) for c in malla.cursos],
-            "fecha_creacion": malla.fecha_creacion,
-            "periodo_vigencia": malla.periodo_vigencia,
-            "creditos_programa": malla.creditos_programa,
-            "numero_niveles": malla.numero_niveles,
-            "estado": estado
-        }
+        "estado": malla.estado,
+        "malla": malla.to_dict()
     }
-
-@app.post("/api/mallas/{malla_id}/cursos-con-prerequisitos")
-async def agregar_curso_con_prerequisitos(malla_id: str, request: AgregarCursoRequest):
-    if malla_id not in MALLAS_DB:
-        raise HTTPException(status_code=404, detail="Malla no encontrada")
     
-    if request.curso_id not in CURSOS_DB:
-        raise HTTPException(status_code=404, detail="Curso no encontrado")
+    # Publicar congela una versión inmutable; el borrador sigue editable
+    if estado == 'publicado':
+        version = await repo.publicar_version(malla_id)
+        respuesta["mensaje"] = f"Malla publicada (versión {version.numero})"
+        respuesta["version"] = version.numero
     
-    malla = MALLAS_DB[malla_id]
+    return respuesta
+
+@app.get("/api/mallas/{malla_id}/versiones")
+async def listar_versiones(malla_id: str, repo: RepositorioMallas = Depends(obtener_repositorio)):
+    await obtener_malla_o_404(repo, malla_id)
+    return {"exito": True, "versiones": await repo.listar_versiones(malla_id)}
+
+@app.get("/api/mallas/{malla_id}/versiones/{numero}")
+async def obtener_version(malla_id: str, numero: int, repo: RepositorioMallas = Depends(obtener_repositorio)):
+    await obtener_malla_o_404(repo, malla_id)
+    version = await repo.obtener_version(malla_id, numero)
+    if version is None:
+        raise HTTPException(status_code=404, detail=VERSION_NO_ENCONTRADA)
+    return {"exito": True, "malla": version.to_dict()}
+
+@app.get("/api/mallas/{malla_id}/ruta-critica")
+async def obtener_ruta_critica(malla_id: str, version: Optional[int] = None,
+                               repo: RepositorioMallas = Depends(obtener_repositorio)):
+    # Cadena de prerequisitos más larga y holgura por curso (borrador o ?version=n)
+    analisis = await repo.ruta_critica(malla_id, version)
+    if analisis is None:
+        await obtener_malla_o_404(repo, malla_id)
+        raise HTTPException(status_code=404, detail=VERSION_NO_ENCONTRADA)
+    return {"exito": True, "malla_id": malla_id, "version": version, **analisis}
+
+@app.get("/api/mallas/{malla_id}/elegibilidad")
+async def obtener_elegibilidad(malla_id: str, version: Optional[int] = None,
+                               repo: RepositorioMallas = Depends(obtener_repositorio)):
+    # Matriz curso × semestre de ubicaciones válidas para el drag (borrador o ?version=n)
+    matriz = await repo.elegibilidad(malla_id, version)
+    if matriz is None:
+        await obtener_malla_o_404(repo, malla_id)
+        raise HTTPException(status_code=404, detail=VERSION_NO_ENCONTRADA)
+    return {"exito": True, "malla_id": malla_id, "version": version, **matriz}
+
+@app.get("/api/mallas/{malla_id}/cursos")
+async def obtener_cursos_malla(malla_id: str, bbox: Optional[str] = None,
+                               repo: RepositorioMallas = Depends(obtener_repositorio)):
+    # Con bbox=x0,y0,x1,y1 solo retorna las tarjetas visibles en esa ventana
+    if bbox is None:
+        cursos = (await obtener_malla_o_404(repo, malla_id)).cursos
+    else:
+        try:
+            x0, y0, x1, y1 = (int(float(v)) for v in bbox.split(','))
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="bbox inválido, se espera x0,y0,x1,y1")
+        await obtener_malla_o_404(repo, malla_id)
+        cursos = await repo.buscar_cursos_en_area(malla_id, x0, y0, x1, y1)
     
-    # Verificar duplicidad
+    return {"exito": True, "total": len(cursos), "cursos": [c.to_dict() for c in cursos]}
+
+@app.get("/api/mallas/{malla_id}/solapamientos")
+async def detectar_solapamientos(malla_id: str, posicion_x: int, posicion_y: int, excluir: Optional[str] = None,
+                                 repo: RepositorioMallas = Depends(obtener_repositorio)):
+    await obtener_malla_o_404(repo, malla_id)
+    cursos = await repo.detectar_solapamientos(malla_id, posicion_x, posicion_y, excluir)
+    return {"exito": True, "hay_solapamiento": len(cursos) > 0, "cursos": [c.to_dict() for c in cursos]}
+
+@app.post("/api/mallas/{malla_id}/cursos", status_code=201)
+async def agregar_curso_malla(malla_id: str, request: AgregarCursoRequest,
+                              repo: RepositorioMallas = Depends(obtener_repositorio),
+                              sesion: str = Depends(obtener_sesion)):
+    # Nivel 1: Drag & Drop simple, sin analizar prerequisitos
+    malla = await obtener_malla_o_404(repo, malla_id)
+    if await repo.obtener_curso(request.curso_id) is None:
+        raise HTTPException(status_code=404, detail=CURSO_NO_ENCONTRADO)
     if any(c.curso_id == request.curso_id for c in malla.cursos):
-        raise HTTPException(status_code=400, detail="El curso ya está en la malla")
+        raise HTTPException(status_code=codigo_http(CURSO_DUPLICADO), detail=CURSO_DUPLICADO)
+    
+    nuevo_curso = MallaCurso(
+        id=id_uuid(request.curso_id, 0),
+        curso_id=request.curso_id,
+        posicion_x=request.posicion_x,
+        posicion_y=request.posicion_y,
+        semestre=request.semestre
+    )
+    await aplicar_cambio(repo, sesion, malla_id, Cambio(poner=(nuevo_curso,)))
     
-    # Obtener cursos actuales en la malla
-    cursos_en_malla = {c.curso_id for c in malla.cursos}
+    return {"exito": True, "mensaje": "Curso agregado a la malla", "curso": nuevo_curso.to_dict()}
+
+@app.post("/api/mallas/{malla_id}/cursos-con-prerequisitos", status_code=201)
+async def agregar_curso_con_prerequisitos(malla_id: str, request: AgregarCursoRequest,
+                                          repo: RepositorioMallas = Depends(obtener_repositorio),
+                                          sesion: str = Depends(obtener_sesion)):
+    malla = await obtener_malla_o_404(repo, malla_id)
     
-    # Obtener prerequisitos recursivos
-    prerequisitos_arbol = obtener_prerequisitos_recursivos(request.curso_id)
+    plan, error = planificar_agregado(
+        await repo.obtener_catalogo(), malla.cursos, request.curso_id,
+        request.posicion_x, request.posicion_y, request.semestre, id_uuid
+    )
+    if error:
+        raise HTTPException(status_code=codigo_http(error), detail=error)
     
-    # Marcar cuáles están presentes
-    for prereq in prerequisitos_arbol:
-        prereq["presente_en_malla"] = prereq["id"] in cursos_en_malla
+    await aplicar_cambio(repo, sesion, malla_id, Cambio(poner=tuple(plan.nuevos + plan.movidos)))
+    contar_agregado(plan)
     
-    # Calcular nivel mínimo
-    if prerequisitos_arbol:
-        max_profundidad = max(p["profundidad"] for p in prerequisitos_arbol)
-        nivel_minimo = max_profundidad + 1
-    else:
-        nivel_minimo = 1
+    return {"exito": True, **plan.to_dict()}
+
+@app.post("/api/mallas/{malla_id}/layout")
+async def calcular_layout_malla(malla_id: str, request: Optional[LayoutRequest] = None,
+                                repo: RepositorioMallas = Depends(obtener_repositorio),
+                                sesion: str = Depends(obtener_sesion)):
+    # Layout en servidor: columnas por semestre ordenadas para minimizar cruces
+    malla = await obtener_malla_o_404(repo, malla_id)
+    catalogo = await repo.obtener_catalogo()
     
-    nivel_valido = request.semestre >= nivel_minimo
-    semestre_final = request.semestre if nivel_valido else nivel_minimo
+    actualizados = reubicar(malla.cursos, catalogo.prerequisitos_de, request.semestres if request else None)
+    if actualizados:
+        await aplicar_cambio(repo, sesion, malla_id, Cambio(poner=tuple(actualizados)))
     
-    # Agregar curso principal
-    nuevo_curso = MallaCurso(
-        id=str(uuid.uuid4()),
-        curso_id=request.curso_id,
+    return {
+        "exito": True,
+        "cursos_actualizados": len(actualizados),
+        "malla": (await repo.obtener_malla(malla_id)).to_dict()
+    }
+
+@app.put("/api/mallas/{malla_id}/cursos/{curso_malla_id}")
+async def actualizar_curso_malla(malla_id: str, curso_malla_id: str, request: ActualizarCursoRequest,
+                                 repo: RepositorioMallas = Depends(obtener_repositorio),
+                                 sesion: str = Depends(obtener_sesion)):
+    malla = await obtener_malla_o_404(repo, malla_id)
+    
+    curso = next((c for c in malla.cursos if c.id == curso_malla_id), None)
+    if curso is None:
+        raise HTTPException(status_code=404, detail=CURSO_MALLA_NO_ENCONTRADO)
+    
+    curso_actualizado = replace(
+        curso,
+        semestre=request.semestre,
         posicion_x=request.posicion_x,
-        posicion_y=request.posicion_y,
-        semestre=semestre_final
+        posicion_y=request.posicion_y
     )
-    malla.cursos.append(nuevo_curso)
+    await aplicar_cambio(repo, sesion, malla_id, Cambio(poner=(curso_actualizado,)))
+    
+    return {"exito": True, "curso": curso_actualizado.to_dict()}
+
+@app.delete("/api/mallas/{malla_id}/cursos/{curso_malla_id}")
+async def eliminar_curso_malla(malla_id: str, curso_malla_id: str, modo: Optional[str] = None,
+                               repo: RepositorioMallas = Depends(obtener_repositorio),
+                               sesion: str = Depends(obtener_sesion)):
+    # modo: preview (solo impacto) | block (409 si hay dependientes) | cascade (todo en un cambio)
+    modo, error = validar_modo_eliminacion(modo)
+    if error:
+        raise HTTPException(status_code=codigo_http(error), detail=error)
+    plan, error = await repo.planificar_eliminacion(malla_id, curso_malla_id)
+    if error:
+        raise HTTPException(status_code=codigo_http(error), detail=error)
     
-    # Agregar prerequisitos faltantes
-    prerequisitos_agregados = []
-    prerequisitos_ordenados = sorted(prerequisitos_arbol, key=lambda x: x.get('profundidad', 0), reverse=True)
+    if modo == PREVIEW:
+        return {"exito": True, "modo": modo, **plan.to_dict()}
+    if modo == BLOCK and plan.dependientes:
+        return JSONResponse(
+            {"exito": False, "error": CURSO_CON_DEPENDIENTES, **plan.to_dict()},
+            status_code=codigo_http(CURSO_CON_DEPENDIENTES)
+        )
     
-    for prereq in prerequisitos_ordenados:
-        if not prereq["presente_en_malla"]:
-            nivel_prereq = semestre_final - prereq["profundidad"]
-            nivel_prereq = max(1, nivel_prereq)
-            
-            prereq_curso = MallaCurso(
-                id=str(uuid.uuid4()),
-                curso_id=prereq['id'],
-                posicion_x=request.posicion_x - 150,
-                posicion_y=request.posicion_y + (len(prerequisitos_agregados) * 60),
-                semestre=nivel_prereq
-            )
-            malla.cursos.append(prereq_curso)
-            prerequisitos_agregados.append(asdict(prereq_curso))
-            cursos_en_malla.add(prereq['id'])
+    eliminados = plan.ids if modo == CASCADE else (curso_malla_id,)
+    await aplicar_cambio(repo, sesion, malla_id, Cambio(quitar=eliminados))
     
     return {
         "exito": True,
-        "curso_principal": asdict(nuevo_curso),
-        "prerequisitos_agregados": prerequisitos_agregados,
-        "info_niveles": {
-            "nivel_solicitado": request.semestre,
-            "nivel_usado": semestre_final,
-            "ajustado": not nivel_valido,
-            "nivel_minimo": nivel_minimo,
-            "profundidad_arbol": max([p["profundidad"] for p in prerequisitos_arbol]) if prerequisitos_arbol else 0
-        }
+        "mensaje": "Curso eliminado correctamente",
+        "modo": modo,
+        "eliminados": list(eliminados),
+        **plan.to_dict()
     }
 
-@app.put("/api/mallas/{malla_id}/cursos/{curso_malla_id}")
-async def actualizar_curso_malla(malla_id: str, curso_malla_id: str, request: ActualizarCursoRequest):
-    if malla_id not in MALLAS_DB:
-        raise HTTPException(status_code=404, detail="Malla no encontrada")
+# ==================== DESHACER / REHACER ====================
+
+async def revertir(repo: RepositorioMallas, sesion: str, malla_id: str, pila: str, vacia: str, mensaje: str):
+    """Aplica el último cambio de `pila` y guarda su inverso en la pila opuesta"""
+    await obtener_malla_o_404(repo, malla_id)
+    cambio = historial.sacar(sesion, malla_id, pila)
+    if cambio is None:
+        raise HTTPException(status_code=codigo_http(vacia), detail=vacia)
     
-    malla = MALLAS_DB[malla_id]
-    curso_encontrado = None
+    inverso = await repo.aplicar_cambio(malla_id, cambio)
+    historial.apilar(sesion, malla_id, opuesta(pila), inverso)
     
-    for curso in malla.cursos:
-        if curso.id == curso_malla_id:
-            curso.semestre = request.semestre
-            curso.posicion_x = request.posicion_x
-            curso.posicion_y = request.posicion_y
-            curso_encontrado = curso
-            break
+    return {
+        "exito": True,
+        "mensaje": mensaje,
+        "historial": historial.tamanos(sesion, malla_id),
+        "malla": (await repo.obtener_malla(malla_id)).to_dict()
+    }
+
+@app.post("/api/mallas/{malla_id}/deshacer")
+async def deshacer(malla_id: str, repo: RepositorioMallas = Depends(obtener_repositorio),
+                   sesion: str = Depends(obtener_sesion)):
+    # Historial acotado por sesión (header X-Sesion) y malla; guarda solo operaciones inversas
+    return await revertir(repo, sesion, malla_id, DESHACER, NADA_QUE_DESHACER, "Cambio deshecho")
+
+@app.post("/api/mallas/{malla_id}/rehacer")
+async def rehacer(malla_id: str, repo: RepositorioMallas = Depends(obtener_repositorio),
+                  sesion: str = Depends(obtener_sesion)):
+    return await revertir(repo, sesion, malla_id, REHACER, NADA_QUE_REHACER, "Cambio rehecho")
+
+# ==================== TRABAJOS ====================
+
+# Segundos entre comentarios de keep-alive del stream de eventos
+KEEPALIVE_EVENTOS = 15
+
+def trabajo_o_error(resultado):
+    trabajo, error = resultado
+    if error:
+        raise HTTPException(status_code=codigo_http(error), detail=error)
+    return trabajo
+
+@app.post("/api/jobs", status_code=202)
+async def enviar_trabajo(request: EnviarTrabajoRequest, response: Response,
+                         repo: RepositorioMallas = Depends(obtener_repositorio)):
+    # El cómputo corre en un proceso aparte: el event loop solo arma los datos y encola
+    if request.timeout is not None and request.timeout <= 0:
+        raise HTTPException(status_code=400, detail="Datos inválidos")
+    instantanea = await repo.obtener_instantanea(request.malla_id, request.version)
+    if instantanea is None:
+        await obtener_malla_o_404(repo, request.malla_id)
+        raise HTTPException(status_code=404, detail=VERSION_NO_ENCONTRADA)
+    datos, error = preparar_datos(request.tipo, await repo.obtener_catalogo(), *instantanea)
+    if error:
+        raise HTTPException(status_code=codigo_http(error), detail=error)
+    trabajo = trabajo_o_error(trabajos.enviar(request.tipo, request.malla_id, request.version, datos, request.timeout))
+    response.headers["Location"] = f"/api/jobs/{trabajo.id}"
+    return {"exito": True, "trabajo": trabajo.to_dict()}
+
+@app.get("/api/jobs/{trabajo_id}")
+async def obtener_trabajo(trabajo_id: str):
+    return {"exito": True, "trabajo": trabajo_o_error(trabajos.obtener(trabajo_id)).to_dict()}
+
+@app.get("/api/jobs/{trabajo_id}/eventos")
+async def eventos_trabajo(trabajo_id: str):
+    # text/event-stream: un evento por cambio de estado o avance; se cierra al terminar
+    trabajo = trabajo_o_error(trabajos.obtener(trabajo_id))
     
-    if not curso_encontrado:
-        raise HTTPException(status_code=404, detail="Curso no encontrado en la malla")
+    async def eventos():
+        revision, silencio = None, 0.0
+        while True:
+            if trabajo.revision != revision:
+                revision, silencio = trabajo.revision, 0.0
+                yield f"data: {json.dumps(trabajo.to_dict())}\n\n"
+                if trabajo.final:
+                    return
+            elif silencio >= KEEPALIVE_EVENTOS:
+                silencio = 0.0
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(0.1)
+            silencio += 0.1
     
-    return {"exito": True, "curso": asdict(curso_encontrado)}
+    return StreamingResponse(eventos(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
-@app.delete("/api/mallas/{malla_id}/cursos/{curso_malla_id}")
-async def eliminar_curso_malla(malla_id: str, curso_malla_id: str):
-    if malla_id not in MALLAS_DB:
-        raise HTTPException(status_code=404, detail="Malla no encontrada")
+@app.delete("/api/jobs/{trabajo_id}")
+async def cancelar_trabajo(trabajo_id: str):
+    # Pendiente: sale de la cola; en ejecución: se termina su proceso
+    return {"exito": True, "trabajo": trabajo_o_error(trabajos.cancelar(trabajo_id)).to_dict()}
+
+# ==================== ADMINISTRACIÓN ====================
+
+def exigir_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependencia de FastAPI: las rutas de administración exigen X-Admin-Token (= MALLA_TOKEN_ADMIN)"""
+    if not token_admin_valido(x_admin_token):
+        raise HTTPException(status_code=codigo_http(TOKEN_ADMIN_INVALIDO), detail=TOKEN_ADMIN_INVALIDO)
+
+@app.get("/api/admin/catalogo", dependencies=[Depends(exigir_admin)])
+async def estado_catalogo(repo: RepositorioMallas = Depends(obtener_repositorio)):
+    return {"exito": True, "catalogo": repo.fuente_catalogo.estado()}
+
+@app.post("/api/admin/catalogo/recargar", dependencies=[Depends(exigir_admin)])
+async def recargar_catalogo(repo: RepositorioMallas = Depends(obtener_repositorio)):
+    # El catálogo nuevo se arma en un hilo y se publica de una vez;
+    # las peticiones en curso terminan con el anterior
+    estado, error = await repo.recargar_catalogo()
+    if error:
+        detalle = repo.fuente_catalogo.error
+        raise HTTPException(status_code=codigo_http(error), detail=f"{error}: {detalle}" if detalle else error)
+    return {"exito": True, "catalogo": estado}
+
+@app.post("/api/admin/validacion", dependencies=[Depends(exigir_admin)])
+async def validar_todas(procesos: Optional[int] = None, repo: RepositorioMallas = Depends(obtener_repositorio)):
+    # Todas las mallas contra el catálogo vigente, en procesos que comparten el catálogo mapeado
+    if procesos is not None and procesos < 1:
+        raise HTTPException(status_code=400, detail="Datos inválidos")
+    reporte = await repo.validar_todas(procesos)
+    return {"exito": True, "reporte": reporte}
+
+# ==================== TIEMPO REAL (WEBSOCKET) ====================
+
+async def aplicar_posiciones(malla_id: str, sesion: str, cuadros: dict):
+    """Aplica las posiciones asentadas de un tick como un solo cambio de la sesión"""
+    malla = await repositorio.obtener_malla(malla_id)
+    if malla is None:
+        return [], list(cuadros)
+    
+    vigentes = {c.id: c for c in malla.cursos if c.id in cuadros}
+    aplicados = []
+    for curso_malla_id, curso in vigentes.items():
+        cuadro = cuadros[curso_malla_id]
+        nuevo = replace(
+            curso,
+            posicion_x=cuadro["posicion_x"],
+            posicion_y=cuadro["posicion_y"],
+            semestre=cuadro.get("semestre", curso.semestre)
+        )
+        if nuevo != curso:  # Soltar la tarjeta donde estaba no escribe nada
+            aplicados.append(nuevo)
     
-    malla = MALLAS_DB[malla_id]
-    malla.cursos = [c for c in malla.cursos if c.id != curso_malla_id]
+    if aplicados:
+        inverso = await repositorio.aplicar_cambio(malla_id, Cambio(poner=tuple(aplicados)))
+        if inverso is not None:
+            historial.registrar(sesion, malla_id, inverso)
+    return aplicados, [curso_malla_id for curso_malla_id in cuadros if curso_malla_id not in vigentes]
+
+
+salas = Salas(aplicar_posiciones)
+
+@app.websocket("/ws/mallas/{malla_id}")
+async def canal_malla(websocket: WebSocket, malla_id: str, sesion: Optional[str] = None,
+                      repo: RepositorioMallas = Depends(obtener_repositorio)):
+    # Cuadros de arrastre coalescidos por tick (ver tiempo_real.py); sesión por ?sesion= o X-Sesion
+    if await repo.obtener_malla(malla_id) is None:
+        await websocket.close(code=4404, reason=MALLA_NO_ENCONTRADA)
+        return
     
-    return {"exito": True, "mensaje": "Curso eliminado correctamente"}
+    await websocket.accept()
+    sala = salas.entrar(malla_id, websocket, sesion or websocket.headers.get("x-sesion") or SESION_ANONIMA)
+    await websocket.send_json({"tipo": "conectado", "malla_id": malla_id})
+    try:
+        while True:
+            try:
+                mensaje = json.loads(await websocket.receive_text())
+            except ValueError:
+                await websocket.send_json({"tipo": "error", "error": CUADRO_INVALIDO})
+                continue
+            for cuadro in mensaje if isinstance(mensaje, list) else [mensaje]:
+                if validar_cuadro(cuadro):
+                    sala.recibir(websocket, cuadro)
+                else:
+                    await websocket.send_json({"tipo": "error", "error": CUADRO_INVALIDO})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await salas.salir(sala, websocket)
 
 if __name__ == "__main__":
     import uvicorn
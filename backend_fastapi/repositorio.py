@@ -0,0 +1,725 @@
+"""
+Capa de repositorio asíncrona del backend FastAPI
+Las rutas solo hablan con `RepositorioMallas`; así ninguna operación de
+almacenamiento bloquea el event loop. Implementaciones:
+    - RepositorioMemoria: el Almacen del motor compartido (por defecto)
+    - RepositorioSQLite: aiosqlite con un pool acotado de conexiones
+Se elige con la variable de entorno MALLA_REPOSITORIO (memoria | sqlite).
+"""
+import asyncio
+import json
+import os
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from motor_malla import (
+    Almacen, Catalogo, Curso, FuenteCatalogo, Malla, MallaCurso, construir_malla, crear_cache_mallas,
+    crear_catalogo_semilla, crear_fuente_catalogo, crear_mallas_semilla, id_malla_uuid, id_uuid
+)
+from motor_malla.calentamiento import Preparacion, calentar_catalogo, calentar_rutas
+from motor_malla.errores import CURSO_MALLA_NO_ENCONTRADO, MALLA_DUPLICADA, MALLA_NO_ENCONTRADA
+from motor_malla.historial import Cambio, invertir
+from motor_malla.operaciones import PREVIEW, PlanEliminacion, planificar_eliminacion
+from motor_malla.elegibilidad import CacheElegibilidad
+from motor_malla.ruta_critica import CacheRutaCritica
+from motor_malla.trazas import trazar
+from motor_malla.validacion_masiva import validar_mallas
+from motor_malla.versiones import Semestres, VersionMalla, agrupar_por_semestre, crear_version, hash_semestre
+from motor_malla.indice_espacial import ALTO_TARJETA, ANCHO_TARJETA
+from motor_malla.listado import codificar_cursor, filtros_activos
+from motor_malla.modelos import CAMPOS_EDITABLES_MALLA, CAMPOS_RESUMEN_MALLA, resumen_malla
+
+# ==================== INTERFAZ ====================
+
+class RepositorioMallas(ABC):
+    """Contrato asíncrono de acceso a cursos y mallas"""
+
+    # Referencia al catálogo vigente (recargable, ver motor_malla.recarga)
+    fuente_catalogo: FuenteCatalogo
+    # Análisis de ruta crítica por (malla_id, versión)
+    rutas: CacheRutaCritica
+    # Matrices de elegibilidad por (malla_id, versión)
+    elegibilidades: CacheElegibilidad
+
+    @abstractmethod
+    async def obtener_catalogo(self) -> Catalogo:
+        """Catálogo completo con sus estructuras derivadas (solo lectura)"""
+
+    async def recargar_catalogo(self) -> Tuple[Optional[Dict], Optional[str]]:
+        """Relee el archivo del catálogo en un hilo: el event loop sigue atendiendo mientras tanto"""
+        return await asyncio.to_thread(self.fuente_catalogo.recargar)
+
+    async def obtener_cursos(self) -> List[Curso]:
+        return (await self.obtener_catalogo()).listar()
+
+    async def obtener_curso(self, curso_id: str) -> Optional[Curso]:
+        return (await self.obtener_catalogo()).obtener(curso_id)
+
+    @abstractmethod
+    async def obtener_malla(self, malla_id: str) -> Optional[Malla]:
+        ...
+
+    @abstractmethod
+    async def crear_malla(self, datos: Dict) -> Tuple[Optional[Malla], Optional[str]]:
+        """Crea una malla vacía; retorna (malla, None) o (None, error)"""
+
+    @abstractmethod
+    async def listar_mallas(self, filtros: Dict, despues: int, limite: int) -> Tuple[List[Dict], Optional[str]]:
+        """Página de filas resumen en orden de creación y el cursor de la siguiente"""
+
+    @abstractmethod
+    def recorrer_mallas(self) -> Iterator[Malla]:
+        """
+        Todas las mallas con sus cursos, una a la vez (para la validación masiva).
+        Es síncrono: se consume dentro de un hilo, nunca en el event loop.
+        """
+
+    async def validar_todas(self, procesos: int = None) -> Dict:
+        """Valida todas las mallas contra el catálogo vigente; el recorrido completo corre en un hilo"""
+        catalogo = await self.obtener_catalogo()
+        return await asyncio.to_thread(lambda: validar_mallas(self.recorrer_mallas(), catalogo, procesos))
+
+    @abstractmethod
+    async def actualizar_malla(self, malla_id: str, cambios: Dict) -> Optional[Malla]:
+        """Guarda los metadatos de la malla (no sus cursos)"""
+
+    @abstractmethod
+    async def aplicar_cambio(self, malla_id: str, cambio: Cambio) -> Optional[Cambio]:
+        """
+        Aplica un cambio (quitar, poner, metadatos) de forma atómica.
+        Retorna su inverso, o None si la malla no existe.
+        """
+
+    async def planificar_eliminacion(self, malla_id: str,
+                                     curso_malla_id: str) -> Tuple[Optional[PlanEliminacion], Optional[str]]:
+        """Ubicación y sus dependientes ubicados (directos e indirectos); no elimina nada"""
+        malla = await self.obtener_malla(malla_id)
+        if malla is None:
+            return None, MALLA_NO_ENCONTRADA
+        curso = next((c for c in malla.cursos if c.id == curso_malla_id), None)
+        if curso is None:
+            return None, CURSO_MALLA_NO_ENCONTRADO
+        por_curso: Dict[str, List[MallaCurso]] = {}
+        for c in malla.cursos:
+            por_curso.setdefault(c.curso_id, []).append(c)
+        catalogo = await self.obtener_catalogo()
+        return planificar_eliminacion(catalogo, lambda curso_id: por_curso.get(curso_id, ()), curso), None
+
+    @abstractmethod
+    async def buscar_cursos_en_area(self, malla_id: str, x0: int, y0: int, x1: int, y1: int) -> List[MallaCurso]:
+        """Ubicaciones cuya tarjeta intersecta el rectángulo (x0, y0, x1, y1)"""
+
+    @abstractmethod
+    async def detectar_solapamientos(self, malla_id: str, posicion_x: int, posicion_y: int,
+                                     excluir: str = None) -> List[MallaCurso]:
+        """Ubicaciones que se solapan con una tarjeta soltada en (posicion_x, posicion_y)"""
+
+    @abstractmethod
+    async def publicar_version(self, malla_id: str) -> Optional[VersionMalla]:
+        """Congela el borrador como versión (o retorna la última si no cambió)"""
+
+    @abstractmethod
+    async def listar_versiones(self, malla_id: str) -> List[Dict]:
+        """Filas resumen de las versiones publicadas (sin cursos)"""
+
+    @abstractmethod
+    async def obtener_version(self, malla_id: str, numero: int) -> Optional[VersionMalla]:
+        ...
+
+    async def obtener_semestres(self, malla_id: str, numero: int = None) -> Optional[Semestres]:
+        """Borrador (numero=None) o versión publicada, agrupados por semestre"""
+        if numero is not None:
+            version = await self.obtener_version(malla_id, numero)
+            return version.semestres if version else None
+        malla = await self.obtener_malla(malla_id)
+        return agrupar_por_semestre(malla.cursos) if malla else None
+
+    async def obtener_instantanea(self, malla_id: str, numero: int = None) -> Optional[Tuple[Semestres, Dict]]:
+        """Semestres y metadatos del borrador o de una versión; None si no existe"""
+        if numero is not None:
+            version = await self.obtener_version(malla_id, numero)
+            return (version.semestres, version.metadatos) if version else None
+        malla = await self.obtener_malla(malla_id)
+        if malla is None:
+            return None
+        return agrupar_por_semestre(malla.cursos), {campo: getattr(malla, campo) for campo in CAMPOS_RESUMEN_MALLA}
+
+    async def ruta_critica(self, malla_id: str, numero: int = None) -> Optional[Dict]:
+        """Ruta crítica y holgura del borrador o de una versión; None si no existe"""
+        instantanea = await self.obtener_instantanea(malla_id, numero)
+        if instantanea is None:
+            return None
+        semestres, metadatos = instantanea
+        # Semestres releídos: la caché los valida por igualdad en vez de identidad
+        return self.rutas.obtener(
+            (malla_id, numero), semestres, await self.obtener_catalogo(), metadatos['numero_niveles']
+        )
+
+    async def elegibilidad(self, malla_id: str, numero: int = None) -> Optional[Dict]:
+        """Matriz curso × semestre de ubicaciones válidas; None si no existe"""
+        instantanea = await self.obtener_instantanea(malla_id, numero)
+        if instantanea is None:
+            return None
+        semestres, metadatos = instantanea
+        return self.elegibilidades.obtener(
+            (malla_id, numero), semestres, await self.obtener_catalogo(), metadatos['numero_niveles']
+        )
+
+    @abstractmethod
+    async def ubicaciones_por_malla(self) -> Dict[str, int]:
+        """malla_id -> cantidad de cursos ubicados (para /metrics)"""
+
+    async def estadisticas_cache(self) -> Optional[Dict]:
+        """Contadores de la caché de mallas, si el repositorio usa una"""
+        return None
+
+    async def calentar(self, preparacion: Preparacion) -> None:
+        """Catálogo derivado y caminos calientes sobre la primera malla (ver motor_malla.calentamiento)"""
+        catalogo = await self.obtener_catalogo()
+        calentar_catalogo(catalogo, preparacion)
+        mallas, _ = await self.listar_mallas({}, 0, 1)
+        if mallas:
+            malla = await self.obtener_malla(mallas[0]['id'])
+            calentar_rutas(catalogo, malla, id_uuid, preparacion)
+
+    async def cerrar(self) -> None:
+        """Libera recursos (conexiones, archivos)"""
+
+
+# ==================== MEMORIA ====================
+
+class RepositorioMemoria(RepositorioMallas):
+    """
+    Repositorio sobre el Almacen en memoria del motor.
+    Con una CacheMallas el almacén puede leer (malla desbordada) o escribir
+    (desalojo) archivos: esas llamadas van a un hilo con asyncio.to_thread.
+    Las lecturas de mallas residentes se atienden directo en el event loop.
+    """
+
+    def __init__(self, almacen: Almacen):
+        self.almacen = almacen
+        self.fuente_catalogo = almacen.fuente_catalogo
+
+    def _toca_disco(self, malla_id: Optional[str] = None) -> bool:
+        """True si la llamada puede hacer E/S de desborde (escrituras, o leer una malla no residente)"""
+        mallas = self.almacen.mallas
+        if not hasattr(mallas, 'residente'):
+            return False
+        return malla_id is None or (malla_id in mallas and not mallas.residente(malla_id))
+
+    async def _leer(self, malla_id: str, metodo, *args):
+        if self._toca_disco(malla_id):
+            return await asyncio.to_thread(metodo, malla_id, *args)
+        return metodo(malla_id, *args)
+
+    async def _escribir(self, metodo, *args):
+        if self._toca_disco():
+            return await asyncio.to_thread(metodo, *args)
+        return metodo(*args)
+
+    async def obtener_catalogo(self) -> Catalogo:
+        return self.almacen.catalogo
+
+    async def obtener_malla(self, malla_id: str) -> Optional[Malla]:
+        return await self._leer(malla_id, self.almacen.obtener_malla)
+
+    @trazar("RepositorioMemoria.crear_malla")
+    async def crear_malla(self, datos: Dict) -> Tuple[Optional[Malla], Optional[str]]:
+        return await self._escribir(self.almacen.crear_malla, datos)
+
+    async def listar_mallas(self, filtros: Dict, despues: int, limite: int) -> Tuple[List[Dict], Optional[str]]:
+        return self.almacen.listar_mallas(filtros, despues, limite)
+
+    def recorrer_mallas(self) -> Iterator[Malla]:
+        return self.almacen.recorrer_mallas()
+
+    @trazar("RepositorioMemoria.actualizar_malla")
+    async def actualizar_malla(self, malla_id: str, cambios: Dict) -> Optional[Malla]:
+        malla, _ = await self._escribir(self.almacen.actualizar_malla, malla_id, cambios)
+        return malla
+
+    @trazar("RepositorioMemoria.aplicar_cambio")
+    async def aplicar_cambio(self, malla_id: str, cambio: Cambio) -> Optional[Cambio]:
+        inverso, _ = await self._escribir(self.almacen.aplicar_cambio, malla_id, cambio)
+        return inverso
+
+    async def buscar_cursos_en_area(self, malla_id: str, x0: int, y0: int, x1: int, y1: int) -> List[MallaCurso]:
+        cursos, _ = await self._leer(malla_id, self.almacen.buscar_cursos_en_area, x0, y0, x1, y1)
+        return cursos or []
+
+    async def detectar_solapamientos(self, malla_id: str, posicion_x: int, posicion_y: int,
+                                     excluir: str = None) -> List[MallaCurso]:
+        cursos, _ = await self._leer(malla_id, self.almacen.detectar_solapamientos, posicion_x, posicion_y, excluir)
+        return cursos or []
+
+    @trazar("RepositorioMemoria.publicar_version")
+    async def publicar_version(self, malla_id: str) -> Optional[VersionMalla]:
+        version, _ = await self._escribir(self.almacen.publicar_version, malla_id)
+        return version
+
+    async def listar_versiones(self, malla_id: str) -> List[Dict]:
+        versiones, _ = self.almacen.listar_versiones(malla_id)
+        return [v.resumen() for v in versiones or []]
+
+    async def obtener_version(self, malla_id: str, numero: int) -> Optional[VersionMalla]:
+        version, _ = self.almacen.obtener_version(malla_id, numero)
+        return version
+
+    async def obtener_semestres(self, malla_id: str, numero: int = None) -> Optional[Semestres]:
+        # Comparte las tuplas del almacén: los semestres sin cambios se saltan por identidad
+        semestres, _ = await self._leer(malla_id, self.almacen.obtener_semestres, numero)
+        return semestres
+
+    async def planificar_eliminacion(self, malla_id: str,
+                                     curso_malla_id: str) -> Tuple[Optional[PlanEliminacion], Optional[str]]:
+        # El almacén mantiene curso_id -> ubicación: no recorre la malla
+        return await self._leer(malla_id, self.almacen.eliminar_curso_malla, curso_malla_id, PREVIEW)
+
+    async def obtener_instantanea(self, malla_id: str, numero: int = None) -> Optional[Tuple[Semestres, Dict]]:
+        instantanea, _ = await self._leer(malla_id, self.almacen.obtener_instantanea, numero)
+        return instantanea
+
+    async def ruta_critica(self, malla_id: str, numero: int = None) -> Optional[Dict]:
+        # Misma memoria que Flask: acierta por identidad de los semestres compartidos
+        analisis, _ = await self._leer(malla_id, self.almacen.ruta_critica, numero)
+        return analisis
+
+    async def elegibilidad(self, malla_id: str, numero: int = None) -> Optional[Dict]:
+        matriz, _ = await self._leer(malla_id, self.almacen.elegibilidad, numero)
+        return matriz
+
+    async def ubicaciones_por_malla(self) -> Dict[str, int]:
+        return self.almacen.ubicaciones_por_malla()
+
+    async def estadisticas_cache(self) -> Optional[Dict]:
+        return self.almacen.estadisticas_cache()
+
+    async def calentar(self, preparacion: Preparacion) -> None:
+        await self._escribir(self.almacen.calentar, preparacion)
+
+
+# ==================== SQLITE ====================
+
+ESQUEMA_SQLITE = """
+CREATE TABLE IF NOT EXISTS cursos (
+    id TEXT PRIMARY KEY,
+    datos TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS mallas (
+    id TEXT PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    programa TEXT NOT NULL,
+    descripcion TEXT,
+    fecha_creacion TEXT NOT NULL,
+    periodo_vigencia TEXT NOT NULL,
+    creditos_programa INTEGER NOT NULL,
+    numero_niveles INTEGER NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'borrador'
+);
+CREATE TABLE IF NOT EXISTS malla_cursos (
+    id TEXT PRIMARY KEY,
+    malla_id TEXT NOT NULL REFERENCES mallas(id),
+    curso_id TEXT NOT NULL,
+    posicion_x INTEGER NOT NULL,
+    posicion_y INTEGER NOT NULL,
+    semestre INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_malla_cursos_posicion ON malla_cursos(malla_id, posicion_x, posicion_y);
+CREATE INDEX IF NOT EXISTS idx_mallas_programa ON mallas(programa);
+CREATE INDEX IF NOT EXISTS idx_mallas_periodo ON mallas(periodo_vigencia);
+CREATE INDEX IF NOT EXISTS idx_mallas_estado ON mallas(estado);
+-- Versiones publicadas: cada semestre se guarda una sola vez por contenido
+-- y las versiones que no lo cambiaron apuntan al mismo bloque
+CREATE TABLE IF NOT EXISTS bloques_semestre (
+    hash TEXT PRIMARY KEY,
+    cursos TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS malla_versiones (
+    malla_id TEXT NOT NULL REFERENCES mallas(id),
+    numero INTEGER NOT NULL,
+    fecha_publicacion TEXT NOT NULL,
+    metadatos TEXT NOT NULL,
+    total_cursos INTEGER NOT NULL,
+    PRIMARY KEY (malla_id, numero)
+);
+CREATE TABLE IF NOT EXISTS malla_version_semestres (
+    malla_id TEXT NOT NULL,
+    numero INTEGER NOT NULL,
+    semestre INTEGER NOT NULL,
+    hash TEXT NOT NULL REFERENCES bloques_semestre(hash),
+    PRIMARY KEY (malla_id, numero, semestre)
+);
+"""
+
+COLUMNAS_MALLA = (
+    "id", "nombre", "programa", "descripcion", "fecha_creacion",
+    "periodo_vigencia", "creditos_programa", "numero_niveles", "estado"
+)
+COLUMNAS_MALLA_CURSO = "id, curso_id, posicion_x, posicion_y, semestre"
+
+
+class PoolConexiones:
+    """
+    Pool acotado de conexiones aiosqlite.
+    Las conexiones se abren bajo demanda hasta `tamano`; las peticiones
+    adicionales esperan (sin bloquear el event loop) a que se libere una.
+    """
+
+    def __init__(self, ruta: str, tamano: int = 5, inicializar=None):
+        self.ruta = ruta
+        self.tamano = tamano
+        self._inicializar = inicializar
+        self._libres: asyncio.Queue = asyncio.Queue()
+        self._abiertas = 0
+        self._candado = asyncio.Lock()
+
+    async def _abrir(self):
+        import aiosqlite  # Dependencia opcional: solo si se usa SQLite
+
+        conexion = await aiosqlite.connect(self.ruta)
+        await conexion.execute("PRAGMA journal_mode=WAL")
+        await conexion.execute("PRAGMA foreign_keys=ON")
+        if self._inicializar is not None:
+            await self._inicializar(conexion)
+            self._inicializar = None
+        return conexion
+
+    @asynccontextmanager
+    async def conexion(self):
+        """Presta una conexión del pool durante el bloque `async with`"""
+        if self._libres.empty():
+            async with self._candado:
+                if self._libres.empty() and self._abiertas < self.tamano:
+                    self._abiertas += 1
+                    try:
+                        self._libres.put_nowait(await self._abrir())
+                    except Exception:
+                        self._abiertas -= 1
+                        raise
+        conexion = await self._libres.get()
+        try:
+            yield conexion
+        finally:
+            self._libres.put_nowait(conexion)
+
+    async def cerrar(self):
+        while self._abiertas:
+            conexion = await self._libres.get()
+            await conexion.close()
+            self._abiertas -= 1
+
+
+class RepositorioSQLite(RepositorioMallas):
+    """Repositorio persistente sobre SQLite (aiosqlite) con pool de conexiones"""
+
+    def __init__(self, ruta: str, tamano_pool: int = 5,
+                 catalogo_semilla: Catalogo = None, mallas_semilla: Dict[str, Malla] = None,
+                 fuente_catalogo: FuenteCatalogo = None):
+        # Con una fuente ya cargada (MALLA_CATALOGO) el catálogo sale del archivo y
+        # también siembra la tabla; sin ella se lee de la tabla cursos
+        self.fuente_catalogo = fuente_catalogo if fuente_catalogo is not None else FuenteCatalogo()
+        if catalogo_semilla is None:
+            catalogo_semilla = self.fuente_catalogo.actual
+        self._catalogo_semilla = catalogo_semilla if catalogo_semilla is not None else crear_catalogo_semilla()
+        self._mallas_semilla = mallas_semilla if mallas_semilla is not None else crear_mallas_semilla()
+        self._pool = PoolConexiones(ruta, tamano_pool, self._crear_esquema)
+        self.rutas = CacheRutaCritica()
+        self.elegibilidades = CacheElegibilidad()
+
+    async def _crear_esquema(self, db):
+        """Crea las tablas y carga los datos semilla si la base está vacía"""
+        await db.executescript(ESQUEMA_SQLITE)
+        async with db.execute("SELECT COUNT(*) FROM cursos") as cursor:
+            (total,) = await cursor.fetchone()
+        if total == 0:
+            await db.executemany(
+                "INSERT INTO cursos (id, datos) VALUES (?, ?)",
+                [(c.id, json.dumps(c.to_dict())) for c in self._catalogo_semilla.listar()]
+            )
+            await db.executemany(
+                f"INSERT INTO mallas ({', '.join(COLUMNAS_MALLA)}) VALUES ({', '.join('?' * len(COLUMNAS_MALLA))})",
+                [tuple(getattr(m, c) for c in COLUMNAS_MALLA) for m in self._mallas_semilla.values()]
+            )
+        await db.commit()
+
+    async def obtener_catalogo(self) -> Catalogo:
+        # El catálogo no se modifica por la API: se lee una vez y se publica en la fuente
+        catalogo = self.fuente_catalogo.actual
+        if catalogo is None:
+            async with self._pool.conexion() as db:
+                async with db.execute("SELECT datos FROM cursos ORDER BY rowid") as cursor:
+                    filas = await cursor.fetchall()
+            catalogo = Catalogo({c.id: c for c in (Curso(**json.loads(f[0])) for f in filas)})
+            self.fuente_catalogo.publicar(catalogo)
+        return catalogo
+
+    async def obtener_malla(self, malla_id: str) -> Optional[Malla]:
+        async with self._pool.conexion() as db:
+            async with db.execute(
+                f"SELECT {', '.join(COLUMNAS_MALLA)} FROM mallas WHERE id = ?", (malla_id,)
+            ) as cursor:
+                fila = await cursor.fetchone()
+            if fila is None:
+                return None
+            async with db.execute(
+                f"SELECT {COLUMNAS_MALLA_CURSO} FROM malla_cursos WHERE malla_id = ? ORDER BY rowid", (malla_id,)
+            ) as cursor:
+                cursos = [MallaCurso(*f) for f in await cursor.fetchall()]
+        return Malla(cursos=cursos, **dict(zip(COLUMNAS_MALLA, fila)))
+
+    @trazar("RepositorioSQLite.crear_malla")
+    async def crear_malla(self, datos: Dict) -> Tuple[Optional[Malla], Optional[str]]:
+        import sqlite3  # Ya cargado por aiosqlite; el repositorio en memoria no lo necesita
+
+        malla, error = construir_malla(datos, id_malla_uuid(0))
+        if error:
+            return None, error
+        async with self._pool.conexion() as db:
+            try:
+                await db.execute(
+                    f"INSERT INTO mallas ({', '.join(COLUMNAS_MALLA)}) VALUES ({', '.join('?' * len(COLUMNAS_MALLA))})",
+                    tuple(getattr(malla, c) for c in COLUMNAS_MALLA)
+                )
+            except sqlite3.IntegrityError:
+                return None, MALLA_DUPLICADA
+            await db.commit()
+        return malla, None
+
+    async def listar_mallas(self, filtros: Dict, despues: int, limite: int) -> Tuple[List[Dict], Optional[str]]:
+        # El rowid da el orden de creación; cada filtro usa su índice y el
+        # cursor es un rango sobre rowid (sin OFFSET)
+        filtros = filtros_activos(filtros)
+        condiciones = ["rowid > ?"] + [f"{campo} = ?" for campo in filtros]
+        async with self._pool.conexion() as db:
+            async with db.execute(
+                f"SELECT rowid, {', '.join(CAMPOS_RESUMEN_MALLA)}, "
+                "(SELECT COUNT(*) FROM malla_cursos WHERE malla_cursos.malla_id = mallas.id) "
+                f"FROM mallas WHERE {' AND '.join(condiciones)} ORDER BY rowid LIMIT ?",
+                [despues, *filtros.values(), limite + 1]
+            ) as cursor:
+                filas = await cursor.fetchall()
+        siguiente = codificar_cursor(filas[limite - 1][0]) if len(filas) > limite else None
+        return [
+            resumen_malla(dict(zip(CAMPOS_RESUMEN_MALLA, fila[1:-1])), fila[-1]) for fila in filas[:limite]
+        ], siguiente
+
+    def recorrer_mallas(self) -> Iterator[Malla]:
+        # Conexión propia y síncrona (WAL admite lectores concurrentes): dos lecturas
+        # secuenciales ordenadas por malla que se cruzan sin cargar todo en memoria
+        import sqlite3  # Ya cargado por aiosqlite; el repositorio en memoria no lo necesita
+
+        conexion = sqlite3.connect(self._pool.ruta)
+        try:
+            cursos = conexion.execute(
+                f"SELECT malla_id, {COLUMNAS_MALLA_CURSO} FROM malla_cursos ORDER BY malla_id, rowid"
+            )
+            fila_curso = cursos.fetchone()
+            for fila in conexion.execute(f"SELECT {', '.join(COLUMNAS_MALLA)} FROM mallas ORDER BY id"):
+                malla = Malla(cursos=[], **dict(zip(COLUMNAS_MALLA, fila)))
+                # Ubicaciones huérfanas (de una malla que no está) se saltan
+                while fila_curso is not None and fila_curso[0] < malla.id:
+                    fila_curso = cursos.fetchone()
+                while fila_curso is not None and fila_curso[0] == malla.id:
+                    malla.cursos.append(MallaCurso(*fila_curso[1:]))
+                    fila_curso = cursos.fetchone()
+                yield malla
+        finally:
+            conexion.close()
+
+    @trazar("RepositorioSQLite.actualizar_malla")
+    async def actualizar_malla(self, malla_id: str, cambios: Dict) -> Optional[Malla]:
+        campos = [c for c in CAMPOS_EDITABLES_MALLA if cambios.get(c) is not None]
+        if campos:
+            async with self._pool.conexion() as db:
+                await db.execute(
+                    f"UPDATE mallas SET {', '.join(f'{c} = ?' for c in campos)} WHERE id = ?",
+                    [cambios[c] for c in campos] + [malla_id]
+                )
+                await db.commit()
+        return await self.obtener_malla(malla_id)
+
+    @trazar("RepositorioSQLite.aplicar_cambio")
+    async def aplicar_cambio(self, malla_id: str, cambio: Cambio) -> Optional[Cambio]:
+        campos = [campo for campo, _ in cambio.metadatos]
+        if not set(campos) <= set(CAMPOS_EDITABLES_MALLA):
+            raise ValueError(f"Campos no editables: {set(campos) - set(CAMPOS_EDITABLES_MALLA)}")
+        ids = list(dict.fromkeys(list(cambio.quitar) + [c.id for c in cambio.poner]))
+        async with self._pool.conexion() as db:
+            # Estado previo solo de lo que el cambio toca, para calcular el inverso
+            async with db.execute(
+                f"SELECT {', '.join(['id'] + campos)} FROM mallas WHERE id = ?", (malla_id,)
+            ) as cursor:
+                fila = await cursor.fetchone()
+            if fila is None:
+                return None
+            metadatos = dict(zip(campos, fila[1:]))
+            anteriores = {}
+            for inicio in range(0, len(ids), 500):
+                lote = ids[inicio:inicio + 500]
+                async with db.execute(
+                    f"SELECT {COLUMNAS_MALLA_CURSO} FROM malla_cursos "
+                    f"WHERE malla_id = ? AND id IN ({', '.join('?' * len(lote))})",
+                    [malla_id, *lote]
+                ) as cursor:
+                    anteriores.update((f[0], MallaCurso(*f)) for f in await cursor.fetchall())
+            inverso = invertir(cambio, anteriores.get, metadatos.get)
+
+            # Igual que en memoria: quitar, luego reemplazar o agregar, luego metadatos
+            quitar = set(cambio.quitar)
+            await db.executemany(
+                "DELETE FROM malla_cursos WHERE id = ? AND malla_id = ?", [(i, malla_id) for i in quitar]
+            )
+            existentes = [c for c in cambio.poner if c.id in anteriores and c.id not in quitar]
+            nuevos = [c for c in cambio.poner if c.id not in anteriores or c.id in quitar]
+            await db.executemany(
+                "UPDATE malla_cursos SET posicion_x = ?, posicion_y = ?, semestre = ? "
+                "WHERE id = ? AND malla_id = ?",
+                [(c.posicion_x, c.posicion_y, c.semestre, c.id, malla_id) for c in existentes]
+            )
+            await db.executemany(
+                "INSERT INTO malla_cursos (id, malla_id, curso_id, posicion_x, posicion_y, semestre) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(c.id, malla_id, c.curso_id, c.posicion_x, c.posicion_y, c.semestre) for c in nuevos]
+            )
+            if campos:
+                await db.execute(
+                    f"UPDATE mallas SET {', '.join(f'{c} = ?' for c in campos)} WHERE id = ?",
+                    [valor for _, valor in cambio.metadatos] + [malla_id]
+                )
+            await db.commit()
+        return inverso
+
+    async def _leer_version(self, db, malla_id: str, numero: int) -> Optional[VersionMalla]:
+        async with db.execute(
+            "SELECT fecha_publicacion, metadatos FROM malla_versiones WHERE malla_id = ? AND numero = ?",
+            (malla_id, numero)
+        ) as cursor:
+            fila = await cursor.fetchone()
+        if fila is None:
+            return None
+        async with db.execute(
+            "SELECT s.semestre, b.cursos FROM malla_version_semestres s "
+            "JOIN bloques_semestre b ON b.hash = s.hash "
+            "WHERE s.malla_id = ? AND s.numero = ? ORDER BY s.semestre",
+            (malla_id, numero)
+        ) as cursor:
+            semestres = {
+                semestre: tuple(MallaCurso(*f) for f in json.loads(cursos))
+                for semestre, cursos in await cursor.fetchall()
+            }
+        return VersionMalla(malla_id, numero, fila[0], json.loads(fila[1]), semestres)
+
+    @trazar("RepositorioSQLite.publicar_version")
+    async def publicar_version(self, malla_id: str) -> Optional[VersionMalla]:
+        malla = await self.obtener_malla(malla_id)
+        if malla is None:
+            return None
+        semestres = agrupar_por_semestre(malla.cursos)
+        hashes = {semestre: hash_semestre(grupo) for semestre, grupo in semestres.items()}
+        metadatos = {campo: getattr(malla, campo) for campo in CAMPOS_RESUMEN_MALLA}
+
+        async with self._pool.conexion() as db:
+            async with db.execute(
+                "SELECT numero, metadatos FROM malla_versiones WHERE malla_id = ? ORDER BY numero DESC LIMIT 1",
+                (malla_id,)
+            ) as cursor:
+                ultima = await cursor.fetchone()
+            if ultima is not None:
+                async with db.execute(
+                    "SELECT semestre, hash FROM malla_version_semestres WHERE malla_id = ? AND numero = ?",
+                    (malla_id, ultima[0])
+                ) as cursor:
+                    hashes_ultima = dict(await cursor.fetchall())
+                # Sin cambios desde la última publicación: no se crea otra versión
+                if hashes_ultima == hashes and json.loads(ultima[1]) == metadatos:
+                    return await self._leer_version(db, malla_id, ultima[0])
+
+            version = crear_version(malla_id, (ultima[0] if ultima else 0) + 1, metadatos, semestres)
+            await db.executemany(
+                "INSERT OR IGNORE INTO bloques_semestre (hash, cursos) VALUES (?, ?)",
+                [
+                    (hashes[semestre], json.dumps([
+                        [c.id, c.curso_id, c.posicion_x, c.posicion_y, c.semestre] for c in grupo
+                    ]))
+                    for semestre, grupo in semestres.items()
+                ]
+            )
+            await db.execute(
+                "INSERT INTO malla_versiones (malla_id, numero, fecha_publicacion, metadatos, total_cursos) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (malla_id, version.numero, version.fecha_publicacion, json.dumps(metadatos), version.total_cursos)
+            )
+            await db.executemany(
+                "INSERT INTO malla_version_semestres (malla_id, numero, semestre, hash) VALUES (?, ?, ?, ?)",
+                [(malla_id, version.numero, semestre, h) for semestre, h in hashes.items()]
+            )
+            await db.commit()
+        return version
+
+    async def listar_versiones(self, malla_id: str) -> List[Dict]:
+        async with self._pool.conexion() as db:
+            async with db.execute(
+                "SELECT numero, fecha_publicacion, total_cursos FROM malla_versiones "
+                "WHERE malla_id = ? ORDER BY numero", (malla_id,)
+            ) as cursor:
+                return [
+                    {'numero': n, 'fecha_publicacion': f, 'total_cursos': t} for n, f, t in await cursor.fetchall()
+                ]
+
+    async def obtener_version(self, malla_id: str, numero: int) -> Optional[VersionMalla]:
+        async with self._pool.conexion() as db:
+            return await self._leer_version(db, malla_id, numero)
+
+    async def _consultar_rango(self, malla_id: str, x0: int, x1: int, y0: int, y1: int,
+                               excluir: str = None) -> List[MallaCurso]:
+        """Ubicaciones con esquina superior izquierda dentro del rango (usa el índice compuesto)"""
+        async with self._pool.conexion() as db:
+            async with db.execute(
+                f"SELECT {COLUMNAS_MALLA_CURSO} FROM malla_cursos "
+                "WHERE malla_id = ? AND posicion_x BETWEEN ? AND ? AND posicion_y BETWEEN ? AND ? AND id != ? "
+                "ORDER BY posicion_y, posicion_x, id",
+                (malla_id, x0, x1, y0, y1, excluir or "")
+            ) as cursor:
+                return [MallaCurso(*f) for f in await cursor.fetchall()]
+
+    async def buscar_cursos_en_area(self, malla_id: str, x0: int, y0: int, x1: int, y1: int) -> List[MallaCurso]:
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        return await self._consultar_rango(malla_id, x0 - ANCHO_TARJETA, x1, y0 - ALTO_TARJETA, y1)
+
+    async def detectar_solapamientos(self, malla_id: str, posicion_x: int, posicion_y: int,
+                                     excluir: str = None) -> List[MallaCurso]:
+        # Solapamiento estricto: las tarjetas que solo se tocan en el borde no cuentan
+        return await self._consultar_rango(
+            malla_id,
+            posicion_x - ANCHO_TARJETA + 1, posicion_x + ANCHO_TARJETA - 1,
+            posicion_y - ALTO_TARJETA + 1, posicion_y + ALTO_TARJETA - 1,
+            excluir
+        )
+
+    async def ubicaciones_por_malla(self) -> Dict[str, int]:
+        async with self._pool.conexion() as db:
+            async with db.execute(
+                "SELECT m.id, COUNT(mc.id) FROM mallas m "
+                "LEFT JOIN malla_cursos mc ON mc.malla_id = m.id GROUP BY m.id"
+            ) as cursor:
+                return dict(await cursor.fetchall())
+
+    async def cerrar(self) -> None:
+        await self._pool.cerrar()
+
+
+def crear_repositorio() -> RepositorioMallas:
+    """Crea el repositorio configurado por variables de entorno"""
+    tipo = os.environ.get("MALLA_REPOSITORIO", "memoria")
+    fuente = crear_fuente_catalogo()
+    if tipo == "sqlite":
+        return RepositorioSQLite(
+            os.environ.get("MALLA_SQLITE_RUTA", "malla.db"),
+            int(os.environ.get("MALLA_SQLITE_POOL", "5")),
+            fuente_catalogo=fuente if fuente.ruta else None
+        )
+    return RepositorioMemoria(Almacen(
+        fuente, crear_cache_mallas(crear_mallas_semilla()), id_uuid, id_malla_uuid
+    ))
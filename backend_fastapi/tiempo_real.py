@@ -0,0 +1,149 @@
+"""
+Canal WebSocket por malla para arrastres en vivo
+Mientras se arrastra una tarjeta el cliente manda cuadros de posición por el
+WebSocket en vez de un PUT por movimiento. La sala de la malla junta los
+cuadros durante un tick (MALLA_WS_TICK segundos): por cada ubicación gana el
+último, se aplican todos juntos con un solo cambio por sesión y solo las
+posiciones asentadas se difunden a los demás visores.
+
+Mensajes del cliente (JSON, uno o una lista):
+    {"curso_malla_id": "...", "posicion_x": 10, "posicion_y": 20, "semestre": 3}
+    (semestre es opcional)
+Mensajes del servidor:
+    {"tipo": "conectado", "malla_id": ...}
+    {"tipo": "posiciones", "cursos": [...]}      a los demás visores
+    {"tipo": "confirmado", "cursos": [ids]}      a quien envió los cuadros
+    {"tipo": "error", "error": ...}
+    {"tipo": "error", "error": ..., "cursos": [ids]}  si falla el cambio de la sesión
+"""
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from fastapi import WebSocket
+
+from motor_malla import MallaCurso
+from motor_malla.errores import CURSO_MALLA_NO_ENCONTRADO
+from motor_malla.metricas import METRICAS
+
+TICK_POR_DEFECTO = 0.05
+CUADRO_INVALIDO = "Cuadro inválido: se espera curso_malla_id, posicion_x y posicion_y"
+CAMBIO_NO_APLICADO = "No se pudieron aplicar las posiciones"
+
+CUADROS_RECIBIDOS = METRICAS.contador(
+    'malla_ws_cuadros_recibidos_total', 'Cuadros de posición recibidos por WebSocket')
+POSICIONES_APLICADAS = METRICAS.contador(
+    'malla_ws_posiciones_aplicadas_total', 'Posiciones asentadas y escritas tras coalescer cuadros')
+
+# (malla_id, sesión, {curso_malla_id: cuadro}) -> (ubicaciones aplicadas, IDs inexistentes)
+Aplicador = Callable[[str, str, Dict[str, Dict]], Awaitable[Tuple[List[MallaCurso], List[str]]]]
+
+
+def validar_cuadro(cuadro) -> bool:
+    return (
+        isinstance(cuadro, dict)
+        and isinstance(cuadro.get("curso_malla_id"), str)
+        and isinstance(cuadro.get("posicion_x"), int)
+        and isinstance(cuadro.get("posicion_y"), int)
+        and isinstance(cuadro.get("semestre", 0), int)
+    )
+
+
+class SalaMalla:
+    """Visores conectados a una malla y cuadros pendientes del tick en curso"""
+
+    def __init__(self, malla_id: str, aplicar: Aplicador, tick: float):
+        self.malla_id = malla_id
+        self.aplicar = aplicar
+        self.tick = tick
+        self.conexiones: Dict[WebSocket, str] = {}  # conexión -> sesión
+        self._pendientes: Dict[str, Tuple[Dict, WebSocket, str]] = {}  # ID -> (cuadro, origen, sesión)
+        self._tarea: asyncio.Task = None
+
+    @property
+    def vacia(self) -> bool:
+        return not self.conexiones and not self._pendientes and self._tarea is None
+
+    def recibir(self, conexion: WebSocket, cuadro: Dict):
+        """Último cuadro por ubicación; el primer cuadro del tick agenda el asentado"""
+        CUADROS_RECIBIDOS.inc()
+        self._pendientes[cuadro["curso_malla_id"]] = (cuadro, conexion, self.conexiones[conexion])
+        if self._tarea is None:
+            self._tarea = asyncio.create_task(self._asentar())
+
+    async def _asentar(self):
+        try:
+            while self._pendientes:
+                await asyncio.sleep(self.tick)
+                pendientes, self._pendientes = self._pendientes, {}
+                await self._aplicar(pendientes)
+        finally:
+            self._tarea = None
+
+    async def _aplicar(self, pendientes: Dict[str, Tuple[Dict, WebSocket, str]]):
+        # Un cambio por sesión, para que cada una deshaga solo lo suyo
+        por_sesion: Dict[str, Dict[str, Dict]] = {}
+        origen: Dict[str, WebSocket] = {}
+        for curso_malla_id, (cuadro, conexion, sesion) in pendientes.items():
+            por_sesion.setdefault(sesion, {})[curso_malla_id] = cuadro
+            origen[curso_malla_id] = conexion
+
+        aplicados: List[MallaCurso] = []
+        for sesion, cuadros in por_sesion.items():
+            try:
+                cursos, faltantes = await self.aplicar(self.malla_id, sesion, cuadros)
+            except Exception:
+                # Los cuadros de esta sesión se pierden, pero sus emisores se enteran
+                por_conexion: Dict[WebSocket, List[str]] = {}
+                for curso_malla_id in cuadros:
+                    por_conexion.setdefault(origen[curso_malla_id], []).append(curso_malla_id)
+                for conexion, ids in por_conexion.items():
+                    await self._enviar(conexion, {"tipo": "error", "error": CAMBIO_NO_APLICADO, "cursos": ids})
+                continue
+            aplicados.extend(cursos)
+            for curso_malla_id in faltantes:
+                await self._enviar(origen[curso_malla_id], {
+                    "tipo": "error", "error": CURSO_MALLA_NO_ENCONTRADO, "curso_malla_id": curso_malla_id
+                })
+        if not aplicados:
+            return
+        POSICIONES_APLICADAS.inc(cantidad=len(aplicados))
+
+        for conexion in list(self.conexiones):
+            propios = [c.id for c in aplicados if origen.get(c.id) is conexion]
+            ajenos = [c.to_dict() for c in aplicados if origen.get(c.id) is not conexion]
+            if propios:
+                await self._enviar(conexion, {"tipo": "confirmado", "cursos": propios})
+            if ajenos:
+                await self._enviar(conexion, {"tipo": "posiciones", "cursos": ajenos})
+
+    async def _enviar(self, conexion: WebSocket, mensaje: Dict):
+        if conexion not in self.conexiones:
+            return
+        try:
+            await conexion.send_json(mensaje)
+        except Exception:
+            self.conexiones.pop(conexion, None)  # Visor caído: se olvida
+
+
+class Salas:
+    """Salas activas por malla (se crean con el primer visor y se borran con el último)"""
+
+    def __init__(self, aplicar: Aplicador, tick: float = None):
+        self.aplicar = aplicar
+        self.tick = tick if tick is not None else float(os.environ.get("MALLA_WS_TICK", TICK_POR_DEFECTO))
+        self._salas: Dict[str, SalaMalla] = {}
+
+    def entrar(self, malla_id: str, conexion: WebSocket, sesion: str) -> SalaMalla:
+        sala = self._salas.get(malla_id)
+        if sala is None:
+            sala = self._salas[malla_id] = SalaMalla(malla_id, self.aplicar, self.tick)
+        sala.conexiones[conexion] = sesion
+        return sala
+
+    async def salir(self, sala: SalaMalla, conexion: WebSocket):
+        sala.conexiones.pop(conexion, None)
+        if sala._tarea is not None:
+            await asyncio.shield(sala._tarea)  # Lo ya recibido de este visor igual se asienta
+        if sala.vacia and self._salas.get(sala.malla_id) is sala:
+            del self._salas[sala.malla_id]
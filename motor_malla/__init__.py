@@ -0,0 +1,33 @@
+"""
+Motor de dominio de Malla Académica
+Paquete neutral al framework compartido por los backends Flask y FastAPI:
+modelos, catálogo, algoritmos de prerequisitos, layout, índice espacial,
+reglas de ubicación, almacenamiento en memoria (con caché acotada y
+desborde a disco), catálogo recargable en caliente y formatos de intercambio.
+"""
+from motor_malla.modelos import Curso, Malla, MallaCurso, CursoArrastrado, DifficultyLevel
+from motor_malla.catalogo import Catalogo, cargar_catalogo, crear_catalogo_semilla, crear_mallas_semilla
+from motor_malla.recarga import FuenteCatalogo, crear_fuente_catalogo
+from motor_malla.almacen import Almacen
+from motor_malla.cache import CacheMallas, crear_cache_mallas
+from motor_malla.operaciones import (
+    PlanAgregado, planificar_agregado, contar_agregado, construir_malla,
+    id_posicional, id_uuid, id_malla_secuencial, id_malla_uuid
+)
+from motor_malla.listado import IndiceMallas
+from motor_malla.historial import Cambio, Historial, sesion_actual
+from motor_malla.versiones import VersionMalla
+from motor_malla.diff import comparar_mallas
+from motor_malla.errores import codigo_http
+
+__all__ = [
+    'Curso', 'Malla', 'MallaCurso', 'CursoArrastrado', 'DifficultyLevel',
+    'Catalogo', 'cargar_catalogo', 'crear_catalogo_semilla', 'crear_mallas_semilla',
+    'FuenteCatalogo', 'crear_fuente_catalogo',
+    'Almacen', 'CacheMallas', 'crear_cache_mallas',
+    'PlanAgregado', 'planificar_agregado', 'contar_agregado', 'construir_malla',
+    'id_posicional', 'id_uuid', 'id_malla_secuencial', 'id_malla_uuid',
+    'IndiceMallas', 'Cambio', 'Historial', 'sesion_actual', 'VersionMalla',
+    'comparar_mallas',
+    'codigo_http',
+]
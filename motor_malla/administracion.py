@@ -0,0 +1,16 @@
+"""
+Acceso a las operaciones de administración
+Perfilado a pedido, recarga del catálogo, etc. se habilitan con la variable
+de entorno MALLA_TOKEN_ADMIN y se piden con el header X-Admin-Token.
+"""
+import hmac
+import os
+from typing import Optional
+
+
+def token_admin_valido(token: Optional[str]) -> bool:
+    """Sin MALLA_TOKEN_ADMIN configurado ningún token es válido (administración deshabilitada)"""
+    esperado = os.environ.get("MALLA_TOKEN_ADMIN")
+    if not esperado or not token:
+        return False
+    return hmac.compare_digest(token.encode(), esperado.encode())
@@ -0,0 +1,184 @@
+"""
+Control de admisión por clase de ruta
+Cada clase (lecturas, mutaciones, cómputos pesados) tiene su propio límite de
+peticiones en curso y de peticiones en cola. Una petición que encuentra la
+cola llena, o que espera más de `espera_maxima`, se rechaza de inmediato con
+503 y Retry-After en vez de sumarse a la fila. Como las clases no comparten
+cupos, los GET baratos nunca esperan detrás de agregados con prerequisitos.
+
+Configuración (variables de entorno, "concurrencia,cola"):
+    MALLA_ADMISION_LECTURA=64,256
+    MALLA_ADMISION_MUTACION=16,64
+    MALLA_ADMISION_PESADA=4,8
+    MALLA_ADMISION_ESPERA=0.5      segundos máximos en cola
+    MALLA_ADMISION_REINTENTO=1     valor de Retry-After
+"""
+import os
+import threading
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+from motor_malla.metricas import METRICAS
+
+LECTURA = "lectura"
+MUTACION = "mutacion"
+PESADA = "pesada"
+
+LIMITES_POR_DEFECTO = {
+    LECTURA: (64, 256),
+    MUTACION: (16, 64),
+    PESADA: (4, 8),
+}
+ESPERA_POR_DEFECTO = 0.5
+REINTENTO_POR_DEFECTO = 1
+
+# Rutas que recalculan la malla o recorren el grafo de prerequisitos
+SUFIJOS_PESADOS = ("/cursos-con-prerequisitos", "/layout")
+
+# Rutas operativas que nunca se rechazan (los balanceadores dependen de ellas)
+RUTAS_EXENTAS = ("/", "/health", "/ready", "/metrics")
+
+# Streams de larga duración: ocuparían un cupo mientras dure el trabajo que siguen
+SUFIJOS_EXENTOS = ("/eventos",)
+
+RECHAZOS = METRICAS.contador(
+    'malla_admision_rechazos_total', 'Peticiones rechazadas por saturación', ('clase',))
+
+
+def clasificar(metodo: str, ruta: str) -> Optional[str]:
+    """Clase de una petición (None si está exenta del control)"""
+    if ruta in RUTAS_EXENTAS or ruta.endswith(SUFIJOS_EXENTOS):
+        return None
+    if metodo in ("GET", "HEAD", "OPTIONS"):
+        return LECTURA
+    if ruta.endswith(SUFIJOS_PESADOS):
+        return PESADA
+    return MUTACION
+
+
+def _limites(clase: str) -> Tuple[int, int]:
+    valor = os.environ.get(f"MALLA_ADMISION_{clase.upper()}")
+    if not valor:
+        return LIMITES_POR_DEFECTO[clase]
+    concurrencia, _, cola = valor.partition(",")
+    return int(concurrencia), int(cola or 0)
+
+
+class Compuerta:
+    """Cupos de una clase para servidores con hilos (Flask)"""
+
+    def __init__(self, clase: str, concurrencia: int, cola: int, espera_maxima: float):
+        self.clase = clase
+        self.concurrencia = concurrencia
+        self.cola = cola
+        self.espera_maxima = espera_maxima
+        self.en_curso = 0
+        self.en_cola = 0
+        self._condicion = threading.Condition()
+
+    def entrar(self) -> bool:
+        """Ocupa un cupo, esperando en cola si hay lugar; False si la petición se rechaza"""
+        with self._condicion:
+            if self.en_curso < self.concurrencia:
+                self.en_curso += 1
+                return True
+            if self.en_cola >= self.cola:
+                RECHAZOS.inc(self.clase)
+                return False
+            self.en_cola += 1
+            try:
+                admitida = self._condicion.wait_for(lambda: self.en_curso < self.concurrencia, self.espera_maxima)
+            finally:
+                self.en_cola -= 1
+            if not admitida:
+                RECHAZOS.inc(self.clase)
+                return False
+            self.en_curso += 1
+            return True
+
+    def salir(self):
+        with self._condicion:
+            self.en_curso -= 1
+            self._condicion.notify()
+
+
+class CompuertaAsync:
+    """Cupos de una clase para un event loop (FastAPI); el cupo se pasa directo al primero en cola"""
+
+    def __init__(self, clase: str, concurrencia: int, cola: int, espera_maxima: float):
+        self.clase = clase
+        self.concurrencia = concurrencia
+        self.cola = cola
+        self.espera_maxima = espera_maxima
+        self.en_curso = 0
+        self._esperando: deque = deque()
+
+    @property
+    def en_cola(self) -> int:
+        return len(self._esperando)
+
+    async def entrar(self) -> bool:
+        if self.en_curso < self.concurrencia:
+            self.en_curso += 1
+            return True
+        if len(self._esperando) >= self.cola:
+            RECHAZOS.inc(self.clase)
+            return False
+        import asyncio  # Solo en el camino de espera: el backend Flask nunca carga asyncio
+
+        turno = asyncio.get_running_loop().create_future()
+        self._esperando.append(turno)
+        try:
+            await asyncio.wait_for(turno, self.espera_maxima)
+            return True
+        except asyncio.TimeoutError:
+            RECHAZOS.inc(self.clase)
+            return False
+        except asyncio.CancelledError:
+            # El cliente se fue justo cuando recibía el cupo: se libera
+            if turno.done() and not turno.cancelled():
+                self.salir()
+            raise
+        finally:
+            if not turno.done() or turno.cancelled():
+                try:
+                    self._esperando.remove(turno)
+                except ValueError:
+                    pass
+
+    def salir(self):
+        while self._esperando:
+            turno = self._esperando.popleft()
+            if not turno.done():
+                turno.set_result(None)  # El cupo pasa al que esperaba: en_curso no cambia
+                return
+        self.en_curso -= 1
+
+
+class ControlAdmision:
+    """Una compuerta por clase de ruta"""
+
+    def __init__(self, asincrono: bool = False, limites: Dict[str, Tuple[int, int]] = None,
+                 espera_maxima: float = None, reintento: int = None):
+        tipo = CompuertaAsync if asincrono else Compuerta
+        limites = limites or {clase: _limites(clase) for clase in LIMITES_POR_DEFECTO}
+        if espera_maxima is None:
+            espera_maxima = float(os.environ.get("MALLA_ADMISION_ESPERA", ESPERA_POR_DEFECTO))
+        self.reintento = reintento or int(os.environ.get("MALLA_ADMISION_REINTENTO", REINTENTO_POR_DEFECTO))
+        self.compuertas = {
+            clase: tipo(clase, concurrencia, cola, espera_maxima) for clase, (concurrencia, cola) in limites.items()
+        }
+
+    def compuerta(self, metodo: str, ruta: str):
+        """Compuerta que corresponde a la petición (None si está exenta)"""
+        clase = clasificar(metodo, ruta)
+        return self.compuertas[clase] if clase else None
+
+    def estado(self) -> Dict[str, Dict[str, int]]:
+        return {
+            clase: {
+                'en_curso': c.en_curso, 'en_cola': c.en_cola,
+                'concurrencia': c.concurrencia, 'cola': c.cola,
+            }
+            for clase, c in self.compuertas.items()
+        }
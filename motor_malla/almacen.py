@@ -0,0 +1,593 @@
+"""
+Almacenamiento en memoria de mallas sobre un catálogo
+Todas las mutaciones se expresan como un `Cambio` y pasan por `aplicar_cambio`,
+que mantiene al día el índice espacial de cada malla y registra el inverso
+en el historial de deshacer de la sesión (si el almacén tiene uno).
+Las ubicaciones (MallaCurso) se tratan como valores: se reemplazan, no se modifican.
+`mallas` puede ser un dict o una CacheMallas (LRU con desborde a disco): cada
+mutación reasigna la malla con `_guardar` para que la caché la marque como sucia.
+El catálogo se lee de una FuenteCatalogo: puede recargarse en caliente (ver motor_malla.recarga).
+Los caminos de escritura toman un candado del almacén: Flask atiende peticiones
+en hilos y dos ediciones de la misma malla no deben pisarse.
+"""
+import functools
+import threading
+from dataclasses import replace
+from typing import Dict, Iterable, Iterator, List, MutableMapping, Optional, Union
+
+from motor_malla.calentamiento import calentar_catalogo, calentar_rutas
+from motor_malla.catalogo import Catalogo
+from motor_malla.errores import (
+    CURSO_DUPLICADO, CURSO_MALLA_NO_ENCONTRADO, CURSO_NO_ENCONTRADO, ESTADO_INVALIDO, MALLA_DUPLICADA,
+    MALLA_NO_ENCONTRADA, CURSO_CON_DEPENDIENTES, NADA_QUE_DESHACER, NADA_QUE_REHACER, UBICACION_DUPLICADA,
+    VERSION_NO_ENCONTRADA
+)
+from motor_malla.diff import comparar_mallas, parsear_referencia
+from motor_malla.historial import DESHACER, REHACER, Cambio, Historial, invertir, opuesta, sesion_actual
+from motor_malla.indice_espacial import IndiceEspacial
+from motor_malla.layout import reubicar
+from motor_malla.listado import LIMITE_POR_DEFECTO, IndiceMallas, codificar_cursor
+from motor_malla.modelos import CAMPOS_EDITABLES_MALLA, CAMPOS_RESUMEN_MALLA, ESTADOS_MALLA, Malla, MallaCurso
+from motor_malla.trazas import trazar
+from motor_malla.versiones import VersionMalla, actualizar_semestres, agrupar_por_semestre, crear_version
+from motor_malla.recarga import FuenteCatalogo
+from motor_malla.elegibilidad import CacheElegibilidad
+from motor_malla.ruta_critica import CacheRutaCritica
+from motor_malla.operaciones import (
+    BLOCK, CASCADE, PREVIEW, SIMPLE, GeneradorId, GeneradorIdMalla, construir_malla, consultar_dependientes,
+    contar_agregado, id_malla_secuencial, id_posicional, planificar_agregado, planificar_eliminacion
+)
+
+
+def _exclusivo(metodo):
+    """Ejecuta el método con el candado del almacén (lectura-modificación-escritura atómica)"""
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        with self._candado:
+            return metodo(self, *args, **kwargs)
+    return envoltura
+
+
+class Almacen:
+    """Gestor de mallas en memoria compartido por ambos backends"""
+
+    def __init__(self, catalogo: Union[Catalogo, FuenteCatalogo], mallas: MutableMapping = None,
+                 generar_id: GeneradorId = id_posicional,
+                 generar_id_malla: GeneradorIdMalla = id_malla_secuencial,
+                 historial: Historial = None):
+        self.fuente_catalogo = catalogo if isinstance(catalogo, FuenteCatalogo) else FuenteCatalogo(catalogo)
+        self.mallas = mallas if mallas is not None else {}
+        self.generar_id = generar_id
+        self.generar_id_malla = generar_id_malla
+        self.historial = historial
+        # Reentrante: las operaciones compuestas llaman a aplicar_cambio con el candado tomado.
+        # Se toma antes que el de CacheMallas, nunca al revés (ver _soltar_indice)
+        self._candado = threading.RLock()
+        # Índices espaciales por malla (se construyen en el primer uso)
+        self._indices: Dict[str, IndiceEspacial] = {}
+        # Borradores agrupados por semestre en tuplas compartidas con las versiones
+        self._semestres: Dict[str, Dict[int, tuple]] = {}
+        # curso_id -> ubicaciones de ese curso por malla (para recorrer dependientes sin escanear la malla)
+        self._por_curso: Dict[str, Dict[str, List[MallaCurso]]] = {}
+        # Siguiente índice para IDs de ubicación por malla: solo avanza, así un ID no se repite tras eliminar
+        self._siguiente_indice: Dict[str, int] = {}
+        # Versiones publicadas por malla y mallas modificadas desde su última publicación
+        self._versiones: Dict[str, List[VersionMalla]] = {}
+        self._sin_publicar = set()
+        # Análisis de ruta crítica por (malla_id, versión); el borrador es versión None
+        self._rutas = CacheRutaCritica()
+        # Matrices de elegibilidad (curso × semestre) por (malla_id, versión)
+        self._elegibilidad = CacheElegibilidad()
+        # Índices del listado (orden de creación + programa / periodo / estado)
+        self._listado = IndiceMallas()
+        for malla in self.mallas.values():
+            self._listado.insertar(malla)
+        # Una malla desalojada de la caché no debe retener su índice espacial
+        if hasattr(self.mallas, 'al_desalojar'):
+            self.mallas.al_desalojar = self._soltar_indice
+
+    @property
+    def catalogo(self) -> Catalogo:
+        """Catálogo fijado por la petición en curso, o el vigente"""
+        return self.fuente_catalogo.actual
+
+    # ==================== LECTURAS ====================
+
+    def obtener_cursos(self):
+        return self.catalogo.listar()
+
+    def obtener_curso(self, curso_id: str):
+        return self.catalogo.obtener(curso_id)
+
+    def obtener_dependientes(self, curso_id: str, profundidad: int = 1):
+        """Cursos que se desbloquean con `curso_id` (ver operaciones.consultar_dependientes)"""
+        return consultar_dependientes(self.catalogo, curso_id, profundidad)
+
+    def obtener_malla(self, malla_id: str) -> Optional[Malla]:
+        return self.mallas.get(malla_id)
+
+    def recorrer_mallas(self) -> Iterator[Malla]:
+        """
+        Todas las mallas, una a la vez. Con una CacheMallas las desbordadas se
+        leen del disco sin volverse residentes ni alterar el orden LRU.
+        """
+        if hasattr(self.mallas, 'recorrer'):
+            return self.mallas.recorrer()
+        return iter(list(self.mallas.values()))
+
+    def listar_mallas(self, filtros: Dict = None, despues: int = 0, limite: int = LIMITE_POR_DEFECTO):
+        """
+        Página de mallas (filas resumen, sin cursos) en orden de creación.
+
+        Returns:
+            tuple: (filas resumen, cursor de la siguiente página o None)
+        """
+        ids, siguiente = self._listado.buscar(filtros, despues, limite)
+        filas = [self._listado.resumen(malla_id) for malla_id in ids]
+        return filas, codificar_cursor(siguiente) if siguiente is not None else None
+
+    def _indice(self, malla_id: str) -> IndiceEspacial:
+        """Retorna el índice espacial de una malla, construyéndolo si no existe"""
+        indice = self._indices.get(malla_id)
+        if indice is None:
+            with self._candado:
+                indice = self._indices.get(malla_id)
+                if indice is None:
+                    indice = IndiceEspacial()
+                    for curso in self.mallas[malla_id].cursos:
+                        indice.insertar(curso)
+                    self._indices[malla_id] = indice
+        return indice
+
+    def _semestres_de(self, malla_id: str) -> Dict[int, tuple]:
+        """Borrador agrupado por semestre, construyéndolo si no existe"""
+        semestres = self._semestres.get(malla_id)
+        if semestres is None:
+            with self._candado:
+                semestres = self._semestres.get(malla_id)
+                if semestres is None:
+                    semestres = agrupar_por_semestre(self.mallas[malla_id].cursos)
+                    self._semestres[malla_id] = semestres
+        return semestres
+
+    def _ubicaciones_por_curso(self, malla_id: str) -> Dict[str, List[MallaCurso]]:
+        """curso_id -> ubicaciones del borrador (sin claves vacías), construyéndolo si no existe"""
+        por_curso = self._por_curso.get(malla_id)
+        if por_curso is None:
+            with self._candado:
+                por_curso = self._por_curso.get(malla_id)
+                if por_curso is None:
+                    por_curso = {}
+                    for c in self.mallas[malla_id].cursos:
+                        por_curso.setdefault(c.curso_id, []).append(c)
+                    self._por_curso[malla_id] = por_curso
+        return por_curso
+
+    def _generador_ids(self, malla_id: str) -> GeneradorId:
+        """Generador de IDs de ubicación de la malla que no repite IDs (ni de ubicaciones ya eliminadas)"""
+        indice = self._indice(malla_id)
+
+        def generar(curso_id: str, _: int) -> str:
+            numero = self._siguiente_indice.get(malla_id, len(self.mallas[malla_id].cursos))
+            nuevo_id = self.generar_id(curso_id, numero)
+            while indice.obtener(nuevo_id) is not None:
+                numero += 1
+                nuevo_id = self.generar_id(curso_id, numero)
+            self._siguiente_indice[malla_id] = numero + 1
+            return nuevo_id
+        return generar
+
+    def _soltar_indice(self, malla_id: str):
+        # Lo llama la caché con su candado tomado: no toma el del almacén (evita el interbloqueo)
+        self._indices.pop(malla_id, None)
+        self._semestres.pop(malla_id, None)
+        self._por_curso.pop(malla_id, None)
+        self._rutas.descartar((malla_id, None))
+        self._elegibilidad.descartar((malla_id, None))
+
+    def estadisticas_cache(self) -> Optional[Dict]:
+        """Contadores de la caché de mallas (None si las mallas viven en un dict)"""
+        if hasattr(self.mallas, 'estadisticas'):
+            return self.mallas.estadisticas()
+        return None
+
+    def ubicaciones_por_malla(self) -> Dict[str, int]:
+        """malla_id -> cantidad de cursos ubicados (desde el listado, sin materializar mallas)"""
+        return self._listado.totales()
+
+    def calentar(self, preparacion):
+        """Catálogo derivado, índices de la primera malla y caminos calientes (ver calentamiento)"""
+        calentar_catalogo(self.catalogo, preparacion)
+        malla_id = next(iter(self.mallas), None)
+        if malla_id is None:
+            return
+        with preparacion.paso('indices_malla'):
+            self._indice(malla_id)
+            self._semestres_de(malla_id)
+        calentar_rutas(self.catalogo, self.mallas[malla_id], self.generar_id, preparacion)
+
+    # ==================== MUTACIONES ====================
+
+    def _guardar(self, malla: Malla):
+        """Registra una malla modificada en el lugar (caché y listado)"""
+        self.mallas[malla.id] = malla
+        self._listado.actualizar(malla)
+
+    @trazar("almacen.aplicar_cambio")
+    @_exclusivo
+    def aplicar_cambio(self, malla_id: str, cambio: Cambio, registrar: bool = True):
+        """
+        Aplica un cambio a la malla. Es el único camino de escritura.
+
+        El inverso se calcula con búsquedas O(1) en el índice espacial, solo
+        sobre las ubicaciones que el cambio toca. Agregar ubicaciones nuevas
+        no recorre la malla.
+
+        Returns:
+            tuple: (Cambio inverso, None) o (None, mensaje de error)
+        """
+        if malla_id not in self.mallas:
+            return None, MALLA_NO_ENCONTRADA
+
+        malla = self.mallas[malla_id]
+        indice = self._indice(malla_id)
+        # Los metadatos que no cambian no cuentan como edición (ni para deshacer ni para publicar)
+        metadatos = tuple((campo, valor) for campo, valor in cambio.metadatos if getattr(malla, campo) != valor)
+        if metadatos != cambio.metadatos:
+            cambio = replace(cambio, metadatos=metadatos)
+        inverso = invertir(cambio, indice.obtener, lambda campo: getattr(malla, campo))
+
+        quitar = set(cambio.quitar)
+        reemplazos = {c.id: c for c in cambio.poner if c.id not in quitar and indice.obtener(c.id)}
+        anteriores = [indice.obtener(i) for i in quitar | reemplazos.keys()]
+        anteriores = [c for c in anteriores if c is not None]
+        if malla_id in self._semestres and (quitar or cambio.poner):
+            # Copy-on-write: solo se reconstruyen los semestres tocados
+            self._semestres[malla_id] = actualizar_semestres(self._semestres[malla_id], anteriores, cambio.poner)
+        por_curso = self._por_curso.get(malla_id)
+        if por_curso is not None:
+            for curso in anteriores:
+                ubicaciones = [c for c in por_curso.get(curso.curso_id, ()) if c is not curso]
+                if ubicaciones:
+                    por_curso[curso.curso_id] = ubicaciones
+                else:
+                    por_curso.pop(curso.curso_id, None)
+            for curso in cambio.poner:
+                por_curso.setdefault(curso.curso_id, []).append(curso)
+        if quitar or reemplazos:
+            malla.cursos = [reemplazos.get(c.id, c) for c in malla.cursos if c.id not in quitar]
+        malla.cursos.extend(c for c in cambio.poner if c.id not in reemplazos)
+        for curso_malla_id in quitar:
+            indice.eliminar(curso_malla_id)
+        for curso in cambio.poner:
+            indice.insertar(curso)
+        for campo, valor in cambio.metadatos:
+            setattr(malla, campo, valor)
+        self._guardar(malla)
+        if cambio:
+            self._sin_publicar.add(malla_id)
+
+        if registrar and self.historial is not None:
+            self.historial.registrar(sesion_actual.get(), malla_id, inverso)
+        return inverso, None
+
+    @_exclusivo
+    def guardar_cursos(self, malla_id: str, agregar: Iterable[MallaCurso] = (),
+                       actualizar: Iterable[MallaCurso] = ()):
+        """
+        Agrega ubicaciones nuevas y reemplaza (por ID) ubicaciones existentes.
+        Agregar nunca reemplaza: un ID que ya está en la malla es un error.
+        """
+        if malla_id not in self.mallas:
+            return None, MALLA_NO_ENCONTRADA
+
+        agregar = tuple(agregar)
+        indice = self._indice(malla_id)
+        ids = [c.id for c in agregar]
+        if len(set(ids)) != len(ids) or any(indice.obtener(i) is not None for i in ids):
+            return None, UBICACION_DUPLICADA
+
+        _, error = self.aplicar_cambio(malla_id, Cambio(poner=agregar + tuple(actualizar)))
+        if error:
+            return None, error
+        return self.mallas[malla_id], None
+
+    @_exclusivo
+    def crear_malla(self, datos: Dict):
+        """Crea una malla vacía; sin ID explícito se genera uno"""
+        numero = len(self.mallas) + 1
+        nuevo_id = self.generar_id_malla(numero)
+        while nuevo_id in self.mallas:
+            numero += 1
+            nuevo_id = self.generar_id_malla(numero)
+
+        malla, error = construir_malla(datos, nuevo_id)
+        if error:
+            return None, error
+        if malla.id in self.mallas:
+            return None, MALLA_DUPLICADA
+
+        self.mallas[malla.id] = malla
+        self._listado.insertar(malla)
+        return malla, None
+
+    @_exclusivo
+    def reemplazar_cursos_malla(self, malla_id: str, cursos: List[MallaCurso]):
+        """Reemplaza todas las ubicaciones de la malla"""
+        if malla_id not in self.mallas:
+            return None, MALLA_NO_ENCONTRADA
+
+        actuales = tuple(c.id for c in self.mallas[malla_id].cursos)
+        self.aplicar_cambio(malla_id, Cambio(quitar=actuales, poner=tuple(cursos)))
+        return self.mallas[malla_id], None
+
+    @_exclusivo
+    def actualizar_malla(self, malla_id: str, cambios: Dict):
+        """Actualiza los metadatos de la malla (nombre, créditos, estado, etc)"""
+        if malla_id not in self.mallas:
+            return None, MALLA_NO_ENCONTRADA
+
+        if cambios.get('estado') is not None and cambios['estado'] not in ESTADOS_MALLA:
+            return None, ESTADO_INVALIDO
+
+        metadatos = tuple(
+            (campo, cambios[campo]) for campo in CAMPOS_EDITABLES_MALLA if cambios.get(campo) is not None
+        )
+        self.aplicar_cambio(malla_id, Cambio(metadatos=metadatos))
+        return self.mallas[malla_id], None
+
+    @_exclusivo
+    def agregar_curso_malla(self, malla_id: str, curso_id: str, posicion_x: int, posicion_y: int, semestre: int):
+        """Agrega un curso a una malla"""
+        if malla_id not in self.mallas:
+            return None, MALLA_NO_ENCONTRADA
+
+        if curso_id not in self.catalogo:
+            return None, CURSO_NO_ENCONTRADO
+
+        if curso_id in self._ubicaciones_por_curso(malla_id):
+            return None, CURSO_DUPLICADO
+
+        nuevo_curso = MallaCurso(
+            id=self._generador_ids(malla_id)(curso_id, 0),
+            curso_id=curso_id,
+            posicion_x=posicion_x,
+            posicion_y=posicion_y,
+            semestre=semestre
+        )
+        _, error = self.guardar_cursos(malla_id, agregar=[nuevo_curso])
+        if error:
+            return None, error
+        return nuevo_curso, None
+
+    @_exclusivo
+    def agregar_con_prerequisitos(self, malla_id: str, curso_id: str, posicion_x: int, posicion_y: int, semestre: int):
+        """Agrega un curso con sus prerequisitos faltantes (ver operaciones.planificar_agregado)"""
+        if malla_id not in self.mallas:
+            return None, MALLA_NO_ENCONTRADA
+
+        plan, error = planificar_agregado(
+            self.catalogo, self.mallas[malla_id].cursos, curso_id,
+            posicion_x, posicion_y, semestre, self._generador_ids(malla_id)
+        )
+        if error:
+            return None, error
+
+        _, error = self.guardar_cursos(malla_id, agregar=plan.nuevos, actualizar=plan.movidos)
+        if error:
+            return None, error
+        contar_agregado(plan)
+        return plan, None
+
+    @_exclusivo
+    def actualizar_posicion_curso(self, malla_id: str, curso_malla_id: str, posicion_x: int, posicion_y: int,
+                                  semestre: int = None):
+        """Actualiza la posición y/o semestre de un curso en la malla"""
+        if malla_id not in self.mallas:
+            return None, MALLA_NO_ENCONTRADA
+
+        curso = self._indice(malla_id).obtener(curso_malla_id)
+        if not curso:
+            return None, CURSO_MALLA_NO_ENCONTRADO
+
+        curso = replace(
+            curso,
+            posicion_x=posicion_x,
+            posicion_y=posicion_y,
+            semestre=curso.semestre if semestre is None else semestre
+        )
+        self.guardar_cursos(malla_id, actualizar=[curso])
+        return curso, None
+
+    @_exclusivo
+    def eliminar_curso_malla(self, malla_id: str, curso_malla_id: str, modo: str = SIMPLE):
+        """
+        Elimina un curso de la malla según el modo:
+        - simple: solo la ubicación (sus dependientes quedan sin el prerequisito)
+        - preview: no elimina nada, solo calcula el impacto
+        - block: elimina solo si ninguna ubicación depende del curso
+        - cascade: elimina el curso y todos sus dependientes en un solo cambio
+
+        Returns:
+            tuple: (PlanEliminacion, None) o (None, error); con block y
+            dependientes retorna (plan, CURSO_CON_DEPENDIENTES) para informarlos
+        """
+        if malla_id not in self.mallas:
+            return None, MALLA_NO_ENCONTRADA
+
+        curso = self._indice(malla_id).obtener(curso_malla_id)
+        if curso is None:
+            return None, CURSO_MALLA_NO_ENCONTRADO
+
+        por_curso = self._ubicaciones_por_curso(malla_id)
+        plan = planificar_eliminacion(self.catalogo, lambda curso_id: por_curso.get(curso_id, ()), curso)
+        if modo == PREVIEW:
+            return plan, None
+        if modo == BLOCK and plan.dependientes:
+            return plan, CURSO_CON_DEPENDIENTES
+
+        quitar = plan.ids if modo == CASCADE else (curso_malla_id,)
+        self.aplicar_cambio(malla_id, Cambio(quitar=quitar))
+        return plan, None
+
+    @_exclusivo
+    def aplicar_layout(self, malla_id: str, semestres=None):
+        """
+        Recalcula las posiciones de la malla con el motor de layout.
+        Si se indican semestres, solo se reubican esas columnas (incremental).
+        """
+        if malla_id not in self.mallas:
+            return None, MALLA_NO_ENCONTRADA
+
+        actualizados = reubicar(self.mallas[malla_id].cursos, self.catalogo.prerequisitos_de, semestres)
+        self.guardar_cursos(malla_id, actualizar=actualizados)
+        return actualizados, None
+
+    # ==================== VERSIONES ====================
+
+    @_exclusivo
+    def publicar_version(self, malla_id: str):
+        """
+        Congela el borrador como una versión inmutable.
+        Si no cambió desde la última publicación, retorna esa misma versión.
+        """
+        if malla_id not in self.mallas:
+            return None, MALLA_NO_ENCONTRADA
+
+        versiones = self._versiones.setdefault(malla_id, [])
+        if versiones and malla_id not in self._sin_publicar:
+            return versiones[-1], None
+
+        malla = self.mallas[malla_id]
+        version = crear_version(
+            malla_id, len(versiones) + 1,
+            {campo: getattr(malla, campo) for campo in CAMPOS_RESUMEN_MALLA},
+            self._semestres_de(malla_id)
+        )
+        versiones.append(version)
+        self._sin_publicar.discard(malla_id)
+        return version, None
+
+    def listar_versiones(self, malla_id: str):
+        if malla_id not in self.mallas:
+            return None, MALLA_NO_ENCONTRADA
+        return list(self._versiones.get(malla_id, [])), None
+
+    def obtener_version(self, malla_id: str, numero: int):
+        if malla_id not in self.mallas:
+            return None, MALLA_NO_ENCONTRADA
+        versiones = self._versiones.get(malla_id, [])
+        if not 1 <= numero <= len(versiones):
+            return None, VERSION_NO_ENCONTRADA
+        return versiones[numero - 1], None
+
+    def obtener_semestres(self, malla_id: str, numero: int = None):
+        """Borrador (numero=None) o versión publicada, agrupados por semestre"""
+        if numero is None:
+            if malla_id not in self.mallas:
+                return None, MALLA_NO_ENCONTRADA
+            return self._semestres_de(malla_id), None
+        version, error = self.obtener_version(malla_id, numero)
+        if error:
+            return None, error
+        return version.semestres, None
+
+    def obtener_instantanea(self, malla_id: str, numero: int = None):
+        """
+        Semestres y metadatos del borrador (numero=None) o de una versión publicada.
+
+        Returns:
+            tuple: ((semestres, metadatos), None) o (None, error)
+        """
+        semestres, error = self.obtener_semestres(malla_id, numero)
+        if error:
+            return None, error
+        if numero is None:
+            malla = self.mallas[malla_id]
+            metadatos = {campo: getattr(malla, campo) for campo in CAMPOS_RESUMEN_MALLA}
+        else:
+            metadatos = self._versiones[malla_id][numero - 1].metadatos
+        return (semestres, metadatos), None
+
+    def ruta_critica(self, malla_id: str, numero: int = None):
+        """
+        Ruta crítica y holgura del borrador (numero=None) o de una versión publicada.
+        Se recalcula solo si cambiaron sus semestres, el catálogo o el número de niveles.
+        """
+        instantanea, error = self.obtener_instantanea(malla_id, numero)
+        if error:
+            return None, error
+        semestres, metadatos = instantanea
+        return self._rutas.obtener(
+            (malla_id, numero), semestres, self.catalogo, metadatos['numero_niveles']
+        ), None
+
+    def elegibilidad(self, malla_id: str, numero: int = None):
+        """Semestres válidos de cada curso del catálogo en el borrador o una versión (memoizado)"""
+        instantanea, error = self.obtener_instantanea(malla_id, numero)
+        if error:
+            return None, error
+        semestres, metadatos = instantanea
+        return self._elegibilidad.obtener(
+            (malla_id, numero), semestres, self.catalogo, metadatos['numero_niveles']
+        ), None
+
+    def comparar(self, referencia_a: str, referencia_b: str):
+        """Diferencias entre dos mallas o versiones ('MALLA001' o 'MALLA001@2')"""
+        semestres = []
+        for referencia in (referencia_a, referencia_b):
+            malla_id, numero, error = parsear_referencia(referencia)
+            if error:
+                return None, error
+            grupo, error = self.obtener_semestres(malla_id, numero)
+            if error:
+                return None, error
+            semestres.append(grupo)
+        return comparar_mallas(*semestres), None
+
+    # ==================== DESHACER / REHACER ====================
+
+    @_exclusivo
+    def _revertir(self, malla_id: str, pila: str, vacia: str):
+        """Aplica el último cambio de `pila` y guarda su inverso en la pila opuesta"""
+        if malla_id not in self.mallas:
+            return None, MALLA_NO_ENCONTRADA
+
+        sesion = sesion_actual.get()
+        cambio = self.historial.sacar(sesion, malla_id, pila) if self.historial else None
+        if cambio is None:
+            return None, vacia
+
+        inverso, _ = self.aplicar_cambio(malla_id, cambio, registrar=False)
+        self.historial.apilar(sesion, malla_id, opuesta(pila), inverso)
+        return self.mallas[malla_id], None
+
+    def deshacer(self, malla_id: str):
+        """Deshace la última edición de la sesión actual sobre la malla"""
+        return self._revertir(malla_id, DESHACER, NADA_QUE_DESHACER)
+
+    def rehacer(self, malla_id: str):
+        """Rehace la última edición deshecha por la sesión actual"""
+        return self._revertir(malla_id, REHACER, NADA_QUE_REHACER)
+
+    def pendientes_historial(self, malla_id: str) -> Dict[str, int]:
+        """Cambios que la sesión actual puede deshacer y rehacer en la malla"""
+        if self.historial is None:
+            return {DESHACER: 0, REHACER: 0}
+        return self.historial.tamanos(sesion_actual.get(), malla_id)
+
+    # ==================== CONSULTAS ESPACIALES ====================
+
+    def buscar_cursos_en_area(self, malla_id: str, x0: int, y0: int, x1: int, y1: int):
+        """Retorna los cursos de la malla visibles en el rectángulo (x0, y0, x1, y1)"""
+        if malla_id not in self.mallas:
+            return None, MALLA_NO_ENCONTRADA
+
+        return self._indice(malla_id).buscar(x0, y0, x1, y1), None
+
+    def detectar_solapamientos(self, malla_id: str, posicion_x: int, posicion_y: int, excluir: str = None):
+        """Retorna los cursos que se solapan con una tarjeta soltada en (posicion_x, posicion_y)"""
+        if malla_id not in self.mallas:
+            return None, MALLA_NO_ENCONTRADA
+
+        return self._indice(malla_id).solapamientos(posicion_x, posicion_y, excluir), None
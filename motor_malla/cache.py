@@ -0,0 +1,241 @@
+"""
+Caché de mallas materializadas con desborde a disco
+Mapeo malla_id -> Malla que mantiene en memoria solo las mallas usadas
+recientemente (LRU) dentro de un presupuesto de bytes. Las mallas frías se
+escriben a disco en una representación compacta (columnas + zlib) y se
+recargan de forma transparente al volver a pedirlas.
+
+Las mallas se modifican en el lugar: quien las modifica debe reasignarlas
+(`cache[malla_id] = malla`) para marcarlas como sucias, igual que con un dict.
+"""
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Callable, Dict, Iterator, Optional
+
+from motor_malla.modelos import Malla, MallaCurso
+
+# Presupuesto por defecto de mallas residentes (bytes aproximados)
+PRESUPUESTO_POR_DEFECTO = 64 * 1024 * 1024
+
+# Costo aproximado en memoria de una malla vacía y de cada ubicación
+# (objeto dataclass + dict de atributos + cadenas de ID)
+BYTES_BASE_MALLA = 1024
+BYTES_POR_UBICACION = 320
+
+COLUMNAS_UBICACION = ('id', 'curso_id', 'posicion_x', 'posicion_y', 'semestre')
+
+
+def estimar_bytes(malla: Malla) -> int:
+    """Tamaño aproximado de una malla materializada"""
+    return BYTES_BASE_MALLA + BYTES_POR_UBICACION * len(malla.cursos)
+
+
+def serializar_malla(malla: Malla) -> bytes:
+    """Representación compacta: metadatos + ubicaciones como filas sin claves, comprimido"""
+    datos = {campo: valor for campo, valor in vars(malla).items() if campo != 'cursos'}
+    datos['cursos'] = [[getattr(c, col) for col in COLUMNAS_UBICACION] for c in malla.cursos]
+    return zlib.compress(json.dumps(datos, separators=(',', ':')).encode(), 1)
+
+
+def deserializar_malla(contenido: bytes) -> Malla:
+    datos = json.loads(zlib.decompress(contenido))
+    cursos = [MallaCurso(*fila) for fila in datos.pop('cursos')]
+    return Malla(cursos=cursos, **datos)
+
+
+class CacheMallas(MutableMapping):
+    """
+    LRU de mallas acotado por bytes, con desborde a un directorio.
+
+    Contadores: aciertos (malla residente), fallos (recargada de disco),
+    desalojos (sacada de memoria) y escrituras (volcada a disco).
+    """
+
+    def __init__(self, mallas: Dict[str, Malla] = None, presupuesto_bytes: int = PRESUPUESTO_POR_DEFECTO,
+                 directorio: str = None, al_desalojar: Callable[[str], None] = None):
+        self.presupuesto_bytes = presupuesto_bytes
+        self._directorio = directorio  # Se crea con el primer desborde, no al arrancar
+        self._directorio_creado = False
+        self.al_desalojar = al_desalojar
+
+        self._residentes: "OrderedDict[str, Malla]" = OrderedDict()
+        self._bytes: Dict[str, int] = {}
+        self._sucias = set()
+        self._en_disco = set()
+        self._claves: Dict[str, None] = {}  # Todas las mallas, en orden de inserción
+        self._bytes_residentes = 0
+        self._candado = threading.RLock()
+
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.escrituras = 0
+
+        for malla_id, malla in (mallas or {}).items():
+            self[malla_id] = malla
+
+    # ==================== DISCO ====================
+
+    @property
+    def directorio(self) -> str:
+        if not self._directorio_creado:
+            if self._directorio is None:
+                # Directorio propio del proceso: se borra al terminar
+                self._directorio = tempfile.mkdtemp(prefix='malla_cache_')
+                atexit.register(shutil.rmtree, self._directorio, True)
+            else:
+                os.makedirs(self._directorio, exist_ok=True)
+            self._directorio_creado = True
+        return self._directorio
+
+    def _ruta(self, malla_id: str) -> str:
+        nombre = hashlib.sha1(malla_id.encode()).hexdigest()
+        return os.path.join(self.directorio, f"{nombre}.malla")
+
+    def _volcar(self, malla_id: str, malla: Malla):
+        ruta = self._ruta(malla_id)
+        temporal = f"{ruta}.tmp"
+        with open(temporal, 'wb') as archivo:
+            archivo.write(serializar_malla(malla))
+        os.replace(temporal, ruta)
+        self._en_disco.add(malla_id)
+        self.escrituras += 1
+
+    def _cargar(self, malla_id: str) -> Malla:
+        with open(self._ruta(malla_id), 'rb') as archivo:
+            return deserializar_malla(archivo.read())
+
+    # ==================== MEMORIA ====================
+
+    def _residir(self, malla_id: str, malla: Malla):
+        """Registra la malla como la más reciente y desaloja las frías si se excede el presupuesto"""
+        self._bytes_residentes -= self._bytes.get(malla_id, 0)
+        self._residentes[malla_id] = malla
+        self._residentes.move_to_end(malla_id)
+        self._bytes[malla_id] = estimar_bytes(malla)
+        self._bytes_residentes += self._bytes[malla_id]
+
+        # La malla recién usada nunca se desaloja, aunque sola exceda el presupuesto
+        while self._bytes_residentes > self.presupuesto_bytes and len(self._residentes) > 1:
+            frio_id, frio = self._residentes.popitem(last=False)
+            self._bytes_residentes -= self._bytes.pop(frio_id)
+            if frio_id in self._sucias or frio_id not in self._en_disco:
+                self._volcar(frio_id, frio)
+            self._sucias.discard(frio_id)
+            self.desalojos += 1
+            if self.al_desalojar is not None:
+                self.al_desalojar(frio_id)
+
+    # ==================== MAPEO ====================
+
+    def __getitem__(self, malla_id: str) -> Malla:
+        with self._candado:
+            malla = self._residentes.get(malla_id)
+            if malla is not None:
+                self._residentes.move_to_end(malla_id)
+                self.aciertos += 1
+                return malla
+            if malla_id not in self._en_disco:
+                raise KeyError(malla_id)
+            self.fallos += 1
+            malla = self._cargar(malla_id)
+            self._residir(malla_id, malla)
+            return malla
+
+    def __setitem__(self, malla_id: str, malla: Malla):
+        with self._candado:
+            self._claves[malla_id] = None
+            self._sucias.add(malla_id)
+            self._residir(malla_id, malla)
+
+    def __delitem__(self, malla_id: str):
+        with self._candado:
+            if malla_id not in self._claves:
+                raise KeyError(malla_id)
+            del self._claves[malla_id]
+            if malla_id in self._residentes:
+                del self._residentes[malla_id]
+                self._bytes_residentes -= self._bytes.pop(malla_id)
+            self._sucias.discard(malla_id)
+            if malla_id in self._en_disco:
+                self._en_disco.discard(malla_id)
+                os.remove(self._ruta(malla_id))
+
+    def __contains__(self, malla_id) -> bool:
+        return malla_id in self._claves
+
+    def __iter__(self):
+        return iter(list(self._claves))
+
+    def __len__(self) -> int:
+        return len(self._claves)
+
+    def residente(self, malla_id: str) -> bool:
+        """True si la malla está en memoria (leerla no toca el disco)"""
+        return malla_id in self._residentes
+
+    def get(self, malla_id: str, default=None) -> Optional[Malla]:
+        # Sin pasar por KeyError en el caso común
+        if malla_id not in self._claves:
+            return default
+        return self[malla_id]
+
+    # ==================== RECORRIDO ====================
+
+    def recorrer(self) -> Iterator[Malla]:
+        """
+        Todas las mallas en orden de inserción, sin tocar el orden LRU ni los contadores.
+        Las desbordadas se leen del disco y no se vuelven residentes, así un
+        recorrido completo (validación masiva) no desaloja las mallas calientes.
+        La lectura de disco se hace fuera del candado.
+        """
+        for malla_id in list(self._claves):
+            with self._candado:
+                malla = self._residentes.get(malla_id)
+                en_disco = malla is None and malla_id in self._en_disco
+                ruta = self._ruta(malla_id) if en_disco else None
+            if malla is None and ruta is not None:
+                try:
+                    with open(ruta, 'rb') as archivo:
+                        malla = deserializar_malla(archivo.read())
+                except FileNotFoundError:
+                    continue  # Eliminada durante el recorrido
+            if malla is not None:
+                yield malla
+
+    # ==================== ESTADÍSTICAS ====================
+
+    def estadisticas(self) -> Dict:
+        with self._candado:
+            return {
+                'mallas': len(self._claves),
+                'residentes': len(self._residentes),
+                'en_disco': len(self._en_disco),
+                'bytes_residentes': self._bytes_residentes,
+                'presupuesto_bytes': self.presupuesto_bytes,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'desalojos': self.desalojos,
+                'escrituras': self.escrituras,
+            }
+
+
+def crear_cache_mallas(mallas: Dict[str, Malla] = None) -> CacheMallas:
+    """
+    Caché configurada por variables de entorno:
+        MALLA_CACHE_BYTES: presupuesto de memoria (por defecto 64 MiB)
+        MALLA_CACHE_DIR: directorio de desborde (por defecto uno temporal)
+    """
+    return CacheMallas(
+        mallas,
+        presupuesto_bytes=int(os.environ.get('MALLA_CACHE_BYTES', PRESUPUESTO_POR_DEFECTO)),
+        directorio=os.environ.get('MALLA_CACHE_DIR')
+    )
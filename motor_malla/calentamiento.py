@@ -0,0 +1,77 @@
+"""
+Calentamiento al iniciar y estado de preparación (/ready)
+Antes de recibir tráfico cada backend construye las estructuras derivadas
+del catálogo (cierres de prerequisitos, tabla de niveles, respuestas del
+catálogo ya codificadas) y recorre una vez los caminos calientes (agregar
+con prerequisitos, serializar una malla, índices de una malla). /health
+responde desde el arranque; /ready solo cuando el calentamiento terminó.
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from motor_malla.catalogo import Catalogo
+from motor_malla.diff import comparar_mallas
+from motor_malla.formatos import codificar, formatos_disponibles
+from motor_malla.modelos import Malla
+from motor_malla.operaciones import GeneradorId, planificar_agregado
+from motor_malla.versiones import agrupar_por_semestre
+
+
+class Preparacion:
+    """Estado del calentamiento: pasos con su duración, error si lo hubo"""
+
+    def __init__(self):
+        self.listo = False
+        self.error: Optional[str] = None
+        self.pasos: Dict[str, float] = {}  # nombre -> milisegundos
+        self._inicio = time.perf_counter()
+        self.duracion_ms: Optional[float] = None
+
+    @contextmanager
+    def paso(self, nombre: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.pasos[nombre] = round((time.perf_counter() - inicio) * 1000, 3)
+
+    def terminar(self, error: BaseException = None):
+        self.duracion_ms = round((time.perf_counter() - self._inicio) * 1000, 3)
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        else:
+            self.listo = True
+
+    def estado(self) -> Dict:
+        return {
+            'listo': self.listo,
+            'error': self.error,
+            'duracion_ms': self.duracion_ms,
+            'pasos': dict(self.pasos),
+        }
+
+
+def calentar_catalogo(catalogo: Catalogo, preparacion: Preparacion):
+    """Cierres de prerequisitos, niveles mínimos y catálogo codificado en cada formato"""
+    with preparacion.paso('cierres_y_niveles'):
+        catalogo.precalcular()
+    with preparacion.paso('catalogo_codificado'):
+        for formato in formatos_disponibles():
+            catalogo.codificado(formato)
+
+
+def calentar_rutas(catalogo: Catalogo, malla: Malla, generar_id: GeneradorId, preparacion: Preparacion):
+    """Recorre una vez los caminos calientes sobre `malla` sin modificarla"""
+    with preparacion.paso('serializacion'):
+        datos = malla.to_dict()
+        for formato in formatos_disponibles():
+            codificar(datos, formato)
+    with preparacion.paso('agregar_con_prerequisitos'):
+        en_malla = {c.curso_id for c in malla.cursos}
+        faltante = next((curso_id for curso_id in catalogo.cursos if curso_id not in en_malla), None)
+        if faltante is not None:
+            planificar_agregado(catalogo, malla.cursos, faltante, 0, 0, 1, generar_id)
+    with preparacion.paso('diff'):
+        semestres = agrupar_por_semestre(malla.cursos)
+        comparar_mallas(semestres, semestres)
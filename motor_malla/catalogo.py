@@ -0,0 +1,349 @@
+"""
+Catálogo de cursos y estructuras derivadas del grafo de prerequisitos
+El catálogo se trata como inmutable: las estructuras derivadas
+(cierres de prerequisitos, niveles mínimos, índice inverso de dependientes)
+se calculan una vez y se reutilizan
+"""
+import json
+from dataclasses import fields
+from typing import Dict, List, Optional
+
+from motor_malla.elegibilidad import CierresBits
+from motor_malla.formatos import codificar
+from motor_malla.grafo import dependientes_por_distancia, nivel_minimo, profundidades_prerequisitos
+from motor_malla.modelos import Curso, Malla, DifficultyLevel
+from motor_malla.trazas import span
+
+
+# Catálogo semilla (fuente única para ambos backends)
+CURSOS_SEMILLA = {
+    "PROG101": Curso(
+        id="PROG101",
+        nombre="Introducción a la Programación",
+        codigo="PROG101",
+        creditos=3,
+        semestre=1,
+        descripcion="Conceptos básicos de programación",
+        prerequisitos=[],
+        dificultad=DifficultyLevel.FACIL,
+        horas=48
+    ),
+    "PROG102": Curso(
+        id="PROG102",
+        nombre="Programación Orientada a Objetos",
+        codigo="PROG102",
+        creditos=4,
+        semestre=2,
+        descripcion="POO y patrones de diseño",
+        prerequisitos=["PROG101"],
+        dificultad=DifficultyLevel.INTERMEDIO,
+        horas=64
+    ),
+    "PROG103": Curso(
+        id="PROG103",
+        nombre="Estructuras de Datos",
+        codigo="PROG103",
+        creditos=4,
+        semestre=2,
+        descripcion="Listas, árboles, grafos",
+        prerequisitos=["PROG101"],
+        dificultad=DifficultyLevel.INTERMEDIO,
+        horas=64
+    ),
+    "PROG104": Curso(
+        id="PROG104",
+        nombre="Algoritmos Avanzados",
+        codigo="PROG104",
+        creditos=4,
+        semestre=3,
+        descripcion="Análisis y optimización de algoritmos",
+        prerequisitos=["PROG103"],
+        dificultad=DifficultyLevel.DIFÍCIL,
+        horas=64
+    ),
+    "BD101": Curso(
+        id="BD101",
+        nombre="Bases de Datos I",
+        codigo="BD101",
+        creditos=3,
+        semestre=2,
+        descripcion="Diseño relacional de bases de datos",
+        prerequisitos=["PROG101"],
+        dificultad=DifficultyLevel.INTERMEDIO,
+        horas=48
+    ),
+    "BD102": Curso(
+        id="BD102",
+        nombre="Bases de Datos II",
+        codigo="BD102",
+        creditos=3,
+        semestre=3,
+        descripcion="Optimización y transacciones",
+        prerequisitos=["BD101"],
+        dificultad=DifficultyLevel.INTERMEDIO,
+        horas=48
+    ),
+    "MATH101": Curso(
+        id="MATH101",
+        nombre="Cálculo I",
+        codigo="MATH101",
+        creditos=4,
+        semestre=1,
+        descripcion="Límites, derivadas e integrales",
+        prerequisitos=[],
+        dificultad=DifficultyLevel.FACIL,
+        horas=64
+    ),
+    "MATH102": Curso(
+        id="MATH102",
+        nombre="Álgebra Lineal",
+        codigo="MATH102",
+        creditos=3,
+        semestre=1,
+        descripcion="Matrices y espacios vectoriales",
+        prerequisitos=[],
+        dificultad=DifficultyLevel.FACIL,
+        horas=48
+    ),
+    "WEB101": Curso(
+        id="WEB101",
+        nombre="Desarrollo Web Frontend",
+        codigo="WEB101",
+        creditos=3,
+        semestre=3,
+        descripcion="HTML, CSS, JavaScript",
+        prerequisitos=["PROG102"],
+        dificultad=DifficultyLevel.INTERMEDIO,
+        horas=48
+    ),
+    "WEB102": Curso(
+        id="WEB102",
+        nombre="Desarrollo Web Backend",
+        codigo="WEB102",
+        creditos=3,
+        semestre=4,
+        descripcion="APIs REST y frameworks backend",
+        prerequisitos=["WEB101", "BD101"],
+        dificultad=DifficultyLevel.INTERMEDIO,
+        horas=48
+    ),
+}
+
+
+def crear_mallas_semilla() -> Dict[str, Malla]:
+    """Mallas iniciales de cada proceso"""
+    return {
+        "MALLA001": Malla(
+            id="MALLA001",
+            nombre="",  # Sin nombre predeterminado, el usuario debe ingresarlo
+            programa="Ingeniería de Sistemas",
+            cursos=[],
+            descripcion="Plan de estudios para Ingeniería de Sistemas",
+            periodo_vigencia="202420",
+            creditos_programa=48,
+            numero_niveles=4
+        )
+    }
+
+
+class Catalogo:
+    """
+    Catálogo de cursos con estructuras derivadas memoizadas.
+    No debe modificarse después de construido.
+    """
+
+    def __init__(self, cursos: Dict[str, Curso]):
+        self.cursos = cursos
+        self._profundidades: Dict[str, Dict[str, int]] = {}
+        self._niveles: Dict[str, int] = {}
+        self._codificados: Dict[str, bytes] = {}
+        self._dependientes: Optional[Dict[str, List[str]]] = None
+        self._cierres_bits: Optional[CierresBits] = None
+
+    def __contains__(self, curso_id: str) -> bool:
+        return curso_id in self.cursos
+
+    def __len__(self) -> int:
+        return len(self.cursos)
+
+    def obtener(self, curso_id: str) -> Optional[Curso]:
+        return self.cursos.get(curso_id)
+
+    def listar(self) -> List[Curso]:
+        return list(self.cursos.values())
+
+    def prerequisitos_de(self, curso_id: str) -> List[str]:
+        """Prerequisitos directos de un curso que existen en el catálogo"""
+        curso = self.cursos.get(curso_id)
+        if curso is None:
+            return []
+        return [p for p in curso.prerequisitos if p in self.cursos]
+
+    def creditos_de(self, curso_id: str) -> Optional[int]:
+        curso = self.cursos.get(curso_id)
+        return None if curso is None else curso.creditos
+
+    def indice_dependientes(self) -> Dict[str, List[str]]:
+        """Adyacencia inversa: prerequisito -> cursos que lo piden directamente (en orden del catálogo)"""
+        inverso = self._dependientes
+        if inverso is None:
+            inverso = {}
+            for dependiente_id in self.cursos:
+                for prereq_id in dict.fromkeys(self.prerequisitos_de(dependiente_id)):
+                    inverso.setdefault(prereq_id, []).append(dependiente_id)
+            self._dependientes = inverso
+        return inverso
+
+    def dependientes_de(self, curso_id: str) -> List[str]:
+        """Cursos que tienen a `curso_id` como prerequisito directo"""
+        return self.indice_dependientes().get(curso_id, [])
+
+    def dependientes(self, curso_id: str, profundidad_maxima: int = 1) -> List[Dict]:
+        """
+        Cursos que se desbloquean con `curso_id`, hasta `profundidad_maxima`
+        saltos (0 = todos). Costo proporcional al resultado.
+
+        Returns:
+            list: Diccionarios con id, nombre, codigo, creditos, semestre, dificultad
+                  y profundidad (distancia mínima: 1 = dependiente directo)
+        """
+        resultado = []
+        with span("catalogo.dependientes", curso_id=curso_id) as actual:
+            distancias = dependientes_por_distancia(self.dependientes_de, curso_id, profundidad_maxima)
+            for dependiente_id, profundidad in distancias.items():
+                dependiente = self.cursos[dependiente_id]
+                resultado.append({
+                    "id": dependiente_id,
+                    "nombre": dependiente.nombre,
+                    "codigo": dependiente.codigo,
+                    "creditos": dependiente.creditos,
+                    "semestre": dependiente.semestre,
+                    "dificultad": dependiente.dificultad,
+                    "profundidad": profundidad
+                })
+            actual.fijar("dependientes", len(resultado))
+        return resultado
+
+    def profundidades(self, curso_id: str) -> Dict[str, int]:
+        """Prerequisitos (directos e indirectos) del curso con su profundidad máxima"""
+        if curso_id not in self.cursos:
+            return {}
+        return profundidades_prerequisitos(self.prerequisitos_de, curso_id, self._profundidades)
+
+    def prerequisitos_recursivos(self, curso_id: str) -> List[Dict]:
+        """
+        Obtiene todos los prerequisitos de un curso de manera recursiva.
+
+        Returns:
+            list: Diccionarios nuevos (el llamador puede modificarlos) con:
+                - id, nombre, codigo, creditos, dificultad, horas
+                - profundidad: Nivel de dependencia (1 = directo, 2+ = indirecto)
+        """
+        resultado = []
+        with span("catalogo.prerequisitos_recursivos", curso_id=curso_id) as actual:
+            for prereq_id, profundidad in self.profundidades(curso_id).items():
+                prereq = self.cursos[prereq_id]
+                resultado.append({
+                    "id": prereq_id,
+                    "nombre": prereq.nombre,
+                    "codigo": prereq.codigo,
+                    "creditos": prereq.creditos,
+                    "dificultad": prereq.dificultad,
+                    "horas": prereq.horas,
+                    "profundidad": profundidad
+                })
+            actual.fijar("prerequisitos", len(resultado))
+        return resultado
+
+    def nivel_minimo(self, curso_id: str) -> int:
+        """Nivel (semestre) mínimo en el que puede ubicarse un curso"""
+        with span("catalogo.nivel_minimo", curso_id=curso_id):
+            nivel = self._niveles.get(curso_id)
+            if nivel is None:
+                nivel = self._niveles[curso_id] = nivel_minimo(self.profundidades(curso_id))
+            return nivel
+
+    def cierres_bits(self) -> CierresBits:
+        """Cierres de prerequisitos y de dependientes como bitsets (para la elegibilidad)"""
+        cierres = self._cierres_bits
+        if cierres is None:
+            cierres = self._cierres_bits = CierresBits(list(self.cursos), self.prerequisitos_de)
+        return cierres
+
+    def precalcular(self):
+        """Calcula de una vez los cierres de prerequisitos, la tabla de niveles mínimos y el índice inverso"""
+        for curso_id in self.cursos:
+            self.profundidades(curso_id)
+            self.nivel_minimo(curso_id)
+        self.indice_dependientes()
+
+    def codificado(self, formato: str) -> bytes:
+        """Respuesta de GET /api/cursos ya codificada en `formato` (se arma una sola vez)"""
+        contenido = self._codificados.get(formato)
+        if contenido is None:
+            cursos = [curso.to_dict() for curso in self.cursos.values()]
+            contenido = codificar({'exito': True, 'total': len(cursos), 'cursos': cursos}, formato)
+            self._codificados[formato] = contenido
+        return contenido
+
+
+def crear_catalogo_semilla() -> Catalogo:
+    return Catalogo(dict(CURSOS_SEMILLA))
+
+
+CAMPOS_CURSO = {campo.name for campo in fields(Curso)}
+
+
+def _curso_desde_dict(datos) -> Curso:
+    if not isinstance(datos, dict):
+        raise ValueError(f"cada curso debe ser un objeto, no {type(datos).__name__}")
+    desconocidos = set(datos) - CAMPOS_CURSO
+    if desconocidos:
+        raise ValueError(f"campos desconocidos en {datos.get('id')!r}: {', '.join(sorted(desconocidos))}")
+    try:
+        curso = Curso(**datos)
+    except TypeError as error:
+        raise ValueError(f"curso {datos.get('id')!r} incompleto: {error}") from None
+    if not isinstance(curso.id, str) or not curso.id:
+        raise ValueError("cada curso necesita un id")
+    for campo in ('creditos', 'semestre', 'horas'):
+        if not isinstance(getattr(curso, campo), int):
+            raise ValueError(f"{curso.id}: {campo} debe ser entero")
+    if not isinstance(curso.prerequisitos, list) or not all(isinstance(p, str) for p in curso.prerequisitos):
+        raise ValueError(f"{curso.id}: prerequisitos debe ser una lista de IDs")
+    try:
+        curso.dificultad = DifficultyLevel(curso.dificultad)
+    except ValueError:
+        raise ValueError(f"{curso.id}: dificultad inválida {curso.dificultad!r}") from None
+    return curso
+
+
+def cargar_catalogo(ruta: str) -> Catalogo:
+    """
+    Lee el catálogo de un archivo JSON: una lista de cursos o un objeto con la
+    clave "cursos" (la misma forma que responde GET /api/cursos, así que
+    `curl .../api/cursos > catalogo.json` sirve de punto de partida), o un
+    catálogo compilado (ver catalogo_binario), que se mapea en lugar de leerse.
+
+    Raises:
+        OSError: si el archivo no se puede leer
+        ValueError: si el contenido no es un catálogo válido
+    """
+    from motor_malla.catalogo_binario import abrir_catalogo, es_catalogo_compilado
+    if es_catalogo_compilado(ruta):
+        return abrir_catalogo(ruta)
+
+    with open(ruta, encoding='utf-8') as archivo:
+        datos = json.load(archivo)
+    if isinstance(datos, dict):
+        datos = datos.get('cursos')
+    if not isinstance(datos, list):
+        raise ValueError('se espera una lista de cursos o un objeto con "cursos"')
+
+    cursos: Dict[str, Curso] = {}
+    for elemento in datos:
+        curso = _curso_desde_dict(elemento)
+        if curso.id in cursos:
+            raise ValueError(f"curso duplicado: {curso.id}")
+        cursos[curso.id] = curso
+    return Catalogo(cursos)
@@ -0,0 +1,380 @@
+"""
+Catálogo compilado de solo lectura, mapeado en memoria
+Con varios procesos de trabajo (workers del servidor, procesos de la cola de
+trabajos o de la validación masiva) cada uno armaría su propia copia de los
+cursos y del grafo de prerequisitos. El catálogo compilado es un archivo
+binario que cada proceso abre con `mmap`: todos comparten la misma copia
+física en el page cache y abrirlo no parsea ni construye objetos (solo lee
+la cabecera). Los cursos se leen bajo demanda a través de vistas livianas.
+
+Formato (little-endian, secciones alineadas a 8 bytes):
+    cabecera   MAGIA, versión del formato, cantidades y desplazamientos
+    registros  un registro de ancho fijo por curso, en el orden del catálogo
+    inicio     CSR: prerequisitos del curso i en aristas[inicio[i]:inicio[i+1]]
+    aristas    índice del prerequisito (< total) o total + j = externos[j]
+    externos   IDs pedidos como prerequisito que no están en el catálogo
+    hash       tabla abierta crc32(id) -> índice + 1 (0 = vacío), sondeo lineal
+    cadenas    UTF-8 sin separadores; las cadenas repetidas se guardan una vez
+
+El archivo se reemplaza completo con `os.replace` al compilar: un proceso
+que ya lo tenía abierto sigue leyendo el anterior sin ver un archivo a medias.
+
+Uso:
+    python -m motor_malla.catalogo_binario catalogo.json catalogo.bin
+    MALLA_CATALOGO=catalogo.bin   # cargar_catalogo lo reconoce por la MAGIA
+"""
+import mmap
+import os
+import struct
+import sys
+import zlib
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional
+
+from motor_malla.catalogo import Catalogo
+from motor_malla.modelos import Curso, DifficultyLevel
+
+MAGIA = b'MALLACAT'
+VERSION_FORMATO = 1
+SIN_CADENA = 0xFFFFFFFF
+# Búsquedas recientes (id -> índice, índice -> id) que cada proceso recuerda
+RECIENTES = 16384
+
+# magia, versión, total, aristas, externos, ranuras y el desplazamiento de cada sección
+CABECERA = struct.Struct('<8sIIIIIQQQQQQQ')
+# (desplazamiento, largo) de id, nombre, codigo y descripcion; creditos, semestre, horas; dificultad
+REGISTRO = struct.Struct('<8I3iI')
+CADENA = struct.Struct('<2I')
+
+DIFICULTADES = list(DifficultyLevel)
+
+
+def _alinear(tamano: int) -> int:
+    return (tamano + 7) & ~7
+
+
+def _ranuras(total: int) -> int:
+    ranuras = 8
+    while ranuras < total * 2:
+        ranuras *= 2
+    return ranuras
+
+
+def compilar_catalogo(catalogo: Catalogo, ruta: str) -> int:
+    """
+    Escribe el catálogo en formato compilado (archivo temporal + os.replace).
+
+    Returns:
+        int: tamaño del archivo en bytes
+    """
+    ids = list(catalogo.cursos)
+    indice = {curso_id: i for i, curso_id in enumerate(ids)}
+    total = len(ids)
+
+    cadenas = bytearray()
+    posiciones: Dict[str, int] = {}
+
+    def cadena(texto: Optional[str]):
+        if texto is None:
+            return SIN_CADENA, 0
+        codificado = texto.encode('utf-8')
+        posicion = posiciones.get(texto)
+        if posicion is None:
+            posicion = posiciones[texto] = len(cadenas)
+            cadenas.extend(codificado)
+        return posicion, len(codificado)
+
+    registros = bytearray(REGISTRO.size * total)
+    inicio = [0]
+    aristas: List[int] = []
+    externos: List[str] = []
+    externo_de: Dict[str, int] = {}
+    for i, curso_id in enumerate(ids):
+        curso = catalogo.cursos[curso_id]
+        REGISTRO.pack_into(
+            registros, i * REGISTRO.size,
+            *cadena(curso.id), *cadena(curso.nombre), *cadena(curso.codigo), *cadena(curso.descripcion),
+            curso.creditos, curso.semestre, curso.horas, DIFICULTADES.index(DifficultyLevel(curso.dificultad))
+        )
+        for prereq_id in curso.prerequisitos:
+            if prereq_id in indice:
+                aristas.append(indice[prereq_id])
+            else:
+                if prereq_id not in externo_de:
+                    externo_de[prereq_id] = len(externos)
+                    externos.append(prereq_id)
+                aristas.append(total + externo_de[prereq_id])
+        inicio.append(len(aristas))
+
+    ranuras = _ranuras(total)
+    tabla = [0] * ranuras
+    for i, curso_id in enumerate(ids):
+        ranura = zlib.crc32(curso_id.encode('utf-8')) & (ranuras - 1)
+        while tabla[ranura]:
+            ranura = (ranura + 1) & (ranuras - 1)
+        tabla[ranura] = i + 1
+
+    secciones = [
+        bytes(registros),
+        struct.pack(f'<{len(inicio)}I', *inicio),
+        struct.pack(f'<{len(aristas)}I', *aristas),
+        b''.join(CADENA.pack(*cadena(externo)) for externo in externos),
+        struct.pack(f'<{ranuras}I', *tabla),
+    ]
+    desplazamientos = []
+    actual = _alinear(CABECERA.size)
+    for seccion in secciones + [cadenas]:
+        desplazamientos.append(actual)
+        actual = _alinear(actual + len(seccion))
+
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'wb') as archivo:
+        archivo.write(CABECERA.pack(
+            MAGIA, VERSION_FORMATO, total, len(aristas), len(externos), ranuras, *desplazamientos, len(cadenas)
+        ))
+        for desplazamiento, seccion in zip(desplazamientos, secciones + [bytes(cadenas)]):
+            archivo.write(b'\0' * (desplazamiento - archivo.tell()))
+            archivo.write(seccion)
+        archivo.flush()
+        os.fsync(archivo.fileno())
+        tamano = archivo.tell()
+    os.replace(temporal, ruta)
+    return tamano
+
+
+def es_catalogo_compilado(ruta: str) -> bool:
+    try:
+        with open(ruta, 'rb') as archivo:
+            return archivo.read(len(MAGIA)) == MAGIA
+    except OSError:
+        return False
+
+
+class VistaCurso:
+    """Lectura perezosa de un registro: cada campo se decodifica al pedirlo"""
+
+    __slots__ = ('_mapa', 'indice')
+
+    def __init__(self, mapa: "CursosMapeados", indice: int):
+        self._mapa = mapa
+        self.indice = indice
+
+    def _campo(self, posicion: int):
+        return REGISTRO.unpack_from(self._mapa._datos, self._mapa._registros + self.indice * REGISTRO.size)[posicion]
+
+    def _texto(self, posicion: int) -> Optional[str]:
+        campos = REGISTRO.unpack_from(self._mapa._datos, self._mapa._registros + self.indice * REGISTRO.size)
+        return self._mapa._cadena(campos[posicion], campos[posicion + 1])
+
+    @property
+    def id(self) -> str:
+        return self._texto(0)
+
+    @property
+    def nombre(self) -> str:
+        return self._texto(2)
+
+    @property
+    def codigo(self) -> str:
+        return self._texto(4)
+
+    @property
+    def descripcion(self) -> Optional[str]:
+        return self._texto(6)
+
+    @property
+    def creditos(self) -> int:
+        return self._campo(8)
+
+    @property
+    def semestre(self) -> int:
+        return self._campo(9)
+
+    @property
+    def horas(self) -> int:
+        return self._campo(10)
+
+    @property
+    def dificultad(self) -> DifficultyLevel:
+        return DIFICULTADES[self._campo(11)]
+
+    @property
+    def prerequisitos(self) -> List[str]:
+        return self._mapa._prerequisitos(self.indice, incluir_externos=True)
+
+    def a_curso(self) -> Curso:
+        """Curso nuevo (el llamador puede modificarlo) con todos los campos del registro"""
+        return self._mapa._curso(self.indice)
+
+
+class CursosMapeados(Mapping):
+    """
+    Mapping curso_id -> Curso de solo lectura sobre el archivo mapeado.
+    Itera en el orden del catálogo; cada acceso arma un Curso nuevo.
+    """
+
+    def __init__(self, ruta: str):
+        with open(ruta, 'rb') as archivo:
+            self._mmap = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < CABECERA.size or self._mmap[:len(MAGIA)] != MAGIA:
+            raise ValueError("no es un catálogo compilado")
+        (_, version, self._total, aristas, externos, self._ranuras, self._registros, inicio,
+         posicion_aristas, posicion_externos, hash_, self._cadenas, tamano_cadenas) = CABECERA.unpack_from(self._mmap)
+        if version != VERSION_FORMATO:
+            raise ValueError(f"versión de formato {version} no soportada (se espera {VERSION_FORMATO})")
+        if self._cadenas + tamano_cadenas > len(self._mmap):
+            raise ValueError("catálogo compilado truncado")
+        if sys.byteorder != 'little':
+            raise ValueError("el catálogo compilado solo se lee en arquitecturas little-endian")
+        self.ruta = ruta
+        self._datos = memoryview(self._mmap)
+        self._inicio = self._datos[inicio:inicio + 4 * (self._total + 1)].cast('I')
+        self._aristas = self._datos[posicion_aristas:posicion_aristas + 4 * aristas].cast('I')
+        self._externos = self._datos[posicion_externos:posicion_externos + 4 * 2 * externos].cast('I')
+        self._hash = self._datos[hash_:hash_ + 4 * self._ranuras].cast('I')
+        # Caché acotada de lo más consultado: el resto se sigue leyendo del mmap compartido
+        self.indice = lru_cache(maxsize=RECIENTES)(self.indice)
+        self.id_de = lru_cache(maxsize=RECIENTES)(self.id_de)
+
+    # ---------- Mapping ----------
+
+    def __len__(self) -> int:
+        return self._total
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._total):
+            yield self.id_de(i)
+
+    def __contains__(self, curso_id) -> bool:
+        return self.indice(curso_id) is not None
+
+    def __getitem__(self, curso_id: str) -> Curso:
+        i = self.indice(curso_id)
+        if i is None:
+            raise KeyError(curso_id)
+        return self._curso(i)
+
+    def get(self, curso_id, defecto=None):
+        i = self.indice(curso_id)
+        return defecto if i is None else self._curso(i)
+
+    # ---------- acceso por índice ----------
+
+    def indice(self, curso_id) -> Optional[int]:
+        """Posición del curso en el catálogo (None si no está)"""
+        if not isinstance(curso_id, str):
+            return None
+        buscado = curso_id.encode('utf-8')
+        mascara = self._ranuras - 1
+        ranura = zlib.crc32(buscado) & mascara
+        while True:
+            valor = self._hash[ranura]
+            if not valor:
+                return None
+            posicion, largo = REGISTRO.unpack_from(self._datos, self._registros + (valor - 1) * REGISTRO.size)[:2]
+            if largo == len(buscado) and self._datos[self._cadenas + posicion:self._cadenas + posicion + largo] == buscado:
+                return valor - 1
+            ranura = (ranura + 1) & mascara
+
+    def id_de(self, indice: int) -> str:
+        posicion, largo = REGISTRO.unpack_from(self._datos, self._registros + indice * REGISTRO.size)[:2]
+        return self._cadena(posicion, largo)
+
+    def vista(self, indice: int) -> VistaCurso:
+        return VistaCurso(self, indice)
+
+    def prerequisitos_indices(self, indice: int) -> memoryview:
+        """Aristas del curso en el CSR: índices < len(self) son cursos del catálogo"""
+        return self._aristas[self._inicio[indice]:self._inicio[indice + 1]]
+
+    def _cadena(self, posicion: int, largo: int) -> Optional[str]:
+        if posicion == SIN_CADENA:
+            return None
+        return str(self._datos[self._cadenas + posicion:self._cadenas + posicion + largo], 'utf-8')
+
+    def _prerequisitos(self, indice: int, incluir_externos: bool) -> List[str]:
+        resultado = []
+        for arista in self.prerequisitos_indices(indice):
+            if arista < self._total:
+                resultado.append(self.id_de(arista))
+            elif incluir_externos:
+                j = 2 * (arista - self._total)
+                resultado.append(self._cadena(self._externos[j], self._externos[j + 1]))
+        return resultado
+
+    def _curso(self, indice: int) -> Curso:
+        campos = REGISTRO.unpack_from(self._datos, self._registros + indice * REGISTRO.size)
+        return Curso(
+            id=self._cadena(campos[0], campos[1]),
+            nombre=self._cadena(campos[2], campos[3]),
+            codigo=self._cadena(campos[4], campos[5]),
+            creditos=campos[8],
+            semestre=campos[9],
+            descripcion=self._cadena(campos[6], campos[7]),
+            prerequisitos=self._prerequisitos(indice, incluir_externos=True),
+            dificultad=DIFICULTADES[campos[11]],
+            horas=campos[10],
+        )
+
+
+class CatalogoMapeado(Catalogo):
+    """
+    Catálogo sobre un archivo compilado: misma interfaz que Catalogo, pero
+    los cursos y la adyacencia se leen del mmap compartido. Las estructuras
+    derivadas (cierres, niveles, respuesta codificada) siguen siendo por
+    proceso y se arman solo si se piden.
+    """
+
+    def __init__(self, ruta: str):
+        super().__init__(CursosMapeados(ruta))
+        self.ruta = ruta
+        self._conocidos = lru_cache(maxsize=RECIENTES)(self._conocidos)
+
+    def _conocidos(self, curso_id: str) -> tuple:
+        i = self.cursos.indice(curso_id)
+        if i is None:
+            return ()
+        return tuple(self.cursos._prerequisitos(i, incluir_externos=False))
+
+    def vista(self, curso_id: str) -> Optional[VistaCurso]:
+        """Acceso a los campos del curso sin armar el Curso completo"""
+        i = self.cursos.indice(curso_id)
+        return None if i is None else self.cursos.vista(i)
+
+    def prerequisitos_de(self, curso_id: str) -> List[str]:
+        return list(self._conocidos(curso_id))
+
+    def creditos_de(self, curso_id: str) -> Optional[int]:
+        i = self.cursos.indice(curso_id)
+        return None if i is None else self.cursos.vista(i).creditos
+
+
+def abrir_catalogo(ruta: str) -> CatalogoMapeado:
+    """
+    Abre un catálogo compilado (solo lee la cabecera).
+
+    Raises:
+        OSError: si el archivo no se puede abrir
+        ValueError: si no es un catálogo compilado de esta versión
+    """
+    return CatalogoMapeado(ruta)
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    from motor_malla.catalogo import cargar_catalogo, crear_catalogo_semilla
+
+    parser = argparse.ArgumentParser(description="Compila un catálogo JSON al formato binario mapeable")
+    parser.add_argument('entrada', help='catálogo JSON (o "semilla" para el catálogo semilla)')
+    parser.add_argument('salida', help='archivo compilado a escribir')
+    argumentos = parser.parse_args()
+
+    origen = crear_catalogo_semilla() if argumentos.entrada == 'semilla' else cargar_catalogo(argumentos.entrada)
+    tamano = compilar_catalogo(origen, argumentos.salida)
+    inicio = time.perf_counter()
+    abierto = abrir_catalogo(argumentos.salida)
+    apertura = (time.perf_counter() - inicio) * 1e6
+    print(f"{len(abierto)} cursos -> {argumentos.salida} ({tamano} bytes, apertura {apertura:.0f} µs)")
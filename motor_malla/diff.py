@@ -0,0 +1,106 @@
+"""
+Diferencias entre dos mallas (o dos versiones de una malla)
+Las ubicaciones se emparejan por curso_id, no por el ID de la ubicación
+(que es posicional en Flask y uuid4 en FastAPI). Cada semestre se resume
+con una huella independiente del orden y de los IDs; los semestres con la
+misma tupla (estructura compartida entre versiones) o la misma huella se
+saltan sin recorrerlos. El resto se compara en tiempo lineal.
+"""
+import hashlib
+from typing import Dict, Optional, Tuple
+
+from motor_malla.errores import REFERENCIA_INVALIDA
+from motor_malla.versiones import Semestres
+
+_MODULO = 1 << 64
+
+
+def huella_semestre(cursos) -> int:
+    """Huella de un semestre según (curso_id, posición): no depende del orden ni de los IDs"""
+    total = 0
+    for curso in cursos:
+        fila = f"{curso.curso_id}\x1f{curso.posicion_x}\x1f{curso.posicion_y}".encode()
+        total = (total + int.from_bytes(hashlib.blake2b(fila, digest_size=8).digest(), 'big')) % _MODULO
+    return total
+
+
+def parsear_referencia(referencia: Optional[str]) -> Tuple[Optional[str], Optional[int], Optional[str]]:
+    """
+    Interpreta 'MALLA001' (borrador) o 'MALLA001@3' (versión publicada 3).
+
+    Returns:
+        tuple: (malla_id, versión o None, None) o (None, None, mensaje de error)
+    """
+    if not referencia:
+        return None, None, REFERENCIA_INVALIDA
+    malla_id, separador, version = referencia.partition('@')
+    if not malla_id:
+        return None, None, REFERENCIA_INVALIDA
+    if not separador:
+        return malla_id, None, None
+    try:
+        numero = int(version)
+    except ValueError:
+        return None, None, REFERENCIA_INVALIDA
+    return malla_id, numero, None
+
+
+def _por_curso(semestres: Semestres, incluidos) -> Dict:
+    """curso_id -> ubicación (la primera si el curso se repite) de los semestres incluidos"""
+    ubicaciones = {}
+    for semestre in incluidos:
+        for curso in semestres.get(semestre, ()):
+            ubicaciones.setdefault(curso.curso_id, curso)
+    return ubicaciones
+
+
+def comparar_mallas(semestres_a: Semestres, semestres_b: Semestres) -> Dict:
+    """
+    Compara dos mallas agrupadas por semestre.
+
+    Returns:
+        dict con:
+            - agregados: ubicaciones de cursos que solo están en b
+            - eliminados: ubicaciones de cursos que solo están en a
+            - movidos: cursos que cambiaron de posición sin cambiar de semestre
+            - cambios_nivel: cursos que cambiaron de semestre
+            - semestres_sin_cambios: semestres que se saltaron por tener la misma huella
+            - iguales: True si no hay ninguna diferencia
+    """
+    sin_cambios, con_cambios = [], []
+    for semestre in sorted(set(semestres_a) | set(semestres_b)):
+        grupo_a = semestres_a.get(semestre, ())
+        grupo_b = semestres_b.get(semestre, ())
+        if grupo_a is grupo_b or (len(grupo_a) == len(grupo_b) and huella_semestre(grupo_a) == huella_semestre(grupo_b)):
+            sin_cambios.append(semestre)
+        else:
+            con_cambios.append(semestre)
+
+    en_a = _por_curso(semestres_a, con_cambios)
+    en_b = _por_curso(semestres_b, con_cambios)
+
+    agregados = [c.to_dict() for curso_id, c in en_b.items() if curso_id not in en_a]
+    eliminados = [c.to_dict() for curso_id, c in en_a.items() if curso_id not in en_b]
+    movidos, cambios_nivel = [], []
+    for curso_id, antes in en_a.items():
+        despues = en_b.get(curso_id)
+        if despues is None:
+            continue
+        cambio = {
+            'curso_id': curso_id,
+            'de': {'semestre': antes.semestre, 'posicion_x': antes.posicion_x, 'posicion_y': antes.posicion_y},
+            'a': {'semestre': despues.semestre, 'posicion_x': despues.posicion_x, 'posicion_y': despues.posicion_y},
+        }
+        if antes.semestre != despues.semestre:
+            cambios_nivel.append(cambio)
+        elif (antes.posicion_x, antes.posicion_y) != (despues.posicion_x, despues.posicion_y):
+            movidos.append(cambio)
+
+    return {
+        'agregados': agregados,
+        'eliminados': eliminados,
+        'movidos': movidos,
+        'cambios_nivel': cambios_nivel,
+        'semestres_sin_cambios': sin_cambios,
+        'iguales': not (agregados or eliminados or movidos or cambios_nivel),
+    }
@@ -0,0 +1,145 @@
+"""
+Elegibilidad: en qué semestres puede caer cada curso del catálogo
+Mientras se arrastra un curso el frontend necesita saber, para cada curso
+del catálogo, en qué semestres la ubicación sería válida dado lo que ya
+está ubicado. Un semestre s es válido para el curso c si:
+    - s >= nivel mínimo de c (su cadena de prerequisitos más larga + 1)
+    - ningún prerequisito (directo o indirecto) de c está ubicado en s o después
+    - ningún curso que depende (directa o indirectamente) de c está ubicado en s o antes
+
+Los cierres de prerequisitos y de dependientes se guardan como bitsets
+(enteros de Python, un bit por curso) y se arman una vez por catálogo. Por
+malla basta con unir los cierres de los cursos ubicados en cada semestre:
+cada curso queda con un intervalo [desde, hasta] de semestres válidos.
+El resultado se memoiza por malla y versión, como la ruta crítica.
+"""
+from typing import Dict, Iterator, List
+
+from motor_malla.grafo import PrerequisitosDe, orden_topologico
+from motor_malla.ruta_critica import CacheRutaCritica
+from motor_malla.trazas import span
+from motor_malla.versiones import Semestres
+
+
+def _bits(valor: int) -> Iterator[int]:
+    """Posiciones de los bits encendidos, de menor a mayor"""
+    binario = bin(valor)[:1:-1]
+    posicion = binario.find('1')
+    while posicion >= 0:
+        yield posicion
+        posicion = binario.find('1', posicion + 1)
+
+
+class CierresBits:
+    """
+    Cierres del grafo de prerequisitos como bitsets, en el orden del catálogo.
+
+    - prerequisitos[i]: bit j encendido si ids[j] es prerequisito (directo o indirecto) de ids[i]
+    - dependientes[i]: bit j encendido si ids[j] depende (directa o indirectamente) de ids[i]
+    - niveles[i]: nivel mínimo de ids[i]
+
+    Las aristas de retorno (ciclos) se ignoran, igual que en el orden
+    topológico. Memoria: a lo sumo n² / 4 bits para n cursos.
+    """
+
+    def __init__(self, ids: List[str], prerequisitos_de: PrerequisitosDe):
+        self.ids = ids
+        self.posicion = {curso_id: i for i, curso_id in enumerate(ids)}
+        total = len(ids)
+        self.prerequisitos: List[int] = [0] * total
+        self.dependientes: List[int] = [0] * total
+        self.niveles: List[int] = [1] * total
+
+        with span("elegibilidad.cierres", cursos=total):
+            orden = [self.posicion[c] for c in orden_topologico(ids, prerequisitos_de)]
+            rango = [0] * total
+            for k, i in enumerate(orden):
+                rango[i] = k
+            siguientes: List[List[int]] = [[] for _ in range(total)]
+            for i in orden:
+                cierre, nivel = 0, 1
+                for prereq_id in prerequisitos_de(ids[i]):
+                    j = self.posicion[prereq_id]
+                    if rango[j] >= rango[i]:
+                        continue  # Arista de retorno (ciclo) o el mismo curso
+                    siguientes[j].append(i)
+                    cierre |= self.prerequisitos[j] | (1 << j)
+                    if self.niveles[j] >= nivel:
+                        nivel = self.niveles[j] + 1
+                self.prerequisitos[i] = cierre
+                self.niveles[i] = nivel
+            for i in reversed(orden):
+                cierre = 0
+                for j in siguientes[i]:
+                    cierre |= self.dependientes[j] | (1 << j)
+                self.dependientes[i] = cierre
+
+
+def calcular_elegibilidad(semestres: Semestres, catalogo, numero_niveles: int = 0) -> Dict:
+    """
+    Matriz curso × semestre de ubicaciones válidas.
+
+    Cada fila es una cadena con un carácter por semestre (1 = válido); los
+    cursos ya ubicados se evalúan como si se movieran (no chocan consigo mismos).
+
+    Args:
+        semestres: Cursos ubicados agrupados por semestre
+        catalogo: Catálogo (se usan sus cierres en bits, memoizados)
+        numero_niveles: Semestres del programa (columnas de la matriz, al menos
+            hasta el último semestre ocupado)
+
+    Returns:
+        dict: semestres (columnas), cursos (curso_id -> fila) y ubicados (curso_id -> semestre)
+    """
+    cierres = catalogo.cierres_bits()
+    columnas = max(numero_niveles or 0, max(semestres, default=0), 1)
+
+    with span("elegibilidad.matriz", cursos=len(cierres.ids)):
+        ubicados: Dict[str, int] = {}
+        antes: Dict[int, int] = {}     # semestre -> dependientes de lo ubicado ahí
+        despues: Dict[int, int] = {}   # semestre -> prerequisitos de lo ubicado ahí
+        for semestre in sorted(semestres):
+            for curso in semestres[semestre]:
+                if curso.curso_id in ubicados:
+                    continue
+                ubicados[curso.curso_id] = semestre
+                i = cierres.posicion.get(curso.curso_id)
+                if i is None:
+                    continue
+                antes[semestre] = antes.get(semestre, 0) | cierres.dependientes[i]
+                despues[semestre] = despues.get(semestre, 0) | cierres.prerequisitos[i]
+
+        # Desde: después del último semestre con un prerequisito ubicado (y no antes del nivel mínimo)
+        desde = list(cierres.niveles)
+        for semestre in sorted(antes):
+            for i in _bits(antes[semestre]):
+                if desde[i] <= semestre:
+                    desde[i] = semestre + 1
+        # Hasta: antes del primer semestre con un dependiente ubicado
+        hasta = [columnas] * len(cierres.ids)
+        for semestre in sorted(despues, reverse=True):
+            for i in _bits(despues[semestre]):
+                hasta[i] = semestre - 1
+
+        filas: Dict[tuple, str] = {}
+        cursos: Dict[str, str] = {}
+        for i, curso_id in enumerate(cierres.ids):
+            intervalo = (desde[i], min(hasta[i], columnas))
+            fila = filas.get(intervalo)
+            if fila is None:
+                inicio, fin = intervalo
+                if inicio > fin:
+                    fila = '0' * columnas
+                else:
+                    fila = '0' * (inicio - 1) + '1' * (fin - inicio + 1) + '0' * (columnas - fin)
+                filas[intervalo] = fila
+            cursos[curso_id] = fila
+
+    return {'semestres': columnas, 'cursos': cursos, 'ubicados': ubicados}
+
+
+class CacheElegibilidad(CacheRutaCritica):
+    """Matrices de elegibilidad por (malla_id, versión), con la misma validez que la ruta crítica"""
+
+    def _calcular(self, semestres: Semestres, catalogo, numero_niveles: int) -> Dict:
+        return calcular_elegibilidad(semestres, catalogo, numero_niveles)
@@ -0,0 +1,56 @@
+"""
+Mensajes de error del dominio y su código HTTP
+Las operaciones retornan (resultado, error) con estos mensajes, como BaseDatos
+"""
+MALLA_NO_ENCONTRADA = "Malla no encontrada"
+CURSO_NO_ENCONTRADO = "Curso no encontrado"
+CURSO_MALLA_NO_ENCONTRADO = "Curso en malla no encontrado"
+CURSO_DUPLICADO = "El curso ya está en la malla"
+UBICACION_DUPLICADA = "Ya existe una ubicación con ese ID en la malla"
+UBICACIONES_REPETIDAS = "Hay IDs de ubicación repetidos en los cursos enviados"
+VERSION_NO_ENCONTRADA = "Versión no encontrada"
+REFERENCIA_INVALIDA = "Referencia inválida, se espera MALLA_ID o MALLA_ID@versión"
+MALLA_DUPLICADA = "Ya existe una malla con ese ID"
+PROGRAMA_REQUERIDO = "El programa es obligatorio"
+ESTADO_INVALIDO = "Estado inválido, se espera borrador o publicado"
+CURSOR_INVALIDO = "Cursor inválido"
+NADA_QUE_DESHACER = "No hay cambios para deshacer"
+NADA_QUE_REHACER = "No hay cambios para rehacer"
+SERVICIO_SATURADO = "Servicio saturado, reintente en unos segundos"
+TOKEN_ADMIN_INVALIDO = "Token de administración inválido o no configurado"
+CATALOGO_SIN_ARCHIVO = "El catálogo no se cargó desde un archivo (MALLA_CATALOGO)"
+CATALOGO_INVALIDO = "El archivo del catálogo es inválido; se mantiene el catálogo vigente"
+PROFUNDIDAD_INVALIDA = "Profundidad inválida, se espera un entero >= 0 (0 = sin límite)"
+MODO_ELIMINACION_INVALIDO = "Modo inválido, se espera preview, cascade o block"
+CURSO_CON_DEPENDIENTES = "Otros cursos de la malla dependen de este curso"
+TIPO_TRABAJO_INVALIDO = "Tipo de trabajo inválido, se espera layout, ruta_critica o validacion"
+TRABAJO_NO_ENCONTRADO = "Trabajo no encontrado"
+TRABAJO_TERMINADO = "El trabajo ya terminó"
+
+# Errores que no son "no encontrado" (por defecto 404)
+CODIGOS_HTTP = {
+    CURSO_DUPLICADO: 400,
+    UBICACION_DUPLICADA: 409,
+    UBICACIONES_REPETIDAS: 400,
+    MALLA_DUPLICADA: 400,
+    PROGRAMA_REQUERIDO: 400,
+    ESTADO_INVALIDO: 400,
+    CURSOR_INVALIDO: 400,
+    REFERENCIA_INVALIDA: 400,
+    NADA_QUE_DESHACER: 409,
+    NADA_QUE_REHACER: 409,
+    SERVICIO_SATURADO: 503,
+    TOKEN_ADMIN_INVALIDO: 403,
+    CATALOGO_SIN_ARCHIVO: 409,
+    CATALOGO_INVALIDO: 422,
+    PROFUNDIDAD_INVALIDA: 400,
+    MODO_ELIMINACION_INVALIDO: 400,
+    CURSO_CON_DEPENDIENTES: 409,
+    TIPO_TRABAJO_INVALIDO: 400,
+    TRABAJO_TERMINADO: 409,
+}
+
+
+def codigo_http(error: str) -> int:
+    """Código HTTP con el que los backends reportan un error del dominio"""
+    return CODIGOS_HTTP.get(error, 404)
@@ -0,0 +1,114 @@
+"""
+Formatos de intercambio: JSON, MessagePack y CBOR
+Funciones neutrales al framework para negociar el formato (header Accept)
+y codificar / decodificar cuerpos. MessagePack y CBOR son dependencias opcionales
+y se importan con el primer cuerpo que las usa, no al arrancar el backend.
+"""
+import json
+from importlib.util import find_spec
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+CBOR = 'application/cbor'
+
+# Módulo que implementa cada formato binario
+MODULOS = {
+    MSGPACK: 'msgpack',
+    CBOR: 'cbor2',
+}
+
+# Alias aceptados para cada formato
+TIPOS_MIME = {
+    'application/json': JSON,
+    'application/msgpack': MSGPACK,
+    'application/x-msgpack': MSGPACK,
+    'application/vnd.msgpack': MSGPACK,
+    'application/cbor': CBOR,
+}
+
+
+def modulo_codificador(formato: str):
+    """Importa el módulo codificador del formato, o None si no está instalado"""
+    try:
+        if formato == MSGPACK:
+            import msgpack
+            return msgpack
+        if formato == CBOR:
+            import cbor2
+            return cbor2
+    except ImportError:
+        return None
+    return None
+
+
+def _valor_serializable(valor):
+    """Convierte valores no nativos (enums, fechas, etc.) antes de codificar"""
+    if hasattr(valor, 'value'):
+        return valor.value
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    if hasattr(valor, 'to_dict'):
+        return valor.to_dict()
+    return str(valor)
+
+
+_DISPONIBLES = None
+
+
+def formatos_disponibles():
+    """
+    Formatos que el servidor puede producir con las dependencias instaladas.
+    Solo busca los módulos (find_spec) sin importarlos, y lo recuerda.
+    """
+    global _DISPONIBLES
+    if _DISPONIBLES is None:
+        _DISPONIBLES = (JSON,) + tuple(f for f, modulo in MODULOS.items() if find_spec(modulo) is not None)
+    return _DISPONIBLES
+
+
+def negociar_formato(accept: str) -> str:
+    """
+    Elige el formato de respuesta a partir del header Accept (con pesos q).
+    Retorna JSON si no se pide un formato binario disponible.
+    """
+    if not accept:
+        return JSON
+
+    disponibles = formatos_disponibles()
+    mejor, mejor_q = JSON, -1.0
+    for parte in accept.split(','):
+        campos = parte.strip().split(';')
+        tipo = TIPOS_MIME.get(campos[0].strip().lower())
+        if tipo is None or tipo not in disponibles:
+            continue
+        q = 1.0
+        for parametro in campos[1:]:
+            clave, _, valor = parametro.strip().partition('=')
+            if clave == 'q':
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        if q > mejor_q and q > 0:
+            mejor, mejor_q = tipo, q
+    return mejor
+
+
+def codificar(datos, formato: str) -> bytes:
+    """Codifica datos en JSON, MessagePack o CBOR"""
+    if formato == JSON:
+        return json.dumps(datos, default=_valor_serializable, ensure_ascii=False, separators=(',', ':')).encode()
+    if formato == MSGPACK:
+        return modulo_codificador(MSGPACK).packb(datos, default=_valor_serializable, use_bin_type=True)
+    if formato == CBOR:
+        return modulo_codificador(CBOR).dumps(datos, default=lambda encoder, valor: encoder.encode(_valor_serializable(valor)))
+    raise ValueError(f'Formato no soportado: {formato}')
+
+
+def decodificar(cuerpo: bytes, formato: str):
+    """Decodifica un cuerpo MessagePack o CBOR"""
+    if formato == MSGPACK:
+        return modulo_codificador(MSGPACK).unpackb(cuerpo, raw=False)
+    if formato == CBOR:
+        return modulo_codificador(CBOR).loads(cuerpo)
+    raise ValueError(f'Formato no soportado: {formato}')
@@ -0,0 +1,137 @@
+"""
+Algoritmos sobre el grafo de prerequisitos
+Funciones puras: reciben `prerequisitos_de(curso_id) -> list[str]` y no
+dependen del framework ni del almacenamiento
+"""
+from typing import Callable, Dict, List
+
+PrerequisitosDe = Callable[[str], List[str]]
+
+
+def profundidades_prerequisitos(prerequisitos_de: PrerequisitosDe, curso_id: str,
+                                memo: Dict[str, Dict[str, int]] = None) -> Dict[str, int]:
+    """
+    Calcula la profundidad máxima de cada prerequisito (directo o indirecto) de un curso.
+
+    La profundidad es la longitud de la cadena más larga desde el curso hasta
+    el prerequisito (1 = directo). Se recorre el grafo en post-orden iterativo
+    y se memoiza por curso, así cada curso se expande una sola vez: el costo
+    total es O(suma de los tamaños de los cierres), sin recursión.
+
+    Args:
+        prerequisitos_de: Función que retorna los prerequisitos directos de un curso
+        curso_id: Curso a analizar
+        memo: Memoria compartida entre llamadas (curso_id -> profundidades)
+
+    Returns:
+        dict: prerequisito_id -> profundidad, en orden de descubrimiento
+    """
+    if memo is None:
+        memo = {}
+    if curso_id in memo:
+        return memo[curso_id]
+
+    en_proceso = set()
+    pila = [(curso_id, False)]
+    while pila:
+        nodo, expandido = pila.pop()
+        if nodo in memo:
+            continue
+        if not expandido:
+            en_proceso.add(nodo)
+            pila.append((nodo, True))
+            for prereq_id in reversed(prerequisitos_de(nodo)):
+                # Las aristas de retorno (ciclos) se ignoran
+                if prereq_id not in memo and prereq_id not in en_proceso:
+                    pila.append((prereq_id, False))
+            continue
+
+        en_proceso.discard(nodo)
+        profundidades: Dict[str, int] = {}
+        for prereq_id in prerequisitos_de(nodo):
+            if prereq_id not in memo:
+                continue
+            if profundidades.get(prereq_id, 0) < 1:
+                profundidades[prereq_id] = 1
+            for sub_id, profundidad in memo[prereq_id].items():
+                if profundidades.get(sub_id, 0) < profundidad + 1:
+                    profundidades[sub_id] = profundidad + 1
+        profundidades.pop(nodo, None)
+        memo[nodo] = profundidades
+
+    return memo[curso_id]
+
+
+def dependientes_por_distancia(dependientes_de: PrerequisitosDe, curso_id: str,
+                               profundidad_maxima: int = 1) -> Dict[str, int]:
+    """
+    Cursos que dependen (directa o indirectamente) de un curso, con su distancia.
+
+    Recorrido en anchura sobre la adyacencia inversa: la distancia es la
+    cadena más corta (1 = lo tiene como prerequisito directo). Cada curso se
+    visita una vez, así el costo es proporcional al resultado.
+
+    Args:
+        dependientes_de: Función que retorna los cursos que tienen al curso como prerequisito directo
+        curso_id: Curso a analizar
+        profundidad_maxima: Distancia máxima a recorrer (0 = sin límite)
+
+    Returns:
+        dict: dependiente_id -> distancia, por distancia creciente
+    """
+    distancias: Dict[str, int] = {}
+    frontera = [curso_id]
+    distancia = 0
+    while frontera and (profundidad_maxima == 0 or distancia < profundidad_maxima):
+        distancia += 1
+        siguiente = []
+        for nodo in frontera:
+            for dependiente_id in dependientes_de(nodo):
+                if dependiente_id != curso_id and dependiente_id not in distancias:
+                    distancias[dependiente_id] = distancia
+                    siguiente.append(dependiente_id)
+        frontera = siguiente
+    return distancias
+
+
+def nivel_minimo(profundidades: Dict[str, int]) -> int:
+    """Nivel (semestre) mínimo de un curso: uno más que su cadena de prerequisitos más larga"""
+    if not profundidades:
+        return 1
+    return max(profundidades.values()) + 1
+
+
+def orden_topologico(nodos: List[str], prerequisitos_de: PrerequisitosDe) -> List[str]:
+    """
+    Ordena los nodos de modo que cada uno quede después de sus prerequisitos.
+
+    Post-orden iterativo sobre el subgrafo inducido por `nodos`: los
+    prerequisitos fuera del conjunto y las aristas de retorno (ciclos) se
+    ignoran. Cada nodo y cada arista se recorren una vez.
+
+    Args:
+        nodos: Nodos a ordenar (en su orden de entrada se resuelven los empates)
+        prerequisitos_de: Función que retorna los prerequisitos directos de un nodo
+
+    Returns:
+        list: Nodos en orden topológico
+    """
+    incluidos = set(nodos)
+    orden: List[str] = []
+    visitados = set()
+    for raiz in nodos:
+        if raiz in visitados:
+            continue
+        visitados.add(raiz)
+        pila = [(raiz, iter(prerequisitos_de(raiz)))]
+        while pila:
+            nodo, pendientes = pila[-1]
+            for prereq_id in pendientes:
+                if prereq_id in incluidos and prereq_id not in visitados:
+                    visitados.add(prereq_id)
+                    pila.append((prereq_id, iter(prerequisitos_de(prereq_id))))
+                    break
+            else:
+                pila.pop()
+                orden.append(nodo)
+    return orden
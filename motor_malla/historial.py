@@ -0,0 +1,133 @@
+"""
+Historial de deshacer / rehacer como registro de operaciones
+Cada mutación de una malla se expresa como un `Cambio` (ubicaciones que se
+quitan, ubicaciones que se ponen y metadatos que se asignan). Antes de
+aplicarlo se calcula su inverso leyendo solo lo que el cambio toca, y es
+ese inverso lo que se guarda: la memoria crece con las ediciones, no con
+el tamaño de la malla por la profundidad del historial.
+"""
+import threading
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from motor_malla.modelos import MallaCurso
+
+SESION_ANONIMA = "anonima"
+
+# Sesión de la petición en curso (la fija cada backend a partir del header X-Sesion)
+sesion_actual: ContextVar[str] = ContextVar("sesion_actual", default=SESION_ANONIMA)
+
+# Cambios que se recuerdan por sesión y malla, y sesiones que se recuerdan en total
+MAX_CAMBIOS = 100
+MAX_SESIONES = 1000
+
+DESHACER = "deshacer"
+REHACER = "rehacer"
+
+
+@dataclass(frozen=True)
+class Cambio:
+    """
+    Mutación de una malla. Al aplicarse, primero se quitan las ubicaciones
+    de `quitar`, luego se agregan o reemplazan (por ID) las de `poner` y
+    por último se asignan los `metadatos` (pares campo, valor).
+    """
+    quitar: Tuple[str, ...] = ()
+    poner: Tuple[MallaCurso, ...] = ()
+    metadatos: Tuple[Tuple[str, object], ...] = ()
+
+    def __bool__(self):
+        return bool(self.quitar or self.poner or self.metadatos)
+
+
+def invertir(cambio: Cambio, ubicacion_actual: Callable[[str], Optional[MallaCurso]],
+             metadato_actual: Callable[[str], object]) -> Cambio:
+    """
+    Calcula el cambio que deshace `cambio`, a partir del estado previo a aplicarlo.
+
+    Args:
+        cambio: Cambio que se va a aplicar
+        ubicacion_actual: Ubicación vigente por ID (None si no existe)
+        metadato_actual: Valor vigente de un campo de la malla
+    """
+    quitados = set(cambio.quitar)
+    quitar, poner = [], []
+    for curso_malla_id in cambio.quitar:
+        anterior = ubicacion_actual(curso_malla_id)
+        if anterior is not None:
+            poner.append(anterior)
+    for curso in cambio.poner:
+        anterior = None if curso.id in quitados else ubicacion_actual(curso.id)
+        if anterior is None:
+            quitar.append(curso.id)
+        else:
+            poner.append(anterior)
+    return Cambio(
+        quitar=tuple(quitar),
+        poner=tuple(poner),
+        metadatos=tuple((campo, metadato_actual(campo)) for campo, _ in cambio.metadatos)
+    )
+
+
+class Historial:
+    """
+    Pilas de deshacer / rehacer por (sesión, malla).
+    La pila de deshacer está acotada a `max_cambios` y las sesiones menos
+    usadas se olvidan al superar `max_sesiones`.
+
+    Dos sesiones que editan la misma malla no se coordinan: deshacer
+    restaura el estado que vio la sesión al hacer su cambio.
+    """
+
+    def __init__(self, max_cambios: int = MAX_CAMBIOS, max_sesiones: int = MAX_SESIONES):
+        self.max_cambios = max_cambios
+        self.max_sesiones = max_sesiones
+        self._pilas: "OrderedDict[Tuple[str, str], Dict[str, deque]]" = OrderedDict()
+        self._candado = threading.Lock()
+
+    def _pilas_de(self, sesion: str, malla_id: str) -> Dict[str, deque]:
+        clave = (sesion, malla_id)
+        pilas = self._pilas.get(clave)
+        if pilas is None:
+            pilas = {DESHACER: deque(maxlen=self.max_cambios), REHACER: deque(maxlen=self.max_cambios)}
+            self._pilas[clave] = pilas
+            while len(self._pilas) > self.max_sesiones:
+                self._pilas.popitem(last=False)
+        self._pilas.move_to_end(clave)
+        return pilas
+
+    def registrar(self, sesion: str, malla_id: str, inverso: Cambio):
+        """Registra el inverso de una edición nueva (descarta lo que se podía rehacer)"""
+        if not inverso:
+            return
+        with self._candado:
+            pilas = self._pilas_de(sesion, malla_id)
+            pilas[DESHACER].append(inverso)
+            pilas[REHACER].clear()
+
+    def sacar(self, sesion: str, malla_id: str, pila: str) -> Optional[Cambio]:
+        """Saca el último cambio de la pila DESHACER o REHACER (None si está vacía)"""
+        with self._candado:
+            pilas = self._pilas.get((sesion, malla_id))
+            if not pilas or not pilas[pila]:
+                return None
+            return pilas[pila].pop()
+
+    def apilar(self, sesion: str, malla_id: str, pila: str, cambio: Cambio):
+        """Apila un cambio en DESHACER o REHACER sin tocar la otra pila"""
+        with self._candado:
+            self._pilas_de(sesion, malla_id)[pila].append(cambio)
+
+    def tamanos(self, sesion: str, malla_id: str) -> Dict[str, int]:
+        """Cantidad de cambios disponibles para deshacer y rehacer"""
+        with self._candado:
+            pilas = self._pilas.get((sesion, malla_id))
+            if not pilas:
+                return {DESHACER: 0, REHACER: 0}
+            return {DESHACER: len(pilas[DESHACER]), REHACER: len(pilas[REHACER])}
+
+
+def opuesta(pila: str) -> str:
+    return REHACER if pila == DESHACER else DESHACER
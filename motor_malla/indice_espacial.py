@@ -0,0 +1,107 @@
+"""
+Índice espacial en grilla sobre las posiciones de los cursos de una malla
+Permite consultar por ventana visible (bbox) y detectar solapamientos
+sin recorrer todas las ubicaciones
+"""
+from typing import Dict, List, Optional, Tuple
+
+# Tamaño de la tarjeta de un curso en el canvas (en píxeles)
+ANCHO_TARJETA = 160
+ALTO_TARJETA = 60
+
+# Lado de cada celda de la grilla (en píxeles)
+TAMANO_CELDA = 256
+
+
+class IndiceEspacial:
+    """
+    Grilla hash: cada ubicación se registra en la celda de su esquina
+    superior izquierda (posicion_x, posicion_y).
+    """
+
+    def __init__(self, tamano_celda: int = TAMANO_CELDA):
+        self.tamano_celda = tamano_celda
+        self._celdas: Dict[Tuple[int, int], Dict[str, object]] = {}
+        self._celda_de: Dict[str, Tuple[int, int]] = {}
+
+    def __len__(self):
+        return len(self._celda_de)
+
+    def _celda(self, x: int, y: int) -> Tuple[int, int]:
+        return (x // self.tamano_celda, y // self.tamano_celda)
+
+    def insertar(self, curso):
+        """Registra (o reubica) una ubicación de la malla"""
+        self.eliminar(curso.id)
+        celda = self._celda(curso.posicion_x, curso.posicion_y)
+        self._celdas.setdefault(celda, {})[curso.id] = curso
+        self._celda_de[curso.id] = celda
+
+    def obtener(self, curso_malla_id: str):
+        """Ubicación registrada con ese ID (o None), en O(1)"""
+        celda = self._celda_de.get(curso_malla_id)
+        if celda is None:
+            return None
+        return self._celdas[celda][curso_malla_id]
+
+    def eliminar(self, curso_malla_id: str):
+        """Quita una ubicación del índice (si existe)"""
+        celda = self._celda_de.pop(curso_malla_id, None)
+        if celda is None:
+            return
+        contenido = self._celdas[celda]
+        del contenido[curso_malla_id]
+        if not contenido:
+            del self._celdas[celda]
+
+    def buscar(self, x0: int, y0: int, x1: int, y1: int) -> List:
+        """
+        Retorna las ubicaciones cuya tarjeta intersecta el rectángulo (x0, y0, x1, y1).
+
+        Solo se visitan las celdas que cubren el rectángulo ampliado por el
+        tamaño de la tarjeta, por lo que el costo depende del área consultada.
+        """
+        if x0 > x1:
+            x0, x1 = x1, x0
+        if y0 > y1:
+            y0, y1 = y1, y0
+
+        cx0, cy0 = self._celda(x0 - ANCHO_TARJETA, y0 - ALTO_TARJETA)
+        cx1, cy1 = self._celda(x1, y1)
+
+        encontrados = []
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self._celdas):
+            # Ventana mayor que la grilla ocupada: recorrer solo celdas existentes
+            candidatas = (
+                contenido for (cx, cy), contenido in self._celdas.items()
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1
+            )
+        else:
+            candidatas = (
+                self._celdas[(cx, cy)]
+                for cx in range(cx0, cx1 + 1)
+                for cy in range(cy0, cy1 + 1)
+                if (cx, cy) in self._celdas
+            )
+
+        for contenido in candidatas:
+            for curso in contenido.values():
+                if (curso.posicion_x <= x1 and curso.posicion_x + ANCHO_TARJETA >= x0 and
+                        curso.posicion_y <= y1 and curso.posicion_y + ALTO_TARJETA >= y0):
+                    encontrados.append(curso)
+
+        encontrados.sort(key=lambda c: (c.posicion_y, c.posicion_x, c.id))
+        return encontrados
+
+    def solapamientos(self, posicion_x: int, posicion_y: int, excluir: Optional[str] = None) -> List:
+        """Retorna las tarjetas que se solapan con una tarjeta soltada en (posicion_x, posicion_y)"""
+        candidatos = self.buscar(
+            posicion_x, posicion_y,
+            posicion_x + ANCHO_TARJETA, posicion_y + ALTO_TARJETA
+        )
+        return [
+            c for c in candidatos
+            if c.id != excluir
+            and c.posicion_x < posicion_x + ANCHO_TARJETA and posicion_x < c.posicion_x + ANCHO_TARJETA
+            and c.posicion_y < posicion_y + ALTO_TARJETA and posicion_y < c.posicion_y + ALTO_TARJETA
+        ]
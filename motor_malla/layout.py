@@ -0,0 +1,194 @@
+"""
+Motor de layout por capas para las posiciones de la malla
+Agrupa los cursos en columnas por semestre y ordena cada columna
+minimizando los cruces entre aristas de prerequisitos (heurística del baricentro)
+"""
+from dataclasses import replace
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Geometría de la grilla (en píxeles)
+MARGEN_X = 50
+MARGEN_Y = 50
+ANCHO_COLUMNA = 200
+ALTO_FILA = 80
+
+# Cantidad de barridos (ida y vuelta) del layout completo
+BARRIDOS = 4
+
+
+def posicion_en_grilla(semestre: int, fila: int) -> Tuple[int, int]:
+    """Convierte (semestre, fila) en coordenadas (posicion_x, posicion_y)"""
+    return (
+        MARGEN_X + (max(1, semestre) - 1) * ANCHO_COLUMNA,
+        MARGEN_Y + fila * ALTO_FILA
+    )
+
+
+def construir_aristas(cursos, obtener_prerequisitos: Callable[[str], List[str]]) -> List[Tuple[str, str]]:
+    """
+    Construye las aristas prerequisito -> dependiente entre ubicaciones de la malla.
+
+    Args:
+        cursos: Ubicaciones de la malla (objetos con id, curso_id y semestre)
+        obtener_prerequisitos: Función que retorna los IDs de prerequisitos de un curso
+
+    Returns:
+        list: Pares (id_ubicacion_prerequisito, id_ubicacion_dependiente)
+    """
+    ubicaciones_por_curso: Dict[str, List[str]] = {}
+    for mc in cursos:
+        ubicaciones_por_curso.setdefault(mc.curso_id, []).append(mc.id)
+
+    aristas = []
+    for mc in cursos:
+        for prereq_id in obtener_prerequisitos(mc.curso_id):
+            for origen in ubicaciones_por_curso.get(prereq_id, ()):
+                aristas.append((origen, mc.id))
+    return aristas
+
+
+def _agrupar_columnas(cursos) -> Dict[int, List[str]]:
+    """Agrupa las ubicaciones por semestre respetando el orden vertical actual"""
+    columnas: Dict[int, List] = {}
+    for mc in cursos:
+        columnas.setdefault(mc.semestre, []).append(mc)
+    return {
+        semestre: [mc.id for mc in sorted(lista, key=lambda c: (c.posicion_y, c.id))]
+        for semestre, lista in columnas.items()
+    }
+
+
+def _reordenar_columna(columna: List[str], vecinos: Dict[str, List[str]], fila: Dict[str, int]) -> List[str]:
+    """
+    Reordena una columna por el baricentro de las filas de sus vecinos.
+    Las ubicaciones sin vecinos conservan su fila actual como baricentro.
+    """
+    def baricentro(ubicacion_id: str) -> float:
+        filas = [fila[v] for v in vecinos.get(ubicacion_id, ()) if v in fila]
+        if not filas:
+            return float(fila[ubicacion_id])
+        return sum(filas) / len(filas)
+
+    return sorted(columna, key=lambda u: (baricentro(u), fila[u]))
+
+
+def _indexar_filas(columnas: Dict[int, List[str]]) -> Dict[str, int]:
+    return {u: i for columna in columnas.values() for i, u in enumerate(columna)}
+
+
+def _contar_inversiones(valores: List[int]) -> int:
+    """Cuenta inversiones con merge sort en O(n log n)"""
+    if len(valores) < 2:
+        return 0
+    medio = len(valores) // 2
+    izquierda, derecha = valores[:medio], valores[medio:]
+    inversiones = _contar_inversiones(izquierda) + _contar_inversiones(derecha)
+    izquierda.sort()
+    derecha.sort()
+    j = 0
+    for v in izquierda:
+        while j < len(derecha) and derecha[j] < v:
+            j += 1
+        inversiones += j
+    return inversiones
+
+
+def contar_cruces(columnas: Dict[int, List[str]], aristas: Iterable[Tuple[str, str]],
+                  semestre_de: Dict[str, int]) -> int:
+    """
+    Cuenta los cruces entre aristas que unen el mismo par de columnas.
+
+    Returns:
+        int: Número de pares de aristas que se cruzan
+    """
+    fila = _indexar_filas(columnas)
+    grupos: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+    for origen, destino in aristas:
+        clave = (semestre_de[origen], semestre_de[destino])
+        if clave[0] == clave[1]:
+            continue
+        grupos.setdefault(clave, []).append((fila[origen], fila[destino]))
+
+    total = 0
+    for pares in grupos.values():
+        pares.sort()
+        total += _contar_inversiones([destino for _, destino in pares])
+    return total
+
+
+def calcular_layout(cursos, obtener_prerequisitos: Callable[[str], List[str]],
+                    semestres: Optional[Iterable[int]] = None) -> Dict[str, Tuple[int, int]]:
+    """
+    Calcula posicion_x y posicion_y para las ubicaciones de una malla.
+
+    Sin `semestres` realiza el layout completo: varios barridos alternados
+    (columnas ascendentes contra sus prerequisitos, descendentes contra sus
+    dependientes) conservando el orden con menos cruces.
+
+    Con `semestres` realiza un layout incremental: solo esas columnas se
+    reordenan contra sus vecinos en ambas direcciones; el resto queda fijo.
+
+    Returns:
+        dict: id de ubicación -> (posicion_x, posicion_y), solo de las columnas recalculadas
+    """
+    cursos = list(cursos)
+    if not cursos:
+        return {}
+
+    columnas = _agrupar_columnas(cursos)
+    semestre_de = {mc.id: mc.semestre for mc in cursos}
+    aristas = construir_aristas(cursos, obtener_prerequisitos)
+
+    prerequisitos_de: Dict[str, List[str]] = {}
+    dependientes_de: Dict[str, List[str]] = {}
+    for origen, destino in aristas:
+        if semestre_de[origen] == semestre_de[destino]:
+            continue
+        dependientes_de.setdefault(origen, []).append(destino)
+        prerequisitos_de.setdefault(destino, []).append(origen)
+
+    if semestres is None:
+        afectados = sorted(columnas)
+        mejor = {s: list(c) for s, c in columnas.items()}
+        mejores_cruces = contar_cruces(mejor, aristas, semestre_de)
+        for barrido in range(BARRIDOS):
+            ascendente = barrido % 2 == 0
+            vecinos = prerequisitos_de if ascendente else dependientes_de
+            for semestre in (afectados if ascendente else reversed(afectados)):
+                fila = _indexar_filas(columnas)
+                columnas[semestre] = _reordenar_columna(columnas[semestre], vecinos, fila)
+            cruces = contar_cruces(columnas, aristas, semestre_de)
+            if cruces < mejores_cruces:
+                mejor = {s: list(c) for s, c in columnas.items()}
+                mejores_cruces = cruces
+        columnas = mejor
+    else:
+        afectados = sorted(s for s in set(semestres) if s in columnas)
+        vecinos = {
+            u: prerequisitos_de.get(u, []) + dependientes_de.get(u, [])
+            for s in afectados for u in columnas[s]
+        }
+        for semestre in afectados:
+            fila = _indexar_filas(columnas)
+            columnas[semestre] = _reordenar_columna(columnas[semestre], vecinos, fila)
+
+    posiciones = {}
+    for semestre in afectados:
+        for i, ubicacion_id in enumerate(columnas[semestre]):
+            posiciones[ubicacion_id] = posicion_en_grilla(semestre, i)
+    return posiciones
+
+
+def reubicar(cursos, prerequisitos_de: Callable[[str], List[str]],
+             semestres: Optional[Iterable[int]] = None) -> List:
+    """
+    Calcula el layout sobre `cursos` y retorna copias reubicadas de las
+    ubicaciones cuyas columnas se recalcularon (sin modificar las originales).
+    """
+    cursos = list(cursos)
+    posiciones = calcular_layout(cursos, prerequisitos_de, semestres)
+    return [
+        replace(c, posicion_x=posiciones[c.id][0], posicion_y=posiciones[c.id][1])
+        for c in cursos
+        if c.id in posiciones and (c.posicion_x, c.posicion_y) != posiciones[c.id]
+    ]
@@ -0,0 +1,151 @@
+"""
+Listado paginado de mallas con índices secundarios
+Las mallas se listan en orden de creación con paginación por cursor
+(sin OFFSET) y se filtran por programa, periodo_vigencia y estado
+usando un índice por campo, así una página cuesta O(log n + página)
+aunque existan decenas de miles de mallas
+"""
+import base64
+from bisect import bisect_right, insort
+from typing import Dict, List, Optional, Tuple
+
+from motor_malla.errores import CURSOR_INVALIDO
+
+# Campos por los que se puede filtrar el listado
+FILTROS_MALLA = ('programa', 'periodo_vigencia', 'estado')
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 200
+
+
+def codificar_cursor(secuencia: int) -> str:
+    """Cursor opaco a partir del número de secuencia de la última malla entregada"""
+    return base64.urlsafe_b64encode(str(secuencia).encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor: Optional[str]) -> Tuple[int, Optional[str]]:
+    """
+    Returns:
+        tuple: (secuencia, None) o (0, mensaje de error). Sin cursor se parte del inicio.
+    """
+    if not cursor:
+        return 0, None
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        secuencia = int(base64.urlsafe_b64decode(cursor + relleno).decode())
+    except (ValueError, UnicodeDecodeError):
+        return 0, CURSOR_INVALIDO
+    if secuencia < 0:
+        return 0, CURSOR_INVALIDO
+    return secuencia, None
+
+
+def normalizar_limite(limite: Optional[int]) -> int:
+    """Acota el tamaño de página a [1, LIMITE_MAXIMO]"""
+    if limite is None:
+        return LIMITE_POR_DEFECTO
+    return max(1, min(int(limite), LIMITE_MAXIMO))
+
+
+def filtros_activos(filtros: Dict) -> Dict[str, str]:
+    """Solo los filtros conocidos con valor"""
+    return {campo: filtros[campo] for campo in FILTROS_MALLA if filtros.get(campo) not in (None, '')}
+
+
+class IndiceMallas:
+    """
+    Índices en memoria sobre las mallas de un almacén.
+
+    Cada malla recibe un número de secuencia creciente al registrarse. El
+    índice primario es la lista ordenada de secuencias y cada índice
+    secundario guarda, por valor del campo, la lista ordenada de las
+    secuencias que lo tienen. Paginar es un bisect sobre la lista más
+    selectiva y filtrar el resto de campos fila por fila.
+
+    También guarda la fila resumen de cada malla, así listar no necesita
+    materializar las mallas (que pueden estar desbordadas a disco).
+    """
+
+    def __init__(self):
+        self._siguiente = 1
+        self._secuencia: Dict[str, int] = {}      # malla_id -> secuencia
+        self._malla_de: Dict[int, str] = {}        # secuencia -> malla_id
+        self._orden: List[int] = []                # secuencias en orden de creación
+        self._valores: Dict[str, Dict[str, str]] = {}
+        self._por_campo: Dict[str, Dict[str, List[int]]] = {campo: {} for campo in FILTROS_MALLA}
+        self._resumenes: Dict[str, Dict] = {}
+
+    def __len__(self):
+        return len(self._orden)
+
+    def __contains__(self, malla_id: str) -> bool:
+        return malla_id in self._secuencia
+
+    def insertar(self, malla):
+        """Registra una malla nueva al final del orden de creación"""
+        if malla.id in self._secuencia:
+            return self.actualizar(malla)
+        secuencia = self._siguiente
+        self._siguiente += 1
+        self._secuencia[malla.id] = secuencia
+        self._malla_de[secuencia] = malla.id
+        self._orden.append(secuencia)
+        self._valores[malla.id] = {}
+        self.actualizar(malla)
+
+    def resumen(self, malla_id: str) -> Dict:
+        return self._resumenes[malla_id]
+
+    def totales(self) -> Dict[str, int]:
+        """malla_id -> cantidad de cursos, según las filas resumen"""
+        return {malla_id: fila['total_cursos'] for malla_id, fila in self._resumenes.items()}
+
+    def actualizar(self, malla):
+        """Reindexa los campos filtrables que cambiaron y renueva la fila resumen"""
+        self._resumenes[malla.id] = malla.resumen()
+        secuencia = self._secuencia[malla.id]
+        valores = self._valores[malla.id]
+        for campo in FILTROS_MALLA:
+            nuevo = getattr(malla, campo)
+            anterior = valores.get(campo)
+            if campo in valores and anterior == nuevo:
+                continue
+            if campo in valores:
+                lista = self._por_campo[campo][anterior]
+                lista.remove(secuencia)
+                if not lista:
+                    del self._por_campo[campo][anterior]
+            insort(self._por_campo[campo].setdefault(nuevo, []), secuencia)
+            valores[campo] = nuevo
+
+    def buscar(self, filtros: Dict = None, despues: int = 0,
+               limite: int = LIMITE_POR_DEFECTO) -> Tuple[List[str], Optional[int]]:
+        """
+        Busca una página de mallas que cumplan todos los filtros.
+
+        Args:
+            filtros: campo -> valor (ver FILTROS_MALLA)
+            despues: Secuencia del cursor; se retornan mallas posteriores
+            limite: Tamaño de la página
+
+        Returns:
+            tuple: (IDs de la página, secuencia para el siguiente cursor o None)
+        """
+        filtros = filtros_activos(filtros or {})
+        candidatas = [self._por_campo[campo].get(valor, []) for campo, valor in filtros.items()]
+        recorrido = min(candidatas, key=len) if candidatas else self._orden
+
+        pagina: List[str] = []
+        ultima = None
+        for posicion in range(bisect_right(recorrido, despues), len(recorrido)):
+            secuencia = recorrido[posicion]
+            malla_id = self._malla_de[secuencia]
+            valores = self._valores[malla_id]
+            if any(valores[campo] != valor for campo, valor in filtros.items()):
+                continue
+            if len(pagina) == limite:
+                # Existe al menos una malla más: la página tiene continuación
+                return pagina, ultima
+            pagina.append(malla_id)
+            ultima = secuencia
+        return pagina, None
@@ -0,0 +1,300 @@
+"""
+Métricas en formato de exposición de Prometheus (texto 0.0.4)
+Cada hilo escribe en su propio fragmento (un dict que solo él modifica), así
+registrar una petición son unas pocas operaciones de dict sin tomar ningún
+candado. El candado solo se usa al crear el fragmento de un hilo nuevo y al
+exponer, que suma los fragmentos. Los fragmentos de hilos terminados se
+pliegan en un acumulado para que la memoria no crezca con hilos efímeros
+(el servidor de desarrollo de Flask crea uno por petición).
+"""
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+
+# Límites por defecto (segundos y bytes)
+LIMITES_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+LIMITES_BYTES = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576)
+LIMITES_UBICACIONES = (0, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Etiqueta de ruta para peticiones que no coinciden con ninguna ruta
+RUTA_DESCONOCIDA = "desconocida"
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatear_numero(valor) -> str:
+    if valor == float('inf'):
+        return '+Inf'
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return repr(valor) if isinstance(valor, float) else str(valor)
+
+
+def _etiquetas(nombres: Tuple[str, ...], valores: Tuple, extra: str = '') -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+@dataclass
+class Familia:
+    """Métrica calculada al exponer (p. ej. a partir de las estadísticas de la caché)"""
+    nombre: str
+    tipo: str
+    ayuda: str
+    etiquetas: Tuple[str, ...] = ()
+    muestras: List[Tuple[Tuple, float]] = field(default_factory=list)
+
+    def lineas(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        for valores, valor in self.muestras:
+            lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, valores)} {_formatear_numero(valor)}")
+        return lineas
+
+
+def _lineas_histograma(nombre: str, nombres: Tuple[str, ...], limites: Tuple[float, ...],
+                       valores: Dict[Tuple, list]) -> List[str]:
+    """Líneas _bucket (acumuladas), _sum y _count; celdas: un casillero por límite, +Inf, suma y cantidad"""
+    lineas = []
+    for clave, celdas in sorted(valores.items()):
+        acumulado = 0
+        for limite, cantidad in zip(limites + (float('inf'),), celdas):
+            acumulado += cantidad
+            le = f'le="{_formatear_numero(float(limite))}"'
+            lineas.append(f"{nombre}_bucket{_etiquetas(nombres, clave, le)} {acumulado}")
+        lineas.append(f"{nombre}_sum{_etiquetas(nombres, clave)} {_formatear_numero(celdas[-2])}")
+        lineas.append(f"{nombre}_count{_etiquetas(nombres, clave)} {celdas[-1]}")
+    return lineas
+
+
+@dataclass
+class FamiliaHistograma(Familia):
+    """Histograma calculado al exponer a partir de una lista de observaciones"""
+    limites: Tuple[float, ...] = ()
+    observaciones: Iterable[float] = ()
+
+    def lineas(self) -> List[str]:
+        celdas = [0] * (len(self.limites) + 3)
+        for valor in self.observaciones:
+            celdas[bisect_left(self.limites, valor)] += 1
+            celdas[-2] += valor
+            celdas[-1] += 1
+        return [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"] + \
+            _lineas_histograma(self.nombre, (), self.limites, {(): celdas})
+
+
+class _Metrica:
+    tipo = ''
+
+    def __init__(self, registro: 'Metricas', nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()):
+        self._registro = registro
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+
+
+class Contador(_Metrica):
+    """Contador monótono; `inc(*valores_etiquetas)`"""
+    tipo = 'counter'
+
+    def inc(self, *valores, cantidad: float = 1):
+        fragmento = self._registro._fragmento()
+        clave = (self.nombre, valores)
+        fragmento[clave] = fragmento.get(clave, 0) + cantidad
+
+    @staticmethod
+    def _plegar(actual, nuevo):
+        return (actual or 0) + nuevo
+
+    def _lineas(self, valores: Dict[Tuple, float]) -> List[str]:
+        return [f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_formatear_numero(valor)}"
+                for clave, valor in sorted(valores.items())]
+
+
+class Medidor(Contador):
+    """Valor que sube y baja (p. ej. peticiones en curso); cada hilo guarda su delta"""
+    tipo = 'gauge'
+
+    def dec(self, *valores, cantidad: float = 1):
+        self.inc(*valores, cantidad=-cantidad)
+
+
+class Histograma(_Metrica):
+    """Histograma con límites fijos; `observar(valor, *valores_etiquetas)`"""
+    tipo = 'histogram'
+
+    def __init__(self, registro, nombre, ayuda, etiquetas=(), limites: Iterable[float] = LIMITES_LATENCIA):
+        super().__init__(registro, nombre, ayuda, etiquetas)
+        self.limites = tuple(sorted(limites))
+
+    def observar(self, valor: float, *valores):
+        fragmento = self._registro._fragmento()
+        clave = (self.nombre, valores)
+        celdas = fragmento.get(clave)
+        if celdas is None:
+            # Un casillero por límite, +Inf, suma y cantidad
+            celdas = fragmento[clave] = [0] * (len(self.limites) + 3)
+        celdas[bisect_left(self.limites, valor)] += 1
+        celdas[-2] += valor
+        celdas[-1] += 1
+
+    @staticmethod
+    def _plegar(actual, nuevo):
+        if actual is None:
+            return list(nuevo)
+        return [a + b for a, b in zip(actual, nuevo)]
+
+    def _lineas(self, valores: Dict[Tuple, list]) -> List[str]:
+        return _lineas_histograma(self.nombre, self.etiquetas, self.limites, valores)
+
+
+class Metricas:
+    """Registro de métricas con un fragmento por hilo"""
+
+    def __init__(self):
+        self._metricas: Dict[str, _Metrica] = {}
+        self._local = threading.local()
+        self._fragmentos: List[Tuple[threading.Thread, dict]] = []
+        self._retirado: Dict[Tuple, object] = {}  # Suma de los fragmentos de hilos terminados
+        self._candado = threading.Lock()
+
+    # ==================== DEFINICIÓN ====================
+
+    def _definir(self, clase, nombre, *args, **kwargs):
+        with self._candado:
+            if nombre not in self._metricas:
+                self._metricas[nombre] = clase(self, nombre, *args, **kwargs)
+            return self._metricas[nombre]
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()) -> Contador:
+        return self._definir(Contador, nombre, ayuda, etiquetas)
+
+    def medidor(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()) -> Medidor:
+        return self._definir(Medidor, nombre, ayuda, etiquetas)
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = (),
+                   limites: Iterable[float] = LIMITES_LATENCIA) -> Histograma:
+        return self._definir(Histograma, nombre, ayuda, etiquetas, limites)
+
+    # ==================== FRAGMENTOS ====================
+
+    def _fragmento(self) -> dict:
+        try:
+            return self._local.valores
+        except AttributeError:
+            valores = {}
+            with self._candado:
+                self._plegar_terminados()
+                self._fragmentos.append((threading.current_thread(), valores))
+            self._local.valores = valores
+            return valores
+
+    def _plegar(self, destino: dict, valores: dict):
+        for clave, valor in list(valores.items()):
+            destino[clave] = self._metricas[clave[0]]._plegar(destino.get(clave), valor)
+
+    def _plegar_terminados(self):
+        """Suma al acumulado los fragmentos de hilos que ya terminaron (con el candado tomado)"""
+        vivos = []
+        for hilo, valores in self._fragmentos:
+            if hilo.is_alive():
+                vivos.append((hilo, valores))
+            else:
+                self._plegar(self._retirado, valores)
+        self._fragmentos = vivos
+
+    # ==================== EXPOSICIÓN ====================
+
+    def valores(self) -> Dict[Tuple, object]:
+        """Suma de todos los fragmentos: (nombre, etiquetas) -> valor"""
+        with self._candado:
+            self._plegar_terminados()
+            total = {clave: (list(v) if isinstance(v, list) else v) for clave, v in self._retirado.items()}
+            for _, valores in self._fragmentos:
+                self._plegar(total, valores)
+        return total
+
+    def valor(self, nombre: str, *etiquetas) -> Optional[object]:
+        return self.valores().get((nombre, etiquetas))
+
+    def exponer(self, familias: Iterable[Familia] = ()) -> str:
+        """Texto de exposición con las métricas registradas y las familias calculadas"""
+        por_metrica: Dict[str, Dict[Tuple, object]] = {}
+        for (nombre, etiquetas), valor in self.valores().items():
+            por_metrica.setdefault(nombre, {})[etiquetas] = valor
+
+        lineas = []
+        for nombre, metrica in sorted(self._metricas.items()):
+            lineas.append(f"# HELP {nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {nombre} {metrica.tipo}")
+            lineas.extend(metrica._lineas(por_metrica.get(nombre, {})))
+        for familia in familias:
+            lineas.extend(familia.lineas())
+        return '\n'.join(lineas) + '\n'
+
+
+# ==================== MÉTRICAS DE LOS BACKENDS ====================
+
+METRICAS = Metricas()
+
+PETICIONES = METRICAS.contador(
+    'malla_http_peticiones_total', 'Peticiones HTTP atendidas', ('metodo', 'ruta', 'codigo'))
+LATENCIA = METRICAS.histograma(
+    'malla_http_duracion_segundos', 'Duración de las peticiones HTTP', ('metodo', 'ruta'))
+TAMANO_RESPUESTA = METRICAS.histograma(
+    'malla_http_respuesta_bytes', 'Tamaño del cuerpo de las respuestas', ('metodo', 'ruta'), LIMITES_BYTES)
+EN_CURSO = METRICAS.medidor(
+    'malla_http_peticiones_en_curso', 'Peticiones HTTP en curso', ('metodo',))
+
+RESOLUCIONES_PREREQUISITOS = METRICAS.contador(
+    'malla_resoluciones_prerequisitos_total', 'Resoluciones recursivas de prerequisitos')
+CURSOS_AUTOAGREGADOS = METRICAS.contador(
+    'malla_cursos_autoagregados_total', 'Prerequisitos agregados automáticamente a una malla')
+
+
+def registrar_peticion(metodo: str, ruta: Optional[str], codigo: int, duracion: float,
+                       bytes_respuesta: Optional[int]):
+    """Registra una petición terminada (lo llaman los hooks de cada backend)"""
+    ruta = ruta or RUTA_DESCONOCIDA
+    PETICIONES.inc(metodo, ruta, str(codigo))
+    LATENCIA.observar(duracion, metodo, ruta)
+    if bytes_respuesta is not None:
+        TAMANO_RESPUESTA.observar(bytes_respuesta, metodo, ruta)
+
+
+def familias_dominio(estadisticas_cache: Optional[Mapping], ubicaciones: Mapping[str, int]) -> List[Familia]:
+    """
+    Familias calculadas al exponer: mallas, ubicaciones y caché de mallas.
+    Sin etiqueta malla_id (una serie por malla no escala a miles de mallas):
+    totales y la distribución de ubicaciones por malla como histograma.
+    """
+    familias = [
+        Familia('malla_mallas', 'gauge', 'Mallas guardadas', muestras=[((), len(ubicaciones))]),
+        Familia('malla_ubicaciones', 'gauge', 'Cursos ubicados en todas las mallas',
+                muestras=[((), sum(ubicaciones.values()))]),
+        FamiliaHistograma('malla_ubicaciones_por_malla', 'histogram', 'Cursos ubicados por malla',
+                          limites=LIMITES_UBICACIONES, observaciones=ubicaciones.values()),
+    ]
+    if estadisticas_cache:
+        for campo in ('aciertos', 'fallos', 'desalojos', 'escrituras'):
+            familias.append(Familia(
+                f'malla_cache_{campo}_total', 'counter', f'Caché de mallas: {campo}',
+                muestras=[((), estadisticas_cache[campo])]
+            ))
+        for campo in ('residentes', 'en_disco', 'bytes_residentes', 'presupuesto_bytes'):
+            familias.append(Familia(
+                f'malla_cache_{campo}', 'gauge', f'Caché de mallas: {campo}',
+                muestras=[((), estadisticas_cache[campo])]
+            ))
+        consultas = estadisticas_cache['aciertos'] + estadisticas_cache['fallos']
+        familias.append(Familia(
+            'malla_cache_tasa_aciertos', 'gauge', 'Fracción de lecturas servidas desde memoria',
+            muestras=[((), estadisticas_cache['aciertos'] / consultas if consultas else 0.0)]
+        ))
+    return familias
@@ -1,6 +1,6 @@
 """
 Modelos para Malla Académica
-Usando Pydantic para validación de datos
+Dataclasses compartidas por los backends Flask y FastAPI
 """
 from enum import Enum
 from typing import List, Optional
@@ -25,11 +25,11 @@ class Curso:
     prerequisitos: List[str] = None
     dificultad: str = DifficultyLevel.FACIL
     horas: int = 48  # Horas estipuladas por defecto
-    
+
     def __post_init__(self):
         if self.prerequisitos is None:
             self.prerequisitos = []
-    
+
     def to_dict(self):
         return asdict(self)
 
@@ -41,7 +41,7 @@ class MallaCurso:
     posicion_x: int
     posicion_y: int
     semestre: int
-    
+
     def to_dict(self):
         return asdict(self)
 
@@ -54,18 +54,48 @@ class Malla:
     cursos: List[MallaCurso] = None
     descripcion: Optional[str] = None
     fecha_creacion: Optional[str] = None
-    
+    periodo_vigencia: str = "202420"
+    creditos_programa: int = 48
+    numero_niveles: int = 4
+    estado: str = "borrador"  # borrador | publicado
+
     def __post_init__(self):
         if self.cursos is None:
             self.cursos = []
         if self.fecha_creacion is None:
             self.fecha_creacion = datetime.now().isoformat()
-    
+
     def to_dict(self):
         data = asdict(self)
         data['cursos'] = [c.to_dict() if hasattr(c, 'to_dict') else c for c in self.cursos]
         return data
 
+    def resumen(self):
+        """Fila de listado: metadatos sin los cursos embebidos"""
+        return resumen_malla(
+            {campo: getattr(self, campo) for campo in CAMPOS_RESUMEN_MALLA}, len(self.cursos)
+        )
+
+
+# Campos de metadatos que se pueden actualizar sobre una malla
+CAMPOS_EDITABLES_MALLA = ('nombre', 'periodo_vigencia', 'creditos_programa', 'numero_niveles', 'estado')
+
+# Campos que se aceptan al crear una malla
+CAMPOS_CREACION_MALLA = ('id', 'programa', 'descripcion') + CAMPOS_EDITABLES_MALLA
+
+ESTADOS_MALLA = ('borrador', 'publicado')
+
+# Columnas de una fila de listado (GET /api/mallas)
+CAMPOS_RESUMEN_MALLA = (
+    'id', 'nombre', 'programa', 'descripcion', 'fecha_creacion',
+    'periodo_vigencia', 'creditos_programa', 'numero_niveles', 'estado'
+)
+
+
+def resumen_malla(campos: dict, total_cursos: int) -> dict:
+    """Fila de listado a partir de los metadatos y la cantidad de cursos"""
+    return {**campos, 'total_cursos': total_cursos}
+
 
 @dataclass
 class CursoArrastrado:
@@ -73,6 +103,6 @@ class CursoArrastrado:
     posicion_x: int
     posicion_y: int
     semestre: int
-    
+
     def to_dict(self):
         return asdict(self)
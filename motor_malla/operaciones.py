@@ -0,0 +1,247 @@
+"""
+Reglas de ubicación de cursos en la malla
+Planifican los cambios sin aplicarlos, para que cada backend los persista
+con su propio almacenamiento (síncrono o asíncrono)
+"""
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from motor_malla.catalogo import Catalogo
+from motor_malla.errores import (
+    CURSO_DUPLICADO, CURSO_NO_ENCONTRADO, ESTADO_INVALIDO, MODO_ELIMINACION_INVALIDO, PROFUNDIDAD_INVALIDA,
+    PROGRAMA_REQUERIDO
+)
+from motor_malla.grafo import dependientes_por_distancia
+from motor_malla.layout import reubicar
+from motor_malla.metricas import CURSOS_AUTOAGREGADOS, RESOLUCIONES_PREREQUISITOS
+from motor_malla.modelos import CAMPOS_CREACION_MALLA, ESTADOS_MALLA, Malla, MallaCurso
+
+GeneradorId = Callable[[str, int], str]
+UbicacionesDe = Callable[[str], Sequence[MallaCurso]]
+
+# Modos de DELETE /cursos/<id>: sin modo se elimina solo la ubicación (como antes)
+SIMPLE = "simple"
+PREVIEW = "preview"
+CASCADE = "cascade"
+BLOCK = "block"
+MODOS_ELIMINACION = (SIMPLE, PREVIEW, CASCADE, BLOCK)
+
+
+def id_posicional(curso_id: str, indice: int) -> str:
+    """ID legible basado en la posición del curso dentro de la malla"""
+    return f"MALLA_{curso_id}_{indice}"
+
+
+def id_uuid(curso_id: str, indice: int) -> str:
+    """ID aleatorio (uuid4)"""
+    return str(uuid.uuid4())
+
+
+GeneradorIdMalla = Callable[[int], str]
+
+
+def id_malla_secuencial(numero: int) -> str:
+    """ID legible de malla (MALLA001, MALLA002, ...)"""
+    return f"MALLA{numero:03d}"
+
+
+def id_malla_uuid(numero: int) -> str:
+    """ID aleatorio de malla (uuid4)"""
+    return str(uuid.uuid4())
+
+
+def construir_malla(datos: Dict, malla_id: str) -> Tuple[Malla, str]:
+    """
+    Construye una malla nueva (sin cursos) a partir de los datos recibidos.
+    Los campos ausentes toman los valores por defecto de Malla.
+
+    Returns:
+        tuple: (Malla, None) o (None, mensaje de error)
+    """
+    campos = {c: datos[c] for c in CAMPOS_CREACION_MALLA if datos.get(c) is not None}
+    if not str(campos.get('programa', '')).strip():
+        return None, PROGRAMA_REQUERIDO
+    if campos.get('estado', ESTADOS_MALLA[0]) not in ESTADOS_MALLA:
+        return None, ESTADO_INVALIDO
+
+    campos.setdefault('nombre', '')
+    campos['id'] = campos.get('id') or malla_id
+    return Malla(cursos=[], **campos), None
+
+
+@dataclass
+class PlanAgregado:
+    """Cambios que produce agregar un curso con sus prerequisitos"""
+    nuevos: List[MallaCurso]     # Curso principal primero, luego prerequisitos
+    movidos: List[MallaCurso]    # Ubicaciones existentes reubicadas por el layout
+    info_niveles: Dict
+
+    @property
+    def curso_principal(self) -> MallaCurso:
+        return self.nuevos[0]
+
+    @property
+    def prerequisitos_agregados(self) -> List[MallaCurso]:
+        return self.nuevos[1:]
+
+    def to_dict(self):
+        return {
+            'curso_principal': self.curso_principal.to_dict(),
+            'prerequisitos_agregados': [c.to_dict() for c in self.prerequisitos_agregados],
+            'info_niveles': self.info_niveles
+        }
+
+
+def planificar_agregado(catalogo: Catalogo, cursos_malla: List[MallaCurso], curso_id: str,
+                        posicion_x: int, posicion_y: int, semestre: int,
+                        generar_id: GeneradorId = id_posicional) -> Tuple[PlanAgregado, str]:
+    """
+    Planifica agregar un curso a la malla junto con sus prerequisitos faltantes.
+    No cuenta en las métricas: quien aplica el plan llama a `contar_agregado`.
+
+    - El semestre se ajusta al nivel mínimo que permite la cadena de prerequisitos.
+    - Cada prerequisito faltante se ubica `profundidad` semestres antes del curso.
+    - Las columnas (semestres) que reciben cursos se reordenan con el motor de layout.
+
+    Returns:
+        tuple: (PlanAgregado, None) o (None, mensaje de error)
+    """
+    if curso_id not in catalogo:
+        return None, CURSO_NO_ENCONTRADO
+
+    cursos_en_malla = {mc.curso_id for mc in cursos_malla}
+    if curso_id in cursos_en_malla:
+        return None, CURSO_DUPLICADO
+
+    prerequisitos_arbol = catalogo.prerequisitos_recursivos(curso_id)
+    nivel_minimo = catalogo.nivel_minimo(curso_id)
+
+    # Validar y ajustar nivel si es necesario
+    nivel_valido = semestre >= nivel_minimo
+    semestre_final = semestre if nivel_valido else nivel_minimo
+
+    total = len(cursos_malla)
+    nuevos = [MallaCurso(
+        id=generar_id(curso_id, total),
+        curso_id=curso_id,
+        posicion_x=posicion_x,
+        posicion_y=posicion_y,
+        semestre=semestre_final
+    )]
+
+    # Prerequisitos faltantes, de la cadena más profunda a la más cercana
+    for prereq in sorted(prerequisitos_arbol, key=lambda x: x['profundidad'], reverse=True):
+        if prereq['id'] in cursos_en_malla:
+            continue
+        nuevos.append(MallaCurso(
+            id=generar_id(prereq['id'], total + len(nuevos)),
+            curso_id=prereq['id'],
+            posicion_x=posicion_x,
+            posicion_y=posicion_y,
+            semestre=max(1, semestre_final - prereq['profundidad'])
+        ))
+        cursos_en_malla.add(prereq['id'])
+
+    # Reubicar solo las columnas (semestres) que recibieron cursos nuevos
+    reubicados = {
+        c.id: c for c in reubicar(
+            list(cursos_malla) + nuevos, catalogo.prerequisitos_de, {c.semestre for c in nuevos}
+        )
+    }
+
+    return PlanAgregado(
+        nuevos=[reubicados.get(c.id, c) for c in nuevos],
+        movidos=[reubicados[c.id] for c in cursos_malla if c.id in reubicados],
+        info_niveles={
+            'nivel_solicitado': semestre,
+            'nivel_usado': semestre_final,
+            'ajustado': not nivel_valido,
+            'nivel_minimo': nivel_minimo,
+            'profundidad_arbol': max((p['profundidad'] for p in prerequisitos_arbol), default=0)
+        }
+    ), None
+
+
+def contar_agregado(plan: PlanAgregado):
+    """Registra en las métricas un agregado con prerequisitos ya aplicado a una malla"""
+    RESOLUCIONES_PREREQUISITOS.inc()
+    if plan.prerequisitos_agregados:
+        CURSOS_AUTOAGREGADOS.inc(cantidad=len(plan.prerequisitos_agregados))
+
+
+def consultar_dependientes(catalogo: Catalogo, curso_id: str, profundidad: int = 1) -> Tuple[List[Dict], str]:
+    """
+    Cursos que dependen de `curso_id` hasta `profundidad` saltos (0 = todos).
+
+    Returns:
+        tuple: (lista de dependientes, None) o (None, mensaje de error)
+    """
+    if curso_id not in catalogo:
+        return None, CURSO_NO_ENCONTRADO
+    if not isinstance(profundidad, int) or profundidad < 0:
+        return None, PROFUNDIDAD_INVALIDA
+    return catalogo.dependientes(curso_id, profundidad), None
+
+
+@dataclass
+class PlanEliminacion:
+    """Ubicación a eliminar y las ubicaciones que dependen de ella (directa o indirectamente)"""
+    curso: MallaCurso
+    dependientes: List[MallaCurso]   # Por distancia creciente
+    profundidades: Dict[str, int]    # curso_malla_id -> distancia al curso eliminado
+
+    @property
+    def ids(self) -> Tuple[str, ...]:
+        """IDs que quita la cascada: el curso y todos sus dependientes"""
+        return (self.curso.id,) + tuple(c.id for c in self.dependientes)
+
+    def to_dict(self):
+        return {
+            'curso': self.curso.to_dict(),
+            'dependientes': [
+                {**c.to_dict(), 'profundidad': self.profundidades[c.id]} for c in self.dependientes
+            ],
+            'total_dependientes': len(self.dependientes)
+        }
+
+
+def validar_modo_eliminacion(modo: Optional[str]) -> Tuple[str, Optional[str]]:
+    """Modo de eliminación pedido (None = simple); retorna (modo, None) o (None, error)"""
+    if modo is None:
+        return SIMPLE, None
+    if modo not in MODOS_ELIMINACION:
+        return None, MODO_ELIMINACION_INVALIDO
+    return modo, None
+
+
+def planificar_eliminacion(catalogo: Catalogo, ubicaciones_de: UbicacionesDe, curso: MallaCurso) -> PlanEliminacion:
+    """
+    Ubicaciones que quedan sin un prerequisito si se elimina `curso`.
+
+    Se recorre el índice inverso del catálogo solo a través de cursos
+    ubicados en la malla: un dependiente que no está ubicado no propaga
+    (lo que venga después ya le faltaba un prerequisito). El costo es
+    proporcional a las ubicaciones afectadas, no al tamaño de la malla.
+    Si el mismo curso sigue ubicado en otra posición, el prerequisito se
+    mantiene y nadie queda afectado.
+
+    Args:
+        catalogo: Catálogo con el índice inverso de dependientes
+        ubicaciones_de: curso_id -> ubicaciones de ese curso en la malla (vacío si no está ubicado)
+        curso: Ubicación que se quiere eliminar
+    """
+    if any(otra.id != curso.id for otra in ubicaciones_de(curso.curso_id)):
+        return PlanEliminacion(curso=curso, dependientes=[], profundidades={})
+
+    def dependientes_ubicados(curso_id: str) -> List[str]:
+        return [d for d in catalogo.dependientes_de(curso_id) if ubicaciones_de(d)]
+
+    distancias = dependientes_por_distancia(dependientes_ubicados, curso.curso_id, 0)
+    # Todas las ubicaciones de un dependiente pierden el prerequisito
+    dependientes = [c for curso_id in distancias for c in ubicaciones_de(curso_id)]
+    return PlanEliminacion(
+        curso=curso,
+        dependientes=dependientes,
+        profundidades={c.id: distancias[c.curso_id] for c in dependientes}
+    )
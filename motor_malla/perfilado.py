@@ -0,0 +1,156 @@
+"""
+Perfilado de una petición puntual a pedido
+Una petición con el header X-Perfilar (o el parámetro ?perfilar=) y el token
+de administración (header X-Admin-Token = MALLA_TOKEN_ADMIN) se ejecuta bajo
+un perfilador. Sin el flag no se crea nada: el costo es leer un header.
+
+Modos:
+    archivo:   cProfile; el .prof se guarda en un directorio rotativo
+               (MALLA_PERFILES_DIR, se conservan MALLA_PERFILES_MAX) y la
+               respuesta lleva su nombre en el header X-Perfil
+    colapsado: muestreo de la pila del hilo que atiende la petición; la
+               respuesta se reemplaza por las pilas colapsadas (formato de
+               flamegraph.pl / speedscope: "a;b;c cantidad" por línea)
+
+En FastAPI el handler corre en el hilo del event loop, así que ambos modos
+también ven lo que otras corrutinas ejecuten mientras tanto.
+"""
+import os
+import sys
+import tempfile
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+
+from motor_malla.administracion import token_admin_valido
+
+if TYPE_CHECKING:
+    import cProfile
+
+MODO_ARCHIVO = "archivo"
+MODO_COLAPSADO = "colapsado"
+MODOS_PERFILADO = (MODO_ARCHIVO, MODO_COLAPSADO)
+
+INTERVALO_MUESTREO = 0.001  # segundos entre muestras
+PERFILES_POR_DEFECTO = 20
+
+
+def modo_solicitado(flag: Optional[str], token: Optional[str]) -> Optional[str]:
+    """
+    Modo de perfilado pedido por la petición, o None.
+    Sin MALLA_TOKEN_ADMIN configurado el perfilado está deshabilitado, y un
+    flag sin token válido se ignora (la petición se atiende normalmente).
+    """
+    if not flag:
+        return None
+    if not token_admin_valido(token):
+        return None
+    flag = flag.lower()
+    return flag if flag in MODOS_PERFILADO else MODO_ARCHIVO
+
+
+def directorio_perfiles() -> str:
+    return os.environ.get("MALLA_PERFILES_DIR") or os.path.join(tempfile.gettempdir(), "malla_perfiles")
+
+
+def _nombre_marco(marco) -> str:
+    codigo = marco.f_code
+    return f"{marco.f_globals.get('__name__', '?')}.{getattr(codigo, 'co_qualname', codigo.co_name)}"
+
+
+class Muestreador:
+    """Toma muestras periódicas de la pila de un hilo desde un hilo auxiliar"""
+
+    def __init__(self, hilo_id: int, intervalo: float = INTERVALO_MUESTREO):
+        self.hilo_id = hilo_id
+        self.intervalo = intervalo
+        self.pilas: Counter = Counter()
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._muestrear, name="muestreador-perfil", daemon=True)
+
+    def _muestrear(self):
+        while not self._detener.wait(self.intervalo):
+            marco = sys._current_frames().get(self.hilo_id)
+            pila = []
+            while marco is not None:
+                pila.append(_nombre_marco(marco))
+                marco = marco.f_back
+            if pila:
+                self.pilas[';'.join(reversed(pila))] += 1
+
+    def iniciar(self):
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        self._hilo.join()
+
+    def colapsado(self) -> str:
+        return ''.join(f"{pila} {cantidad}\n" for pila, cantidad in self.pilas.most_common())
+
+
+class Perfilador:
+    """
+    Perfilador de una petición.
+
+    Uso:
+        perfil = Perfilador(modo)
+        perfil.iniciar()
+        ...                       # atender la petición
+        perfil.detener()
+        perfil.resultado          # nombre del .prof (archivo) o pilas colapsadas
+    """
+
+    def __init__(self, modo: str):
+        self.modo = modo
+        self.resultado: Optional[str] = None
+        self.nombre_archivo: Optional[str] = None
+        self._perfil = None
+        self._muestreador = None
+
+    @property
+    def activo(self) -> bool:
+        return self._perfil is not None or self._muestreador is not None
+
+    def iniciar(self):
+        if self.modo == MODO_COLAPSADO:
+            self._muestreador = Muestreador(threading.get_ident())
+            self._muestreador.iniciar()
+        else:
+            # El nombre se conoce antes de terminar, para poder mandarlo en los headers
+            marca = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+            self.nombre_archivo = f"{marca}-{os.getpid()}.prof"
+            import cProfile  # Se carga con el primer perfil pedido, no al importar el backend
+
+            self._perfil = cProfile.Profile()
+            self._perfil.enable()
+
+    def detener(self):
+        """Detiene el perfilador (idempotente) y deja el resultado en `resultado`"""
+        if self._muestreador is not None:
+            self._muestreador.detener()
+            self.resultado = self._muestreador.colapsado()
+            self._muestreador = None
+        elif self._perfil is not None:
+            self._perfil.disable()
+            guardar_perfil(self._perfil, self.nombre_archivo)
+            self.resultado = self.nombre_archivo
+            self._perfil = None
+
+
+def guardar_perfil(perfil: "cProfile.Profile", nombre: str, directorio: str = None, maximo: int = None) -> str:
+    """Guarda el perfil y borra los más antiguos si hay más de `maximo`"""
+    directorio = directorio or directorio_perfiles()
+    maximo = maximo or int(os.environ.get("MALLA_PERFILES_MAX", PERFILES_POR_DEFECTO))
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, nombre)
+    perfil.dump_stats(ruta)
+
+    perfiles = sorted(n for n in os.listdir(directorio) if n.endswith(".prof"))
+    for viejo in perfiles[:-maximo]:
+        try:
+            os.remove(os.path.join(directorio, viejo))
+        except FileNotFoundError:
+            pass  # Otro proceso ya lo rotó
+    return ruta
@@ -0,0 +1,150 @@
+"""
+Catálogo recargable en caliente (read-copy-update)
+El catálogo vigente se publica en una sola referencia. Una recarga lee el
+archivo y arma el catálogo nuevo con todas sus estructuras derivadas
+(cierres de prerequisitos, niveles, respuesta codificada) aparte, sin tocar
+el vigente; al terminar lo publica con una asignación. Los lectores nunca
+toman un candado: solo las recargas se serializan entre sí.
+
+Cada petición fija el catálogo vigente al empezar (`fijar`), así ve uno solo
+de principio a fin aunque a mitad de camino se publique otro.
+
+Configuración (variables de entorno):
+    MALLA_CATALOGO: archivo JSON del catálogo (sin él se usa el semilla)
+    MALLA_CATALOGO_INTERVALO: segundos entre revisiones del archivo (0 = no vigilar)
+"""
+import os
+import threading
+from contextvars import ContextVar, Token
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from motor_malla.calentamiento import Preparacion, calentar_catalogo
+from motor_malla.catalogo import Catalogo, cargar_catalogo, crear_catalogo_semilla
+from motor_malla.errores import CATALOGO_INVALIDO, CATALOGO_SIN_ARCHIVO
+from motor_malla.metricas import METRICAS
+
+INTERVALO_POR_DEFECTO = 2.0
+
+RECARGAS = METRICAS.contador(
+    'malla_catalogo_recargas_total', 'Recargas del catálogo por resultado', ('resultado',))
+
+# Catálogo fijado por la petición en curso (None = el vigente)
+catalogo_fijado: ContextVar[Optional[Catalogo]] = ContextVar('catalogo_fijado', default=None)
+
+
+def _firma(ruta: str) -> Optional[Tuple[int, int]]:
+    """Marca de modificación y tamaño del archivo (None si no existe)"""
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        return None
+    return estado.st_mtime_ns, estado.st_size
+
+
+class FuenteCatalogo:
+    """
+    Referencia al catálogo vigente y su recarga desde archivo.
+
+    Uso:
+        fuente = FuenteCatalogo(cargar_catalogo(ruta), ruta)
+        fuente.actual              # catálogo fijado por la petición, o el vigente
+        token = fuente.fijar()     # al empezar la petición
+        fuente.soltar(token)       # al terminarla
+        fuente.recargar()          # (estado, None) o (None, error)
+        fuente.vigilar()           # recarga cuando cambia el archivo
+    """
+
+    def __init__(self, catalogo: Catalogo = None, ruta: str = None):
+        self._vigente = catalogo
+        self.ruta = ruta
+        self.version = 1 if catalogo is not None else 0
+        self.publicado_en: Optional[str] = datetime.now().isoformat() if catalogo is not None else None
+        self.error: Optional[str] = None
+        self._firma = _firma(ruta) if ruta else None
+        self._candado = threading.Lock()
+        self._detener: Optional[threading.Event] = None
+
+    @property
+    def actual(self) -> Optional[Catalogo]:
+        fijado = catalogo_fijado.get()
+        return fijado if fijado is not None else self._vigente
+
+    def publicar(self, catalogo: Catalogo):
+        """Reemplaza el catálogo vigente (la asignación es el único punto de cambio)"""
+        self._vigente = catalogo
+        self.version += 1
+        self.publicado_en = datetime.now().isoformat()
+
+    def fijar(self) -> Token:
+        return catalogo_fijado.set(self._vigente)
+
+    def soltar(self, token: Token):
+        catalogo_fijado.reset(token)
+
+    def recargar(self) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Lee el archivo y publica el catálogo nuevo ya calentado.
+        Si el archivo es inválido se mantiene el vigente y el detalle queda en `error`.
+
+        Returns:
+            tuple: (estado con la duración de cada paso, None) o (None, error)
+        """
+        if not self.ruta:
+            return None, CATALOGO_SIN_ARCHIVO
+        with self._candado:
+            self._firma = _firma(self.ruta)
+            preparacion = Preparacion()
+            try:
+                with preparacion.paso('lectura'):
+                    nuevo = cargar_catalogo(self.ruta)
+                calentar_catalogo(nuevo, preparacion)
+            except (OSError, ValueError) as error:
+                self.error = f"{type(error).__name__}: {error}"
+                RECARGAS.inc('error')
+                return None, CATALOGO_INVALIDO
+            preparacion.terminar()
+            self.publicar(nuevo)
+            self.error = None
+            RECARGAS.inc('ok')
+        estado = self.estado()
+        estado.update(duracion_ms=preparacion.duracion_ms, pasos=preparacion.pasos)
+        return estado, None
+
+    def vigilar(self, intervalo: float = None):
+        """Revisa el archivo cada `intervalo` segundos desde un hilo auxiliar y recarga si cambió"""
+        if intervalo is None:
+            intervalo = float(os.environ.get('MALLA_CATALOGO_INTERVALO', INTERVALO_POR_DEFECTO))
+        if not self.ruta or intervalo <= 0 or self._detener is not None:
+            return
+        self._detener = threading.Event()
+
+        def revisar(detener: threading.Event):
+            while not detener.wait(intervalo):
+                if _firma(self.ruta) != self._firma:
+                    self.recargar()
+
+        threading.Thread(target=revisar, args=(self._detener,), name='recarga-catalogo', daemon=True).start()
+
+    def detener(self):
+        if self._detener is not None:
+            self._detener.set()
+            self._detener = None
+
+    def estado(self) -> Dict:
+        vigente = self._vigente
+        return {
+            'archivo': self.ruta,
+            'version': self.version,
+            'total': len(vigente) if vigente is not None else 0,
+            'publicado_en': self.publicado_en,
+            'error': self.error,
+        }
+
+
+def crear_fuente_catalogo() -> FuenteCatalogo:
+    """Catálogo de MALLA_CATALOGO si está configurado, si no el semilla (no recargable)"""
+    ruta = os.environ.get('MALLA_CATALOGO')
+    if not ruta:
+        return FuenteCatalogo(crear_catalogo_semilla())
+    return FuenteCatalogo(cargar_catalogo(ruta), ruta)
@@ -0,0 +1,177 @@
+"""
+Ruta crítica y holgura de una malla
+Sobre el subgrafo de cursos ubicados (aristas = prerequisitos directos entre
+cursos de la malla) se hace una pasada hacia adelante en orden topológico
+(semestre más temprano posible de cada curso) y una hacia atrás (semestre
+más tardío sin atrasar a sus dependientes dentro del horizonte). La cadena
+de prerequisitos más larga da los semestres mínimos del programa y la
+diferencia entre ambos extremos es la holgura de cada curso.
+
+El resultado se memoiza por malla y versión: mientras los semestres (tuplas
+compartidas, ver versiones), el catálogo y el número de niveles sean los
+mismos, se reutiliza sin recalcular.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional
+
+from motor_malla.grafo import PrerequisitosDe, orden_topologico
+from motor_malla.trazas import span
+from motor_malla.versiones import Semestres
+
+ENTRADAS_MAXIMAS = 256
+
+
+def analizar_ruta_critica(semestres: Semestres, prerequisitos_de: PrerequisitosDe,
+                          numero_niveles: int = 0) -> Dict:
+    """
+    Ruta crítica, semestres mínimos y holgura de cada curso ubicado.
+
+    Por curso se reportan dos holguras:
+    - `holgura`: mas_tardio - mas_temprano, sin mirar dónde está ubicado
+      hoy (0 = está en la ruta crítica del horizonte)
+    - `adelantar` / `atrasar`: cuántos semestres puede moverse desde su
+      semestre actual sin quedar junto o antes de un prerequisito ubicado
+      (ni junto o después de un dependiente). Negativo = ya rompe uno.
+
+    Args:
+        semestres: Cursos ubicados agrupados por semestre
+        prerequisitos_de: Prerequisitos directos según el catálogo
+        numero_niveles: Semestres del programa (el horizonte es el mayor entre
+            este, los semestres mínimos y el último semestre ocupado)
+
+    Returns:
+        dict: semestres_minimos, horizonte, ruta_critica, conflictos y cursos
+    """
+    ubicados = {}
+    for semestre in sorted(semestres):
+        for curso in semestres[semestre]:
+            ubicados.setdefault(curso.curso_id, curso)
+
+    with span("ruta_critica.analizar", cursos=len(ubicados)):
+        previos = {
+            curso_id: [p for p in prerequisitos_de(curso_id) if p in ubicados and p != curso_id]
+            for curso_id in ubicados
+        }
+        orden = orden_topologico(list(ubicados), previos.__getitem__)
+        posicion = {curso_id: i for i, curso_id in enumerate(orden)}
+
+        # Pasada hacia adelante: semestre más temprano, el prerequisito que lo fija
+        # y el primer semestre libre según dónde están ubicados hoy sus prerequisitos
+        temprano: Dict[str, int] = {}
+        critico_previo: Dict[str, Optional[str]] = {}
+        piso: Dict[str, int] = {}
+        siguientes: Dict[str, List[str]] = {curso_id: [] for curso_id in orden}
+        for curso_id in orden:
+            mejor, desde, libre = 1, None, 1
+            for prereq_id in previos[curso_id]:
+                if ubicados[prereq_id].semestre >= libre:
+                    libre = ubicados[prereq_id].semestre + 1
+                if posicion[prereq_id] > posicion[curso_id]:
+                    continue  # Arista de retorno (ciclo)
+                siguientes[prereq_id].append(curso_id)
+                if temprano[prereq_id] >= mejor:
+                    mejor, desde = temprano[prereq_id] + 1, prereq_id
+            temprano[curso_id] = mejor
+            critico_previo[curso_id] = desde
+            piso[curso_id] = libre
+
+        semestres_minimos = max(temprano.values(), default=0)
+        horizonte = max(numero_niveles or 0, semestres_minimos, max(semestres, default=0))
+
+        # Pasada hacia atrás: semestre más tardío sin empujar a los dependientes
+        # y el último semestre libre antes de donde están ubicados hoy
+        tardio: Dict[str, int] = {}
+        techo: Dict[str, int] = {}
+        for curso_id in reversed(orden):
+            limite, libre = horizonte, horizonte
+            for dependiente_id in siguientes[curso_id]:
+                if tardio[dependiente_id] <= limite:
+                    limite = tardio[dependiente_id] - 1
+                if ubicados[dependiente_id].semestre <= libre:
+                    libre = ubicados[dependiente_id].semestre - 1
+            tardio[curso_id] = limite
+            techo[curso_id] = libre
+
+        cursos = []
+        conflictos = []
+        for curso_id in orden:
+            ubicacion = ubicados[curso_id]
+            actual = ubicacion.semestre
+            if actual < piso[curso_id]:
+                conflictos.append(curso_id)
+            holgura = tardio[curso_id] - temprano[curso_id]
+            cursos.append({
+                'curso_malla_id': ubicacion.id,
+                'curso_id': curso_id,
+                'semestre': actual,
+                'mas_temprano': temprano[curso_id],
+                'mas_tardio': tardio[curso_id],
+                'holgura': holgura,
+                'critico': holgura == 0,
+                'adelantar': actual - piso[curso_id],
+                'atrasar': techo[curso_id] - actual,
+            })
+        cursos.sort(key=lambda fila: (fila['holgura'], fila['mas_temprano'], fila['semestre']))
+
+        ruta = []
+        if orden:
+            nodo = max(orden, key=temprano.__getitem__)
+            while nodo is not None:
+                ruta.append(nodo)
+                nodo = critico_previo[nodo]
+            ruta.reverse()
+
+    return {
+        'semestres_minimos': semestres_minimos,
+        'horizonte': horizonte,
+        'ruta_critica': ruta,
+        'conflictos': conflictos,
+        'cursos': cursos,
+    }
+
+
+class CacheRutaCritica:
+    """
+    Últimos análisis por clave (malla_id, versión), en LRU acotada.
+
+    Una entrada vale mientras el catálogo sea el mismo objeto, el número de
+    niveles no cambie y los semestres sean los mismos: por identidad cuando
+    el llamador comparte las tuplas (almacén en memoria) o por igualdad
+    cuando los relee de un medio externo (SQLite).
+    """
+
+    def __init__(self, entradas_maximas: int = ENTRADAS_MAXIMAS):
+        self.entradas_maximas = entradas_maximas
+        self._entradas: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._candado = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave: Hashable, semestres: Semestres, catalogo, numero_niveles: int) -> Dict:
+        with self._candado:
+            entrada = self._entradas.get(clave)
+            if (entrada is not None and entrada[1] is catalogo and entrada[2] == numero_niveles
+                    and (entrada[0] is semestres or entrada[0] == semestres)):
+                self.aciertos += 1
+                self._entradas.move_to_end(clave)
+                return entrada[3]
+            self.fallos += 1
+
+        # Se calcula fuera del candado: dos peticiones simultáneas a lo sumo repiten el trabajo
+        resultado = self._calcular(semestres, catalogo, numero_niveles)
+        with self._candado:
+            self._entradas[clave] = (semestres, catalogo, numero_niveles, resultado)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.entradas_maximas:
+                self._entradas.popitem(last=False)
+        return resultado
+
+    def _calcular(self, semestres: Semestres, catalogo, numero_niveles: int) -> Dict:
+        """Análisis que se memoiza (las subclases reutilizan la caché para otros análisis)"""
+        return analizar_ruta_critica(semestres, catalogo.prerequisitos_de, numero_niveles)
+
+    def descartar(self, clave: Hashable):
+        """Olvida un análisis (p. ej. el del borrador de una malla desalojada)"""
+        with self._candado:
+            self._entradas.pop(clave, None)
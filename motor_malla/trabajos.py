@@ -0,0 +1,391 @@
+"""
+Trabajos pesados en procesos aparte
+Los cómputos largos sobre una malla (layout completo, ruta crítica,
+validación) no corren en el hilo de la petición ni en el event loop: se
+encolan y un supervisor los ejecuta en procesos hijos, a lo sumo
+MALLA_TRABAJOS_PROCESOS a la vez. Cada trabajo corre en su propio proceso,
+así cancelarlo o vencer su timeout lo termina de verdad. Los procesos se
+crean desde un forkserver que ya importó el motor (unos milisegundos cada uno).
+
+El proceso hijo recibe solo lo que necesita de la versión de la malla
+(ubicaciones y el subgrafo del catálogo de esos cursos), no el catálogo
+completo, y reporta su avance por un pipe.
+
+Estados: pendiente -> ejecutando -> terminado | fallido | cancelado | expirado
+
+Configuración (variables de entorno):
+    MALLA_TRABAJOS_PROCESOS: trabajos simultáneos (por defecto núcleos - 1, mínimo 1)
+    MALLA_TRABAJOS_COLA: trabajos en espera antes de rechazar (por defecto 100)
+    MALLA_TRABAJOS_TIMEOUT: segundos máximos de ejecución por trabajo (por defecto 60)
+"""
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from multiprocessing.connection import wait
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from motor_malla.errores import SERVICIO_SATURADO, TIPO_TRABAJO_INVALIDO, TRABAJO_NO_ENCONTRADO, TRABAJO_TERMINADO
+from motor_malla.layout import reubicar
+from motor_malla.metricas import METRICAS
+from motor_malla.ruta_critica import analizar_ruta_critica
+from motor_malla.validacion import validar_malla
+from motor_malla.versiones import Semestres, agrupar_por_semestre
+
+PENDIENTE = "pendiente"
+EJECUTANDO = "ejecutando"
+TERMINADO = "terminado"
+FALLIDO = "fallido"
+CANCELADO = "cancelado"
+EXPIRADO = "expirado"
+FINALES = (TERMINADO, FALLIDO, CANCELADO, EXPIRADO)
+
+COLA_POR_DEFECTO = 100
+TIMEOUT_POR_DEFECTO = 60.0
+# Trabajos terminados que se recuerdan para consultar su resultado
+RETENIDOS = 1000
+
+TRABAJOS = METRICAS.contador(
+    'malla_trabajos_total', 'Trabajos finalizados por tipo y estado', ('tipo', 'estado'))
+TRABAJOS_EN_CURSO = METRICAS.medidor(
+    'malla_trabajos_en_curso', 'Trabajos pendientes o ejecutándose', ('estado',))
+
+Avisar = Callable[[str, float], None]
+
+
+# ==================== CÓMPUTOS (corren en el proceso hijo) ====================
+
+def _layout(datos: Dict, avisar: Avisar) -> Dict:
+    avisar('layout', 0.1)
+    movidos = reubicar(datos['cursos'], datos['prerequisitos'].__getitem__)
+    return {'cursos': [c.to_dict() for c in movidos], 'total_movidos': len(movidos)}
+
+
+def _ruta_critica(datos: Dict, avisar: Avisar) -> Dict:
+    avisar('ruta_critica', 0.1)
+    return analizar_ruta_critica(
+        agrupar_por_semestre(datos['cursos']), datos['prerequisitos'].__getitem__,
+        datos['metadatos'].get('numero_niveles', 0)
+    )
+
+
+def _validacion(datos: Dict, avisar: Avisar) -> Dict:
+    avisar('validacion', 0.1)
+    return validar_malla(
+        datos['cursos'], datos['prerequisitos'].__getitem__, datos['creditos'].get,
+        datos['metadatos'].get('creditos_programa')
+    )
+
+
+TIPOS: Dict[str, Callable[[Dict, Avisar], Dict]] = {
+    'layout': _layout,
+    'ruta_critica': _ruta_critica,
+    'validacion': _validacion,
+}
+
+
+def preparar_datos(tipo: str, catalogo, semestres: Semestres,
+                   metadatos: Mapping) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    Lo que el proceso hijo necesita de una versión de la malla: sus
+    ubicaciones, sus metadatos y, de sus cursos, prerequisitos y créditos.
+
+    Returns:
+        tuple: (datos, None) o (None, TIPO_TRABAJO_INVALIDO)
+    """
+    if tipo not in TIPOS:
+        return None, TIPO_TRABAJO_INVALIDO
+    cursos = [curso for semestre in sorted(semestres) for curso in semestres[semestre]]
+    ubicados = {curso.curso_id for curso in cursos}
+    creditos = {}
+    for curso_id in ubicados:
+        curso = catalogo.obtener(curso_id)
+        if curso is not None:
+            creditos[curso_id] = curso.creditos
+    return {
+        'cursos': cursos,
+        'metadatos': dict(metadatos),
+        'prerequisitos': {curso_id: catalogo.prerequisitos_de(curso_id) for curso_id in ubicados},
+        'creditos': creditos,
+    }, None
+
+
+def _ejecutar(conexion, tipo: str, datos: Dict):
+    """Punto de entrada del proceso hijo: avance, y al final el resultado o el error"""
+    def avisar(etapa: str, fraccion: float):
+        conexion.send(('progreso', etapa, fraccion))
+
+    try:
+        resultado = TIPOS[tipo](datos, avisar)
+    except Exception as error:
+        conexion.send(('error', f"{type(error).__name__}: {error}"))
+    else:
+        conexion.send(('resultado', resultado))
+    finally:
+        conexion.close()
+
+
+def contexto_procesos():
+    """Contexto de multiprocessing para procesos de cómputo (también lo usa la validación masiva)"""
+    # forkserver: procesos limpios (sin los hilos del servidor) y baratos de crear
+    metodo = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    contexto = multiprocessing.get_context(metodo)
+    if metodo == 'forkserver':
+        contexto.set_forkserver_preload([__name__])
+    return contexto
+
+
+# ==================== COLA ====================
+
+class Trabajo:
+    """Estado observable de un trabajo; `revision` cambia con cada actualización"""
+
+    def __init__(self, tipo: str, malla_id: str, version: Optional[int], datos: Dict, timeout: float):
+        self.id = uuid.uuid4().hex
+        self.tipo = tipo
+        self.malla_id = malla_id
+        self.version = version
+        self.timeout = timeout
+        self.estado = PENDIENTE
+        self.etapa: Optional[str] = None
+        self.progreso = 0.0
+        self.resultado: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.creado_en = datetime.now().isoformat()
+        self.iniciado_en: Optional[str] = None
+        self.terminado_en: Optional[str] = None
+        self.revision = 0
+        self._datos = datos
+        self._limite: Optional[float] = None
+        self._proceso = None
+        self._conexion = None
+
+    @property
+    def final(self) -> bool:
+        return self.estado in FINALES
+
+    def to_dict(self, incluir_resultado: bool = True) -> Dict:
+        fila = {
+            'id': self.id,
+            'tipo': self.tipo,
+            'malla_id': self.malla_id,
+            'version': self.version,
+            'estado': self.estado,
+            'etapa': self.etapa,
+            'progreso': self.progreso,
+            'timeout': self.timeout,
+            'creado_en': self.creado_en,
+            'iniciado_en': self.iniciado_en,
+            'terminado_en': self.terminado_en,
+            'error': self.error,
+        }
+        if incluir_resultado and self.estado == TERMINADO:
+            fila['resultado'] = self.resultado
+        return fila
+
+
+class ColaTrabajos:
+    """
+    Cola acotada de trabajos y supervisor que los ejecuta en procesos hijos.
+
+    Uso:
+        trabajo, error = cola.enviar('validacion', malla_id, None, datos)
+        cola.obtener(trabajo.id)                    # (trabajo, None) o (None, error)
+        cola.esperar(trabajo.id, revision, 15)      # bloquea hasta el próximo cambio
+        cola.cancelar(trabajo.id)
+    """
+
+    def __init__(self, procesos: int = None, max_pendientes: int = None, timeout: float = None,
+                 retenidos: int = RETENIDOS):
+        if procesos is None:
+            procesos = int(os.environ.get('MALLA_TRABAJOS_PROCESOS', max(1, (os.cpu_count() or 2) - 1)))
+        if max_pendientes is None:
+            max_pendientes = int(os.environ.get('MALLA_TRABAJOS_COLA', COLA_POR_DEFECTO))
+        if timeout is None:
+            timeout = float(os.environ.get('MALLA_TRABAJOS_TIMEOUT', TIMEOUT_POR_DEFECTO))
+        self.procesos = max(1, procesos)
+        self.max_pendientes = max_pendientes
+        self.timeout = timeout
+        self.retenidos = retenidos
+        self._trabajos: "OrderedDict[str, Trabajo]" = OrderedDict()
+        self._pendientes: deque = deque()
+        self._ejecutando: List[Trabajo] = []
+        self._cambio = threading.Condition()
+        self._contexto = None
+        self._supervisor: Optional[threading.Thread] = None
+        self._detener = False
+
+    # ---------- API ----------
+
+    def enviar(self, tipo: str, malla_id: str, version: Optional[int], datos: Dict,
+               timeout: float = None) -> Tuple[Optional[Trabajo], Optional[str]]:
+        if tipo not in TIPOS:
+            return None, TIPO_TRABAJO_INVALIDO
+        with self._cambio:
+            if len(self._pendientes) >= self.max_pendientes:
+                return None, SERVICIO_SATURADO
+            trabajo = Trabajo(tipo, malla_id, version, datos, min(timeout or self.timeout, self.timeout))
+            self._trabajos[trabajo.id] = trabajo
+            self._pendientes.append(trabajo)
+            TRABAJOS_EN_CURSO.inc(PENDIENTE)
+            self._olvidar_terminados()
+            self._arrancar()
+            self._cambio.notify_all()
+        return trabajo, None
+
+    def obtener(self, trabajo_id: str) -> Tuple[Optional[Trabajo], Optional[str]]:
+        trabajo = self._trabajos.get(trabajo_id)
+        if trabajo is None:
+            return None, TRABAJO_NO_ENCONTRADO
+        return trabajo, None
+
+    def cancelar(self, trabajo_id: str) -> Tuple[Optional[Trabajo], Optional[str]]:
+        """Quita un trabajo pendiente o termina el proceso de uno en ejecución"""
+        with self._cambio:
+            trabajo = self._trabajos.get(trabajo_id)
+            if trabajo is None:
+                return None, TRABAJO_NO_ENCONTRADO
+            if trabajo.final:
+                return trabajo, TRABAJO_TERMINADO
+            if trabajo in self._pendientes:
+                self._pendientes.remove(trabajo)
+            elif trabajo._proceso is not None:
+                trabajo._proceso.terminate()
+            self._finalizar(trabajo, CANCELADO)
+        return trabajo, None
+
+    def esperar(self, trabajo_id: str, revision: int, espera: float) -> Optional[Trabajo]:
+        """Espera hasta `espera` segundos a que el trabajo pase de `revision` (para streaming)"""
+        with self._cambio:
+            trabajo = self._trabajos.get(trabajo_id)
+            if trabajo is not None:
+                self._cambio.wait_for(lambda: trabajo.revision != revision, espera)
+            return trabajo
+
+    def estado(self) -> Dict:
+        return {
+            'procesos': self.procesos,
+            'pendientes': len(self._pendientes),
+            'ejecutando': len(self._ejecutando),
+            'retenidos': len(self._trabajos),
+        }
+
+    def detener(self):
+        """Cancela lo pendiente y termina lo que se está ejecutando"""
+        with self._cambio:
+            self._detener = True
+            for trabajo in list(self._pendientes) + self._ejecutando:
+                if trabajo._proceso is not None:
+                    trabajo._proceso.terminate()
+                self._finalizar(trabajo, CANCELADO)
+            self._pendientes.clear()
+            self._cambio.notify_all()
+
+    # ---------- supervisor ----------
+
+    def _arrancar(self):
+        if self._supervisor is None:
+            self._contexto = contexto_procesos()
+            self._supervisor = threading.Thread(target=self._supervisar, name='trabajos', daemon=True)
+            self._supervisor.start()
+
+    def _actualizar(self, trabajo: Trabajo, **campos):
+        for campo, valor in campos.items():
+            setattr(trabajo, campo, valor)
+        trabajo.revision += 1
+        self._cambio.notify_all()
+
+    def _finalizar(self, trabajo: Trabajo, estado: str, **campos):
+        if trabajo.final:
+            return
+        TRABAJOS_EN_CURSO.dec(trabajo.estado)
+        TRABAJOS.inc(trabajo.tipo, estado)
+        trabajo._datos = None
+        self._actualizar(trabajo, estado=estado, terminado_en=datetime.now().isoformat(), **campos)
+
+    def _olvidar_terminados(self):
+        sobrantes = len(self._trabajos) - self.retenidos
+        for trabajo_id in [t.id for t in self._trabajos.values() if t.final][:max(sobrantes, 0)]:
+            del self._trabajos[trabajo_id]
+
+    def _iniciar(self, trabajo: Trabajo):
+        """Crea el proceso del trabajo (fuera del candado: serializar los datos puede tardar)"""
+        lectura, escritura = self._contexto.Pipe(duplex=False)
+        proceso = self._contexto.Process(
+            target=_ejecutar, args=(escritura, trabajo.tipo, trabajo._datos), daemon=True
+        )
+        try:
+            proceso.start()
+        except OSError as error:
+            lectura.close()
+            with self._cambio:
+                self._finalizar(trabajo, FALLIDO, error=f"{type(error).__name__}: {error}")
+            return
+        finally:
+            escritura.close()
+
+        with self._cambio:
+            if trabajo.final:  # Se canceló mientras arrancaba
+                proceso.terminate()
+                lectura.close()
+                return
+            trabajo._proceso, trabajo._conexion = proceso, lectura
+            trabajo._limite = time.monotonic() + trabajo.timeout
+            TRABAJOS_EN_CURSO.dec(PENDIENTE)
+            TRABAJOS_EN_CURSO.inc(EJECUTANDO)
+            self._ejecutando.append(trabajo)
+            self._actualizar(trabajo, estado=EJECUTANDO, iniciado_en=datetime.now().isoformat())
+
+    def _leer(self, trabajo: Trabajo) -> bool:
+        """Procesa los mensajes del hijo; retorna True cuando el proceso terminó"""
+        try:
+            while trabajo._conexion.poll():
+                mensaje = trabajo._conexion.recv()
+                if mensaje[0] == 'progreso':
+                    self._actualizar(trabajo, etapa=mensaje[1], progreso=mensaje[2])
+                elif mensaje[0] == 'resultado':
+                    self._finalizar(trabajo, TERMINADO, resultado=mensaje[1], progreso=1.0)
+                else:
+                    self._finalizar(trabajo, FALLIDO, error=mensaje[1])
+        except (EOFError, OSError):
+            self._finalizar(trabajo, FALLIDO, error="El proceso terminó sin entregar un resultado")
+            return True
+        return False
+
+    def _supervisar(self):
+        while True:
+            with self._cambio:
+                if self._detener:
+                    return
+                if self._pendientes and len(self._ejecutando) < self.procesos:
+                    siguiente = self._pendientes.popleft()
+                elif not self._ejecutando:
+                    self._cambio.wait()
+                    continue
+                else:
+                    siguiente = None
+                conexiones = {t._conexion: t for t in self._ejecutando}
+
+            if siguiente is not None:
+                self._iniciar(siguiente)
+                continue
+
+            listas = wait(list(conexiones), timeout=0.1)
+
+            with self._cambio:
+                terminados = [t for t in (conexiones[c] for c in listas) if self._leer(t)]
+                ahora = time.monotonic()
+                for trabajo in self._ejecutando:
+                    if not trabajo.final and ahora > trabajo._limite:
+                        trabajo._proceso.terminate()
+                        self._finalizar(trabajo, EXPIRADO, error=f"Superó el timeout de {trabajo.timeout:g} s")
+                    if trabajo.final and trabajo not in terminados:
+                        terminados.append(trabajo)
+                for trabajo in terminados:
+                    self._ejecutando.remove(trabajo)
+                    trabajo._conexion.close()
+                    trabajo._proceso.join(timeout=1)
+                    trabajo._proceso = trabajo._conexion = None
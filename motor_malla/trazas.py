@@ -0,0 +1,360 @@
+"""
+Trazas ligeras exportables como OTLP/JSON (formato de OpenTelemetry)
+Cada petición abre un span raíz y las operaciones de dominio (parseo del
+cuerpo, árbol de prerequisitos, nivel mínimo, mutaciones, serialización)
+abren spans hijos. Los spans terminados se encolan y un hilo auxiliar los
+exporta por lotes, así la petición nunca espera al exportador.
+
+Configuración (variables de entorno):
+    MALLA_TRAZAS: vacío (apagado) | archivo | colector
+    MALLA_TRAZAS_ARCHIVO: archivo JSON Lines, un ExportTraceServiceRequest por lote
+    MALLA_TRAZAS_COLECTOR: URL OTLP/HTTP (por defecto http://127.0.0.1:4318/v1/traces)
+
+Apagado, `span()` retorna un contexto nulo compartido. Fuera de una petición
+(sin span raíz) tampoco se registra nada.
+
+Colector local de reemplazo (guarda lo que recibe en un archivo):
+    python -m motor_malla.trazas --puerto 4318 --salida trazas.jsonl
+"""
+import atexit
+import functools
+import inspect
+import json
+import os
+import queue
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+APAGADO = ""
+EXPORTAR_ARCHIVO = "archivo"
+EXPORTAR_COLECTOR = "colector"
+
+COLECTOR_POR_DEFECTO = "http://127.0.0.1:4318/v1/traces"
+ARCHIVO_POR_DEFECTO = "trazas.jsonl"
+
+TAMANO_LOTE = 512
+INTERVALO_EXPORTACION = 1.0  # segundos
+ESPERA_CIERRE = 5.0  # segundos que se espera al hilo exportador al terminar el proceso
+
+# Tipos de span de OTLP
+SPAN_INTERNO = 1
+SPAN_SERVIDOR = 2
+
+# Códigos de estado de OTLP
+ESTADO_OK = 1
+ESTADO_ERROR = 2
+
+
+def _valor_otlp(valor) -> Dict:
+    if isinstance(valor, bool):
+        return {"boolValue": valor}
+    if isinstance(valor, int):
+        return {"intValue": str(valor)}  # int64 va como cadena en OTLP/JSON
+    if isinstance(valor, float):
+        return {"doubleValue": valor}
+    return {"stringValue": str(valor)}
+
+
+def _atributos_otlp(atributos: Dict) -> List[Dict]:
+    return [{"key": clave, "value": _valor_otlp(valor)} for clave, valor in atributos.items()]
+
+
+class Span:
+    """Span en curso o terminado (tiempos en nanosegundos desde la época)"""
+    __slots__ = ("nombre", "traza_id", "span_id", "padre_id", "tipo", "inicio", "fin", "atributos", "error")
+
+    def __init__(self, nombre: str, traza_id: str, padre_id: Optional[str], tipo: int = SPAN_INTERNO,
+                 atributos: Dict = None):
+        self.nombre = nombre
+        self.traza_id = traza_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.padre_id = padre_id
+        self.tipo = tipo
+        self.inicio = time.time_ns()
+        self.fin = 0
+        self.atributos = atributos or {}
+        self.error: Optional[str] = None
+
+    def fijar(self, clave: str, valor):
+        self.atributos[clave] = valor
+
+    def to_otlp(self) -> Dict:
+        span = {
+            "traceId": self.traza_id,
+            "spanId": self.span_id,
+            "name": self.nombre,
+            "kind": self.tipo,
+            "startTimeUnixNano": str(self.inicio),
+            "endTimeUnixNano": str(self.fin),
+            "attributes": _atributos_otlp(self.atributos),
+            "status": {"code": ESTADO_ERROR, "message": self.error} if self.error else {"code": ESTADO_OK},
+        }
+        if self.padre_id:
+            span["parentSpanId"] = self.padre_id
+        return span
+
+
+class _SpanNulo:
+    """Contexto y span a la vez, sin efecto (trazas apagadas)"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def fijar(self, clave, valor):
+        pass
+
+
+_NULO = _SpanNulo()
+
+_span_actual: ContextVar[Optional[Span]] = ContextVar("span_actual", default=None)
+
+
+class _Contexto:
+    __slots__ = ("_trazador", "_span", "_token")
+
+    def __init__(self, trazador: "Trazador", span: Span):
+        self._trazador = trazador
+        self._span = span
+
+    def __enter__(self) -> Span:
+        self._token = _span_actual.set(self._span)
+        return self._span
+
+    def __exit__(self, tipo, error, _traza):
+        self._trazador.cerrar(self._span, self._token, error)
+        return False
+
+
+# ==================== EXPORTADORES ====================
+
+# Marca en la cola que detiene al hilo exportador
+_FIN = object()
+
+
+class Exportador(ABC):
+    """Exporta lotes de spans terminados desde un hilo auxiliar"""
+
+    def __init__(self, servicio: str):
+        self.servicio = servicio
+        self._cola: queue.SimpleQueue = queue.SimpleQueue()
+        self._hilo = threading.Thread(target=self._exportar_en_lotes, name="exportador-trazas", daemon=True)
+        self._hilo.start()
+        atexit.register(self.vaciar)
+
+    def encolar(self, span: Span):
+        self._cola.put(span)
+
+    def _tomar_lote(self, espera: float) -> List[Span]:
+        lote = []
+        try:
+            lote.append(self._cola.get(timeout=espera))
+            while len(lote) < TAMANO_LOTE and lote[-1] is not _FIN:
+                lote.append(self._cola.get_nowait())
+        except queue.Empty:
+            pass
+        return lote
+
+    def _exportar_en_lotes(self):
+        while True:
+            lote = self._tomar_lote(INTERVALO_EXPORTACION)
+            fin = bool(lote) and lote[-1] is _FIN
+            if fin:
+                lote.pop()
+            if lote:
+                self._enviar_lote(lote)
+            if fin:
+                return
+
+    def vaciar(self):
+        """
+        Detiene el hilo exportador y exporta lo que quede (al terminar el proceso).
+        Si el hilo no termina a tiempo (colector lento) sigue siendo el único
+        que lee la cola: lo pendiente se pierde, pero no se exporta dos veces.
+        """
+        if self._hilo.is_alive():
+            self._cola.put(_FIN)
+            self._hilo.join(ESPERA_CIERRE)
+            if self._hilo.is_alive():
+                return
+        lote = self._tomar_lote(0)
+        while lote:
+            self._enviar_lote(lote)
+            lote = self._tomar_lote(0)
+
+    def _enviar_lote(self, lote: List[Span]):
+        try:
+            self.exportar(self.solicitud_otlp(lote))
+        except Exception:
+            pass  # Las trazas nunca deben tumbar el servicio: el lote se descarta
+
+    def solicitud_otlp(self, spans: List[Span]) -> Dict:
+        """ExportTraceServiceRequest de OTLP/JSON"""
+        return {"resourceSpans": [{
+            "resource": {"attributes": _atributos_otlp({"service.name": self.servicio})},
+            "scopeSpans": [{
+                "scope": {"name": "motor_malla.trazas"},
+                "spans": [span.to_otlp() for span in spans],
+            }],
+        }]}
+
+    @abstractmethod
+    def exportar(self, solicitud: Dict):
+        """Envía un ExportTraceServiceRequest (se llama desde el hilo exportador)"""
+
+
+class ExportadorArchivo(Exportador):
+    """Agrega cada lote como una línea JSON"""
+
+    def __init__(self, servicio: str, ruta: str):
+        self.ruta = ruta
+        self._candado = threading.Lock()
+        super().__init__(servicio)
+
+    def exportar(self, solicitud: Dict):
+        linea = json.dumps(solicitud, separators=(",", ":")) + "\n"
+        with self._candado, open(self.ruta, "a", encoding="utf-8") as archivo:
+            archivo.write(linea)
+
+
+class ExportadorColector(Exportador):
+    """POST de cada lote a un colector OTLP/HTTP con codificación JSON"""
+
+    def __init__(self, servicio: str, url: str):
+        self.url = url
+        super().__init__(servicio)
+
+    def exportar(self, solicitud: Dict):
+        import urllib.request  # Solo con exportación a colector (desde el hilo exportador)
+
+        peticion = urllib.request.Request(
+            self.url, data=json.dumps(solicitud).encode(), headers={"Content-Type": "application/json"}
+        )
+        urllib.request.urlopen(peticion, timeout=2).close()
+
+
+# ==================== TRAZADOR ====================
+
+class Trazador:
+    def __init__(self, exportador: Exportador = None):
+        self.exportador = exportador
+
+    @property
+    def activo(self) -> bool:
+        return self.exportador is not None
+
+    def abrir(self, nombre: str, traceparent: Optional[str] = None, **atributos):
+        """
+        Abre el span raíz de una petición (continúa la traza de un header
+        W3C traceparent si viene uno válido).
+
+        Returns:
+            tuple: (Span, token) para pasar a `cerrar`
+        """
+        traza_id, padre_id = None, None
+        if traceparent:
+            partes = traceparent.split("-")
+            if len(partes) == 4 and len(partes[1]) == 32 and len(partes[2]) == 16:
+                traza_id, padre_id = partes[1], partes[2]
+        span = Span(nombre, traza_id or f"{random.getrandbits(128):032x}", padre_id, SPAN_SERVIDOR, atributos)
+        return span, _span_actual.set(span)
+
+    def cerrar(self, span: Span, token, error: BaseException = None):
+        span.fin = time.time_ns()
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        _span_actual.reset(token)
+        if self.exportador is not None:
+            self.exportador.encolar(span)
+
+    def span(self, nombre: str, **atributos):
+        """Contexto de un span hijo del span actual (nulo si no hay traza en curso)"""
+        padre = _span_actual.get()
+        if padre is None or self.exportador is None:
+            return _NULO
+        return _Contexto(self, Span(nombre, padre.traza_id, padre.span_id, SPAN_INTERNO, atributos))
+
+
+TRAZADOR = Trazador()
+
+
+def span(nombre: str, **atributos):
+    return TRAZADOR.span(nombre, **atributos)
+
+
+def trazar(nombre: str):
+    """Decorador: ejecuta la función (síncrona o async) dentro de un span"""
+    def decorador(funcion):
+        if inspect.iscoroutinefunction(funcion):
+            @functools.wraps(funcion)
+            async def envoltura_async(*args, **kwargs):
+                with TRAZADOR.span(nombre):
+                    return await funcion(*args, **kwargs)
+            return envoltura_async
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with TRAZADOR.span(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def configurar_trazas(servicio: str) -> Trazador:
+    """Configura el exportador global según MALLA_TRAZAS (lo llama cada backend al iniciar)"""
+    modo = os.environ.get("MALLA_TRAZAS", APAGADO).lower()
+    if modo == EXPORTAR_ARCHIVO:
+        TRAZADOR.exportador = ExportadorArchivo(servicio, os.environ.get("MALLA_TRAZAS_ARCHIVO", ARCHIVO_POR_DEFECTO))
+    elif modo == EXPORTAR_COLECTOR:
+        TRAZADOR.exportador = ExportadorColector(servicio, os.environ.get("MALLA_TRAZAS_COLECTOR", COLECTOR_POR_DEFECTO))
+    else:
+        TRAZADOR.exportador = None
+    return TRAZADOR
+
+
+# ==================== COLECTOR LOCAL ====================
+
+def _colector(puerto: int, salida: str):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    candado = threading.Lock()
+
+    class Receptor(BaseHTTPRequestHandler):
+        def do_POST(self):
+            cuerpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                solicitud = json.loads(cuerpo)
+            except ValueError:
+                self.send_response(400)
+                self.end_headers()
+                return
+            with candado, open(salida, "a", encoding="utf-8") as archivo:
+                archivo.write(json.dumps(solicitud, separators=(",", ":")) + "\n")
+            total = sum(len(s["spans"]) for r in solicitud.get("resourceSpans", []) for s in r["scopeSpans"])
+            print(f"{total} spans recibidos")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+
+    print(f"Colector de trazas en http://127.0.0.1:{puerto}/v1/traces -> {salida}")
+    ThreadingHTTPServer(("127.0.0.1", puerto), Receptor).serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Colector OTLP/JSON local que guarda los lotes en un archivo")
+    parser.add_argument("--puerto", type=int, default=4318)
+    parser.add_argument("--salida", default=ARCHIVO_POR_DEFECTO)
+    argumentos = parser.parse_args()
+    _colector(argumentos.puerto, argumentos.salida)
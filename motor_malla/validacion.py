@@ -0,0 +1,67 @@
+"""
+Validación de una malla contra el catálogo
+Revisa el orden de prerequisitos (cada prerequisito ubicado en un semestre
+anterior), los prerequisitos que faltan en la malla, los cursos que no
+existen en el catálogo y el total de créditos contra `creditos_programa`.
+Función pura: recibe las consultas al catálogo como funciones, así corre
+igual en el proceso del servidor o en un proceso de trabajo.
+"""
+from typing import Callable, Dict, Iterable, List, Optional
+
+from motor_malla.grafo import PrerequisitosDe
+from motor_malla.modelos import MallaCurso
+
+CreditosDe = Callable[[str], Optional[int]]
+
+
+def validar_malla(cursos: Iterable[MallaCurso], prerequisitos_de: PrerequisitosDe, creditos_de: CreditosDe,
+                  creditos_programa: Optional[int] = None) -> Dict:
+    """
+    Problemas de una malla, en una pasada sobre sus ubicaciones.
+
+    Args:
+        cursos: Ubicaciones de la malla (borrador o versión)
+        prerequisitos_de: Prerequisitos directos de un curso según el catálogo
+        creditos_de: Créditos de un curso (None si no está en el catálogo)
+        creditos_programa: Créditos esperados (None o 0 = no se revisa el total)
+
+    Returns:
+        dict: valida, orden, faltantes, desconocidos y creditos
+    """
+    semestre_de: Dict[str, int] = {}
+    cursos = list(cursos)
+    for curso in cursos:
+        semestre_de.setdefault(curso.curso_id, curso.semestre)
+
+    orden: List[Dict] = []
+    faltantes: List[Dict] = []
+    desconocidos: List[str] = []
+    total = 0
+    for curso in cursos:
+        creditos = creditos_de(curso.curso_id)
+        if creditos is None:
+            desconocidos.append(curso.curso_id)
+            continue
+        total += creditos
+        for prereq_id in prerequisitos_de(curso.curso_id):
+            semestre_prereq = semestre_de.get(prereq_id)
+            if semestre_prereq is None:
+                faltantes.append({
+                    'curso_malla_id': curso.id, 'curso_id': curso.curso_id, 'prerequisito': prereq_id
+                })
+            elif semestre_prereq >= curso.semestre:
+                orden.append({
+                    'curso_malla_id': curso.id, 'curso_id': curso.curso_id, 'semestre': curso.semestre,
+                    'prerequisito': prereq_id, 'semestre_prerequisito': semestre_prereq
+                })
+
+    creditos = {'total': total, 'esperado': creditos_programa or None, 'diferencia': None}
+    if creditos_programa:
+        creditos['diferencia'] = total - creditos_programa
+    return {
+        'valida': not (orden or faltantes or desconocidos) and not creditos['diferencia'],
+        'orden': orden,
+        'faltantes': faltantes,
+        'desconocidos': desconocidos,
+        'creditos': creditos,
+    }
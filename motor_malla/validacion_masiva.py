@@ -0,0 +1,198 @@
+"""
+Validación masiva de todas las mallas
+Antes de cada periodo se revisan todas las mallas guardadas (orden de
+prerequisitos, prerequisitos faltantes, cursos desconocidos y créditos
+contra `creditos_programa`) con `validar_malla`, repartidas en lotes entre
+procesos. Los procesos no reciben el catálogo: abren el catálogo compilado
+(ver catalogo_binario) y lo comparten de solo lectura por el page cache.
+Si el catálogo vigente no es uno compilado, se compila a un archivo
+temporal que se borra al terminar.
+
+Las mallas se consumen de un iterable, una a la vez: a los procesos se
+envían a lo sumo EN_VUELO_POR_PROCESO lotes por proceso, así la memoria no
+crece con la cantidad de mallas (solo el detalle del reporte).
+
+El reporte es un dict serializable a JSON: totales, cantidad de mallas con
+cada tipo de problema y el detalle por malla en el orden de entrada.
+"""
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from motor_malla.catalogo_binario import abrir_catalogo, compilar_catalogo
+from motor_malla.modelos import Malla, MallaCurso
+from motor_malla.trabajos import contexto_procesos
+from motor_malla.trazas import span
+from motor_malla.validacion import validar_malla
+
+# Con menos ubicaciones que esto (en total) validar en este proceso es más rápido
+# que arrancar procesos y enviarles las mallas (~2 µs por ubicación contra ~0,5 s)
+MINIMO_PARALELO = 200_000
+# Tamaño de cada lote enviado a un proceso y lotes sin resultado por proceso
+UBICACIONES_POR_LOTE = 20_000
+EN_VUELO_POR_PROCESO = 2
+PROBLEMAS = ('orden', 'faltantes', 'desconocidos')
+
+# (posición, ubicaciones como tuplas, creditos_programa)
+Tarea = Tuple[int, List[tuple], Optional[int]]
+
+# Catálogo mapeado del proceso de validación (se abre una vez por proceso)
+_catalogo = None
+
+
+def _inicializar(ruta: str):
+    global _catalogo
+    _catalogo = abrir_catalogo(ruta)
+
+
+def _validar(catalogo, cursos: List[MallaCurso], creditos_programa: Optional[int]) -> Dict:
+    return validar_malla(cursos, catalogo.prerequisitos_de, catalogo.creditos_de, creditos_programa)
+
+
+def _validar_lote(lote: List[Tarea]) -> List[Tuple[int, Dict]]:
+    return [
+        (posicion, _validar(_catalogo, [MallaCurso(*fila) for fila in filas], creditos_programa))
+        for posicion, filas, creditos_programa in lote
+    ]
+
+
+def _tarea(posicion: int, malla: Malla) -> Tarea:
+    # Tuplas en lugar de MallaCurso: se serializan bastante más rápido
+    filas = [(c.id, c.curso_id, c.posicion_x, c.posicion_y, c.semestre) for c in malla.cursos]
+    return posicion, filas, malla.creditos_programa
+
+
+def _fila(malla: Malla) -> Dict:
+    """Fila del detalle sin el resultado (no retiene las ubicaciones)"""
+    return {
+        'malla_id': malla.id,
+        'nombre': malla.nombre,
+        'programa': malla.programa,
+        'periodo_vigencia': malla.periodo_vigencia,
+        'estado': malla.estado,
+        'total_cursos': len(malla.cursos),
+    }
+
+
+def validar_mallas(mallas: Iterable[Malla], catalogo, procesos: int = None) -> Dict:
+    """
+    Valida todas las mallas y arma el reporte.
+
+    Args:
+        mallas: Mallas a revisar (su borrador); se recorren una sola vez
+        catalogo: Catálogo vigente (Catalogo o CatalogoMapeado)
+        procesos: Procesos a usar (por defecto uno por núcleo; 1 = en este proceso).
+            Con pocas ubicaciones en total se valida en este proceso igual.
+
+    Returns:
+        dict: generado_en, duracion_ms, procesos, catalogo, total, validas,
+              invalidas, problemas (mallas con cada tipo) y mallas (detalle)
+    """
+    inicio = time.perf_counter()
+    if procesos is None:
+        procesos = os.cpu_count() or 1
+    procesos = max(1, procesos)
+    mallas = iter(mallas)
+
+    # Se juntan mallas hasta saber si hay ubicaciones suficientes para usar procesos
+    primeras: List[Malla] = []
+    if procesos > 1:
+        ubicaciones = 0
+        for malla in mallas:
+            primeras.append(malla)
+            ubicaciones += len(malla.cursos)
+            if ubicaciones >= MINIMO_PARALELO:
+                break
+        else:
+            procesos = 1
+
+    with span("validacion.masiva", procesos=procesos) as traza:
+        if procesos == 1:
+            detalle = [
+                {**_fila(malla), **_validar(catalogo, malla.cursos, malla.creditos_programa)}
+                for malla in itertools.chain(primeras, mallas)
+            ]
+        else:
+            detalle = _validar_en_procesos(itertools.chain(primeras, mallas), catalogo, procesos)
+        traza.fijar("mallas", len(detalle))
+
+    problemas = dict.fromkeys(PROBLEMAS + ('creditos',), 0)
+    for fila in detalle:
+        for problema in PROBLEMAS:
+            if fila[problema]:
+                problemas[problema] += 1
+        if fila['creditos']['diferencia']:
+            problemas['creditos'] += 1
+    validas = sum(1 for fila in detalle if fila['valida'])
+    return {
+        'generado_en': datetime.now().isoformat(),
+        'duracion_ms': round((time.perf_counter() - inicio) * 1000, 3),
+        'procesos': procesos,
+        'catalogo': len(catalogo),
+        'total': len(detalle),
+        'validas': validas,
+        'invalidas': len(detalle) - validas,
+        'problemas': problemas,
+        'mallas': detalle,
+    }
+
+
+def _validar_en_procesos(mallas: Iterator[Malla], catalogo, procesos: int) -> List[Dict]:
+    ruta = getattr(catalogo, 'ruta', None)
+    temporal = None
+    if ruta is None:
+        descriptor, temporal = tempfile.mkstemp(prefix='catalogo-', suffix='.bin')
+        os.close(descriptor)
+        compilar_catalogo(catalogo, temporal)
+        ruta = temporal
+
+    detalle: List[Dict] = []
+    # El pool consume los lotes desde su propio hilo: el semáforo lo frena
+    # cuando hay demasiados lotes sin resultado
+    en_vuelo = threading.Semaphore(procesos * EN_VUELO_POR_PROCESO)
+    detenido = threading.Event()
+
+    def lotes() -> Iterator[List[Tarea]]:
+        lote, ubicaciones = [], 0
+        for malla in mallas:
+            detalle.append(_fila(malla))
+            lote.append(_tarea(len(detalle) - 1, malla))
+            ubicaciones += len(malla.cursos)
+            if ubicaciones >= UBICACIONES_POR_LOTE:
+                en_vuelo.acquire()
+                if detenido.is_set():
+                    return
+                yield lote
+                lote, ubicaciones = [], 0
+        if lote:
+            en_vuelo.acquire()
+            yield lote
+
+    try:
+        with contexto_procesos().Pool(procesos, initializer=_inicializar, initargs=(ruta,)) as pool:
+            try:
+                for resultados in pool.imap_unordered(_validar_lote, lotes()):
+                    en_vuelo.release()
+                    for posicion, resultado in resultados:
+                        detalle[posicion].update(resultado)
+            finally:
+                # Si un lote falló, el hilo del pool no debe quedar esperando el semáforo
+                detenido.set()
+                en_vuelo.release()
+    finally:
+        if temporal is not None:
+            os.remove(temporal)
+    return detalle
+
+
+def escribir_reporte(reporte: Dict, ruta: str):
+    """Guarda el reporte en JSON (archivo temporal + os.replace: nunca queda a medias)"""
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump(reporte, archivo, ensure_ascii=False, indent=2)
+    os.replace(temporal, ruta)
@@ -0,0 +1,111 @@
+"""
+Versiones publicadas de una malla (copy-on-write con estructura compartida)
+El borrador se mantiene agrupado por semestre en tuplas inmutables. Cada
+cambio reconstruye solo las tuplas de los semestres que toca y copia el
+dict de referencias, así una versión publicada es solo una referencia a
+las tuplas vigentes: publicar es O(número de semestres) y las versiones
+comparten con el borrador (y entre sí) todos los semestres que no cambiaron.
+"""
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+from motor_malla.modelos import MallaCurso, resumen_malla
+
+Semestres = Mapping[int, Tuple[MallaCurso, ...]]
+
+
+def agrupar_por_semestre(cursos: Iterable[MallaCurso]) -> Dict[int, Tuple[MallaCurso, ...]]:
+    """Agrupa las ubicaciones por semestre conservando su orden"""
+    grupos: Dict[int, List[MallaCurso]] = {}
+    for curso in cursos:
+        grupos.setdefault(curso.semestre, []).append(curso)
+    return {semestre: tuple(grupo) for semestre, grupo in grupos.items()}
+
+
+def actualizar_semestres(semestres: Semestres, quitados: Iterable[MallaCurso],
+                         puestos: Iterable[MallaCurso]) -> Dict[int, Tuple[MallaCurso, ...]]:
+    """
+    Retorna un dict nuevo con los semestres afectados reconstruidos.
+    Nunca modifica `semestres` ni sus tuplas (pueden pertenecer a versiones publicadas).
+
+    Args:
+        quitados: Ubicaciones vigentes que se eliminan o se reemplazan
+        puestos: Ubicaciones nuevas o reemplazos (en su semestre nuevo)
+    """
+    puestos = list(puestos)
+    reemplazos = {c.id: c for c in puestos}
+    ids_quitados = {c.id for c in quitados}
+    semestres_quitados = {c.semestre for c in quitados}
+    nuevo = dict(semestres)
+
+    # Un reemplazo en el mismo semestre conserva su lugar; el resto se agrega al final
+    en_su_lugar = set()
+    for semestre in semestres_quitados:
+        grupo = []
+        for curso in nuevo.get(semestre, ()):
+            if curso.id not in ids_quitados:
+                grupo.append(curso)
+            elif curso.id in reemplazos and reemplazos[curso.id].semestre == semestre:
+                grupo.append(reemplazos[curso.id])
+                en_su_lugar.add(curso.id)
+        nuevo[semestre] = tuple(grupo)
+
+    agregados: Dict[int, List[MallaCurso]] = {}
+    for curso in puestos:
+        if curso.id not in en_su_lugar:
+            agregados.setdefault(curso.semestre, []).append(curso)
+    for semestre, grupo in agregados.items():
+        nuevo[semestre] = nuevo.get(semestre, ()) + tuple(grupo)
+
+    return {semestre: grupo for semestre, grupo in nuevo.items() if grupo}
+
+
+def hash_semestre(cursos: Tuple[MallaCurso, ...]) -> str:
+    """Hash de contenido de un semestre (para deduplicar bloques persistidos)"""
+    filas = [[c.id, c.curso_id, c.posicion_x, c.posicion_y, c.semestre] for c in cursos]
+    return hashlib.sha1(json.dumps(filas, separators=(',', ':')).encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class VersionMalla:
+    """Versión inmutable publicada de una malla"""
+    malla_id: str
+    numero: int
+    fecha_publicacion: str
+    metadatos: Mapping        # Campos de la malla sin cursos (ver CAMPOS_RESUMEN_MALLA)
+    semestres: Semestres      # semestre -> tupla de ubicaciones (compartidas)
+
+    @property
+    def cursos(self) -> List[MallaCurso]:
+        return [curso for semestre in sorted(self.semestres) for curso in self.semestres[semestre]]
+
+    @property
+    def total_cursos(self) -> int:
+        return sum(len(grupo) for grupo in self.semestres.values())
+
+    def resumen(self):
+        return {
+            'numero': self.numero,
+            'fecha_publicacion': self.fecha_publicacion,
+            'total_cursos': self.total_cursos,
+        }
+
+    def to_dict(self):
+        data = resumen_malla(dict(self.metadatos), self.total_cursos)
+        data['version'] = self.numero
+        data['fecha_publicacion'] = self.fecha_publicacion
+        data['cursos'] = [c.to_dict() for c in self.cursos]
+        return data
+
+
+def crear_version(malla_id: str, numero: int, metadatos: Mapping, semestres: Semestres) -> VersionMalla:
+    return VersionMalla(
+        malla_id=malla_id,
+        numero=numero,
+        fecha_publicacion=datetime.now().isoformat(),
+        metadatos=dict(metadatos),
+        semestres=semestres
+    )
@@ -0,0 +1,155 @@
+"""
+Reporte de tiempo de arranque de los backends
+Importa cada backend en un proceso nuevo con `python -X importtime`, agrupa
+el tiempo por origen (código del proyecto, framework, biblioteca estándar,
+otras dependencias) y lista los módulos más lentos. Después mide cuánto
+tarda el calentamiento hasta que /ready respondería 200.
+
+Uso:
+    python tiempos_arranque.py                    # ambos backends
+    python tiempos_arranque.py --backend flask --top 30 --repeticiones 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+BACKENDS = {
+    'flask': {
+        'directorio': os.path.join(RAIZ, 'backend'),
+        'modulo': 'app.app',
+        'framework': ('flask', 'flask_cors', 'werkzeug', 'jinja2', 'markupsafe', 'itsdangerous', 'click', 'blinker'),
+    },
+    'fastapi': {
+        'directorio': os.path.join(RAIZ, 'backend_fastapi'),
+        'modulo': 'main',
+        'framework': ('fastapi', 'starlette', 'pydantic', 'pydantic_core', 'anyio', 'sniffio',
+                      'typing_extensions', 'typing_inspection', 'annotated_types', 'annotated_doc'),
+    },
+}
+
+PROYECTO = ('motor_malla', 'app', 'models', 'routes', 'main', 'repositorio', 'tiempo_real')
+
+# Espera el calentamiento en el proceso hijo e imprime el estado de /ready en JSON
+ESPERAR_FLASK = """
+import json, time
+import app.app as aplicacion
+while aplicacion.PREPARACION.duracion_ms is None:
+    time.sleep(0.001)
+print(json.dumps(aplicacion.PREPARACION.estado()))
+"""
+
+ESPERAR_FASTAPI = """
+import asyncio, json
+import main
+
+async def esperar():
+    async with main.app.router.lifespan_context(main.app):
+        while main.preparacion.duracion_ms is None:
+            await asyncio.sleep(0.001)
+    print(json.dumps(main.preparacion.estado()))
+
+asyncio.run(esperar())
+"""
+
+
+def medir_importacion(backend: dict):
+    """
+    Importa el backend una vez con -X importtime.
+
+    Returns:
+        list: (módulo, propio_us, acumulado_us) en orden de importación
+    """
+    salida = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {backend['modulo']}"],
+        cwd=backend['directorio'], capture_output=True, text=True, check=True
+    ).stderr
+    modulos = []
+    for linea in salida.splitlines():
+        if not linea.startswith('import time:') or 'self [us]' in linea:
+            continue
+        propio, acumulado, nombre = linea[len('import time:'):].split('|')
+        modulos.append((nombre.strip(), int(propio), int(acumulado)))
+    return modulos
+
+
+def mejor_de(mediciones):
+    """Por módulo, el menor tiempo entre repeticiones (descarta el ruido del disco y del SO)"""
+    mejor = {}
+    for modulos in mediciones:
+        for nombre, propio, acumulado in modulos:
+            if nombre not in mejor or propio < mejor[nombre][0]:
+                mejor[nombre] = (propio, acumulado)
+    return mejor
+
+
+def origen(nombre: str, framework) -> str:
+    raiz = nombre.split('.')[0]
+    if raiz in PROYECTO:
+        return 'proyecto'
+    if raiz in framework:
+        return 'framework'
+    if raiz in sys.stdlib_module_names or raiz.lstrip('_') in sys.stdlib_module_names:
+        return 'biblioteca estándar'
+    return 'otras dependencias'
+
+
+def medir_calentamiento(backend: dict, nombre: str) -> dict:
+    script = ESPERAR_FLASK if nombre == 'flask' else ESPERAR_FASTAPI
+    salida = subprocess.run(
+        [sys.executable, '-c', script], cwd=backend['directorio'], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def reportar(nombre: str, repeticiones: int, top: int):
+    backend = BACKENDS[nombre]
+    mejor = mejor_de(medir_importacion(backend) for _ in range(repeticiones))
+    total = sum(propio for propio, _ in mejor.values())
+
+    print(f"\n=== {nombre} (import {backend['modulo']}, mejor de {repeticiones}) ===")
+    print(f"Total de importación: {total / 1000:.1f} ms en {len(mejor)} módulos")
+
+    por_origen = defaultdict(int)
+    for modulo, (propio, _) in mejor.items():
+        por_origen[origen(modulo, backend['framework'])] += propio
+    print("\nPor origen:")
+    for grupo, tiempo in sorted(por_origen.items(), key=lambda par: -par[1]):
+        print(f"  {grupo:<22} {tiempo / 1000:8.1f} ms  {100 * tiempo / total:5.1f} %")
+
+    por_paquete = defaultdict(int)
+    for modulo, (propio, _) in mejor.items():
+        por_paquete[modulo.split('.')[0]] += propio
+    print("\nPaquetes más lentos (tiempo propio de todos sus módulos):")
+    for paquete, tiempo in sorted(por_paquete.items(), key=lambda par: -par[1])[:top]:
+        print(f"  {paquete:<40} {tiempo / 1000:8.1f} ms")
+
+    print("\nMódulos del proyecto (acumulado incluye lo que cada uno importa):")
+    for modulo, (propio, acumulado) in sorted(mejor.items(), key=lambda par: -par[1][1]):
+        if origen(modulo, backend['framework']) == 'proyecto':
+            print(f"  {modulo:<40} propio {propio / 1000:6.1f} ms  acumulado {acumulado / 1000:7.1f} ms")
+
+    estado = medir_calentamiento(backend, nombre)
+    print(f"\nCalentamiento hasta /ready: {estado['duracion_ms']} ms"
+          + (f" (error: {estado['error']})" if estado['error'] else ''))
+    for paso, duracion in estado['pasos'].items():
+        print(f"  {paso:<40} {duracion:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Desglose del tiempo de arranque de los backends")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), action='append',
+                        help="Backend a medir (se puede repetir; por defecto ambos)")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15, help="Cantidad de paquetes lentos a listar")
+    argumentos = parser.parse_args()
+    for nombre in argumentos.backend or sorted(BACKENDS):
+        reportar(nombre, argumentos.repeticiones, argumentos.top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Validación masiva de mallas antes de cada periodo académico
+Lee todas las mallas guardadas en la base SQLite del backend FastAPI y el
+catálogo vigente (MALLA_CATALOGO, o la tabla cursos de la base), las valida
+en paralelo (motor_malla.validacion_masiva) y escribe el reporte en JSON.
+Sale con código 1 si alguna malla es inválida, así sirve en un pipeline.
+
+Uso:
+    python validar_mallas.py                                   # malla.db -> reporte_validacion.json
+    python validar_mallas.py --sqlite datos/malla.db --procesos 8 --salida -   # reporte a stdout
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [RAIZ, os.path.join(RAIZ, 'backend_fastapi')]
+
+from motor_malla import crear_fuente_catalogo  # noqa: E402
+from motor_malla.validacion_masiva import escribir_reporte  # noqa: E402
+
+
+async def validar(ruta: str, procesos: int = None):
+    """Reporte de todas las mallas de la base, con el mismo repositorio que usa el backend"""
+    from repositorio import RepositorioSQLite
+
+    fuente = crear_fuente_catalogo()
+    repositorio = RepositorioSQLite(ruta, fuente_catalogo=fuente if fuente.ruta else None)
+    try:
+        return await repositorio.validar_todas(procesos)
+    finally:
+        await repositorio.cerrar()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Valida todas las mallas guardadas y escribe un reporte JSON")
+    parser.add_argument('--sqlite', default=os.environ.get('MALLA_SQLITE_RUTA', 'malla.db'),
+                        help="Base SQLite del backend (por defecto MALLA_SQLITE_RUTA o malla.db)")
+    parser.add_argument('--procesos', type=int, default=None, help="Procesos a usar (por defecto uno por núcleo)")
+    parser.add_argument('--salida', default='reporte_validacion.json', help='Archivo del reporte ("-" = stdout)')
+    argumentos = parser.parse_args()
+
+    if not os.path.exists(argumentos.sqlite):
+        print(f"No existe la base {argumentos.sqlite}", file=sys.stderr)
+        return 2
+    if argumentos.procesos is not None and argumentos.procesos < 1:
+        parser.error("--procesos debe ser >= 1")
+
+    reporte = asyncio.run(validar(argumentos.sqlite, argumentos.procesos))
+    if argumentos.salida == '-':
+        json.dump(reporte, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        escribir_reporte(reporte, argumentos.salida)
+
+    problemas = ', '.join(f"{tipo} {total}" for tipo, total in reporte['problemas'].items())
+    print(f"{reporte['total']} mallas en {reporte['duracion_ms']:.0f} ms con {reporte['procesos']} procesos: "
+          f"{reporte['validas']} válidas, {reporte['invalidas']} inválidas ({problemas})", file=sys.stderr)
+    return 1 if reporte['invalidas'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())